@@ -0,0 +1,316 @@
+"""
+Classifieur d'actions précompilé - Architecture des 4 Moteurs
+Type, paramètres et entités d'une action joueur en un seul parcours des mots du texte
+"""
+
+import time
+from typing import Dict, List, Any, Hashable, Optional, Tuple
+
+from src.engines.entity_gazetteer import tokenize
+
+# Formes fléchies reconnues en plus de chaque mot-clé (liste explicite plutôt qu'un préfixe:
+# 'ferme' ne doit pas reconnaître 'fermement', ni 'range' 'rangée', ni 'entre' 'entrepôt')
+WORD_FORMS: Dict[str, List[str]] = {
+    # Combat
+    'attaque': ['attaques', 'attaquer', 'attaquons', 'attaquez', 'attaquant'],
+    'combat': ['combats', 'combattre', 'combattons', 'combattez', 'combattant'],
+    'frappe': ['frappes', 'frapper', 'frappons', 'frappez', 'frappant'],
+    'tue': ['tues', 'tuer', 'tuons', 'tuez', 'tuant'],
+    'bataille': ['batailles', 'batailler'],
+    'tire': ['tires', 'tirer', 'tirons', 'tirez', 'tirant'],
+    'bloque': ['bloques', 'bloquer', 'bloquons', 'bloquez', 'bloquant'],
+    'défense': ['défenses'],
+    'fight': ['fights', 'fighting'],
+    'attack': ['attacks', 'attacking'],
+    'kill': ['kills', 'killing'],
+    # Exploration
+    'examine': ['examines', 'examiner', 'examinons', 'examinez', 'examinant'],
+    'regarde': ['regardes', 'regarder', 'regardons', 'regardez', 'regardant'],
+    'observe': ['observes', 'observer', 'observons', 'observez', 'observant'],
+    'cherche': ['cherches', 'chercher', 'cherchons', 'cherchez', 'cherchant'],
+    'fouille': ['fouilles', 'fouiller', 'fouillons', 'fouillez', 'fouillant'],
+    'explore': ['explores', 'explorer', 'explorons', 'explorez', 'explorant'],
+    'va': ['vais', 'vas', 'aller', 'allons', 'allez'],
+    'marche': ['marches', 'marcher', 'marchons', 'marchez', 'marchant'],
+    'entre': ['entres', 'entrer', 'entrons', 'entrez', 'entrant'],
+    'sort': ['sors', 'sortir', 'sortons', 'sortez', 'sortant', 'sorts'],
+    'ouvre': ['ouvres', 'ouvrir', 'ouvrons', 'ouvrez', 'ouvrant'],
+    'ferme': ['fermes', 'fermer', 'fermons', 'fermez', 'fermant'],
+    'pars': ['partir', 'partons', 'partez', 'partant'],
+    'dirige': ['diriges', 'diriger', 'dirigeons', 'dirigez', 'dirigeant'],
+    'avance': ['avances', 'avancer', 'avançons', 'avancez', 'avançant'],
+    'traverse': ['traverses', 'traverser', 'traversons', 'traversez', 'traversant'],
+    'rejoins': ['rejoint', 'rejoindre', 'rejoignons', 'rejoignez', 'rejoignant'],
+    'retourne': ['retournes', 'retourner', 'retournons', 'retournez', 'retournant'],
+    # Dialogue
+    'parle': ['parles', 'parler', 'parlons', 'parlez', 'parlant'],
+    'dit': ['dis', 'dire', 'disons', 'dites', 'disant'],
+    'demande': ['demandes', 'demander', 'demandons', 'demandez', 'demandant'],
+    'répond': ['réponds', 'répondre', 'répondons', 'répondez', 'répondant'],
+    'salue': ['salues', 'saluer', 'saluons', 'saluez', 'saluant'],
+    'discute': ['discutes', 'discuter', 'discutons', 'discutez', 'discutant'],
+    'conversation': ['conversations'],
+    'talk': ['talks', 'talking'],
+    'speak': ['speaks', 'speaking'],
+    'ask': ['asks', 'asking'],
+    'agressif': ['agressive', 'agressifs', 'agressives', 'agressivement'],
+    'amical': ['amicale', 'amicaux', 'amicales', 'amicalement'],
+    'gentil': ['gentille', 'gentils', 'gentilles', 'gentiment'],
+    'persuasif': ['persuasive', 'persuasifs', 'persuasives', 'persuasion'],
+    # Inventaire
+    'prend': ['prends', 'prendre', 'prenons', 'prenez', 'prenant'],
+    'ramasse': ['ramasses', 'ramasser', 'ramassons', 'ramassez', 'ramassant'],
+    'utilise': ['utilises', 'utiliser', 'utilisons', 'utilisez', 'utilisant'],
+    'équipe': ['équipes', 'équiper', 'équipons', 'équipez', 'équipant'],
+    'range': ['ranges', 'ranger', 'rangeons', 'rangez', 'rangeant'],
+    'donne': ['donnes', 'donner', 'donnons', 'donnez', 'donnant'],
+    'jette': ['jettes', 'jeter', 'jetons', 'jetez', 'jetant'],
+    'take': ['takes', 'taking'],
+    'use': ['uses', 'using'],
+    'equip': ['equips', 'equipping'],
+    # Magie
+    'lance': ['lances', 'lancer', 'lançons', 'lancez', 'lançant'],
+    'incante': ['incantes', 'incanter', 'incantons', 'incantez', 'incantant'],
+    'enchante': ['enchantes', 'enchanter', 'enchantons', 'enchantez', 'enchantant'],
+    'cast': ['casts', 'casting'],
+    'spell': ['spells'],
+    'puissant': ['puissante', 'puissants', 'puissantes', 'puissamment'],
+    'faible': ['faibles', 'faiblement'],
+    'léger': ['légère', 'légers', 'légères', 'légèrement'],
+    # Social
+    'persuade': ['persuades', 'persuader', 'persuadons', 'persuadez', 'persuadant'],
+    'intimide': ['intimides', 'intimider', 'intimidons', 'intimidez', 'intimidant'],
+    'négocie': ['négocies', 'négocier', 'négocions', 'négociez', 'négociant'],
+    'marchande': ['marchandes', 'marchander', 'marchandons', 'marchandez', 'marchandant'],
+    'séduit': ['séduis', 'séduire', 'séduisons', 'séduisez', 'séduisant'],
+    'intimidate': ['intimidates', 'intimidating'],
+    'negotiate': ['negotiates', 'negotiating']
+}
+
+# Paramètres par type d'action: (nom, valeur, mots-clés). Pour un même nom,
+# la première règle reconnue l'emporte (ordre de priorité).
+PARAMETER_RULES: Dict[str, List[Tuple[str, Any, List[str]]]] = {
+    'combat': [
+        ('attack_type', 'melee', ['attaque']),
+        ('attack_type', 'ranged', ['tire', 'arc', 'arcs']),
+        ('defensive', True, ['défense', 'bloque'])
+    ],
+    'exploration': [
+        ('stealth', True, ['discrètement', 'silencieusement']),
+        ('speed', 'fast', ['rapidement', 'vite']),
+        # Intention et direction: distinguent les actions d'exploration sans entité
+        ('intent', 'movement', ['va', 'marche', 'entre', 'sors', 'sortir', 'pars', 'dirige', 'avance', 'traverse',
+                                'rejoins', 'retourne']),
+        ('intent', 'search', ['fouille', 'cherche']),
+        ('intent', 'observation', ['regarde', 'examine', 'observe']),
+        ('direction', 'north', ['nord']),
+        ('direction', 'south', ['sud']),
+        ('direction', 'east', ["l'est", 'à est']),
+        ('direction', 'west', ['ouest'])
+    ],
+    'dialogue': [
+        ('tone', 'polite', ['poliment', 'respectueusement']),
+        ('tone', 'aggressive', ['agressif', 'colère']),
+        ('tone', 'friendly', ['amical', 'gentil']),
+        ('tone', 'persuasive', ['persuasif'])
+    ],
+    'magic': [
+        ('power_level', 'high', ['puissant', 'fort', 'forte', 'fortement']),
+        ('power_level', 'low', ['faible', 'léger'])
+    ]
+}
+PARAMETER_DEFAULTS = {
+    'dialogue': {'tone': 'neutral'},
+    'magic': {'power_level': 'medium'}
+}
+
+COMMON_OBJECTS = ['épée', 'bouclier', 'potion', 'clé', 'livre', 'coffre', 'porte', 'fenêtre']
+COMMON_SPELLS = ['boule de feu', 'soin', 'téléportation', 'invisibilité', 'protection']
+
+# Indices de complexité reconnus dans le texte
+COMPLEXITY_KEYWORDS = {
+    'observation': ['regarde', 'examine'],
+    'simultaneous': ['simultanément', 'en même temps']
+}
+
+class ActionClassifier:
+    """
+    Index unique construit une fois à l'initialisation du moteur d'interaction, couvrant
+    les mots-clés de type d'action, de paramètres, d'objets, de sorts et de complexité,
+    avec leurs formes fléchies (WORD_FORMS). Comme l'index des entités (EntityGazetteer),
+    l'action est découpée en mots sans casse ni accents et chaque mot ou groupe de mots
+    est cherché dans un dictionnaire: quelques consultations par mot, quel que soit le
+    nombre de mots-clés.
+    Poids de type: 2 si le mot-clé ouvre l'action, 1 sinon.
+    """
+    
+    def __init__(self, action_types: Dict[str, List[str]],
+                 parameter_rules: Optional[Dict[str, List[Tuple[str, Any, List[str]]]]] = None):
+        self.action_types = list(action_types)
+        self.parameter_rules = PARAMETER_RULES if parameter_rules is None else parameter_rules
+        
+        lexicons: Dict[Hashable, List[str]] = {}
+        for action_type, keywords in action_types.items():
+            lexicons[('type', action_type)] = keywords
+        for action_type, rules in self.parameter_rules.items():
+            for rule_index, (_, _, keywords) in enumerate(rules):
+                lexicons[('param', action_type, rule_index)] = keywords
+        for obj in COMMON_OBJECTS:
+            lexicons[('object', obj)] = [obj, obj + 's']
+        for spell in COMMON_SPELLS:
+            lexicons[('spell', spell)] = [spell]
+        for indicator, keywords in COMPLEXITY_KEYWORDS.items():
+            lexicons[('complexity', indicator)] = keywords
+        
+        # Mot -> catégories; expressions de plusieurs mots -> catégories, et pour chaque
+        # premier mot d'expression, les longueurs (en mots) à essayer
+        self.single_words: Dict[str, List[Hashable]] = {}
+        self.phrases: Dict[Tuple[str, ...], List[Hashable]] = {}
+        self.phrase_lengths: Dict[str, Tuple[int, ...]] = {}
+        for category, keywords in lexicons.items():
+            for keyword in keywords:
+                for form in [keyword] + WORD_FORMS.get(keyword, []):
+                    self._index(tokenize(form), category)
+    
+    def _index(self, words: Tuple[str, ...], category: Hashable) -> None:
+        if not words:
+            return
+        if len(words) == 1:
+            categories = self.single_words.setdefault(words[0], [])
+        else:
+            categories = self.phrases.setdefault(words, [])
+        if category not in categories:
+            categories.append(category)
+        if len(words) == 1:
+            return
+        lengths = self.phrase_lengths.get(words[0], ())
+        if len(words) not in lengths:
+            self.phrase_lengths[words[0]] = tuple(sorted(lengths + (len(words),)))
+    
+    def classify(self, action_text: str) -> Dict[str, Any]:
+        """
+        Retourne action_type, type_scores, parameters (pour le type retenu), parameter_hits
+        (règles reconnues, tous types confondus), objects, spells, complexity_indicators
+        ('observation', 'simultaneous') reconnus dans l'action et words (mots repliés, réutilisables
+        par l'index des entités)
+        """
+        type_scores = dict.fromkeys(self.action_types, 0)
+        rule_hits = set()
+        found_objects = set()
+        found_spells = set()
+        indicators = set()
+        
+        words = tokenize(action_text)
+        single_words = self.single_words
+        phrase_lengths = self.phrase_lengths
+        matched = []
+        for position, word in enumerate(words):
+            categories = single_words.get(word)
+            if categories is not None:
+                matched.append((position, categories))
+            lengths = phrase_lengths.get(word)
+            if lengths is not None:
+                for length in lengths:
+                    categories = self.phrases.get(words[position:position + length])
+                    if categories is not None:
+                        matched.append((position, categories))
+        
+        for position, categories in matched:
+            for category in categories:
+                kind = category[0]
+                if kind == 'type':
+                    type_scores[category[1]] += 2 if position == 0 else 1
+                elif kind == 'param':
+                    rule_hits.add(category[1:])
+                elif kind == 'object':
+                    found_objects.add(category[1])
+                elif kind == 'spell':
+                    found_spells.add(category[1])
+                else:
+                    indicators.add(category[1])
+        
+        # À score égal, le premier type déclaré l'emporte
+        action_type = max(type_scores, key=type_scores.get) if matched and max(type_scores.values()) > 0 \
+            else 'exploration'
+        
+        return {
+            'action_type': action_type,
+            'type_scores': type_scores,
+            'parameters': self._parameters(action_type, rule_hits),
+            'parameter_hits': rule_hits,
+            'objects': [obj for obj in COMMON_OBJECTS if obj in found_objects] if found_objects else [],
+            'spells': [spell for spell in COMMON_SPELLS if spell in found_spells] if found_spells else [],
+            'complexity_indicators': indicators,
+            'words': words
+        }
+    
+    def parameters_for(self, classification: Dict[str, Any], action_type: str) -> Dict[str, Any]:
+        """Paramètres d'une action classée, pour un type éventuellement différent du type retenu"""
+        return self._parameters(action_type, classification['parameter_hits'])
+    
+    def _parameters(self, action_type: str, rule_hits: set) -> Dict[str, Any]:
+        parameters = dict(PARAMETER_DEFAULTS.get(action_type, {}))
+        rules = self.parameter_rules.get(action_type, [])
+        assigned = set()
+        for rule_index in sorted(index for hit_type, index in rule_hits if hit_type == action_type):
+            name, value, _ = rules[rule_index]
+            if name not in assigned:
+                parameters[name] = value
+                assigned.add(name)
+        return parameters
+
+BENCHMARK_ACTIONS = [
+    "Je regarde autour de moi",
+    "J'attaque le gobelin avec mon épée",
+    "Je parle poliment au marchand",
+    "Je lance une boule de feu puissante",
+    "Je prends la potion",
+    "Je persuade le garde de me laisser passer",
+    "Je vais vers la forêt discrètement",
+    "J'ouvre le coffre et j'examine son contenu en même temps"
+]
+
+def run_benchmark(iterations: int = 50000) -> Dict[str, Any]:
+    """
+    Parses par seconde de InteractionEngine.parse_action (sans puis avec le cache des actions
+    analysées) et du classifieur seul (un thread)
+    """
+    from src.engines.interaction_engine import interaction_engine
+    from src.engines.state_engine import state_engine
+    
+    context = state_engine.get_full_context(state_engine.create_session('Banc d\'essai'))
+    classifier = interaction_engine.action_classifier
+    actions = BENCHMARK_ACTIONS
+    
+    cache_enabled = interaction_engine.parse_cache.enabled
+    interaction_engine.parse_cache.enabled = False
+    started = time.perf_counter()
+    for index in range(iterations):
+        interaction_engine.parse_action(actions[index % len(actions)], context)
+    parse_elapsed = time.perf_counter() - started
+    
+    interaction_engine.parse_cache.enabled = True
+    started = time.perf_counter()
+    for index in range(iterations):
+        interaction_engine.parse_action(actions[index % len(actions)], context)
+    cached_elapsed = time.perf_counter() - started
+    interaction_engine.parse_cache.enabled = cache_enabled
+    
+    started = time.perf_counter()
+    for index in range(iterations):
+        classifier.classify(actions[index % len(actions)])
+    classify_elapsed = time.perf_counter() - started
+    
+    return {
+        'iterations': iterations,
+        'parse_action_per_s': round(iterations / parse_elapsed),
+        'classify_per_s': round(iterations / classify_elapsed),
+        'parse_action_us': round(parse_elapsed / iterations * 1e6, 2),
+        'cached_parse_action_per_s': round(iterations / cached_elapsed),
+        'indexed_words': len(classifier.single_words),
+        'indexed_phrases': len(classifier.phrases)
+    }
+
+if __name__ == '__main__':
+    import json
+    print(json.dumps(run_benchmark(), indent=2))
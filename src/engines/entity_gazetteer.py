@@ -0,0 +1,209 @@
+"""
+Index des entités nommées - Architecture des 4 Moteurs
+Noms des NPCs, objets au sol et lieux d'un monde, retrouvés dans une action sans parcourir tout le monde
+"""
+
+import json
+import random
+import re
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+
+from src.models.game_state import WorldState
+from src.utils.keyword_matcher import fold_text
+
+WORD_PATTERN = re.compile(r'\w+')
+
+def tokenize(text: str) -> Tuple[str, ...]:
+    """Mots sans casse ni accents: 'Forêt Noire' -> ('foret', 'noire')"""
+    return tuple(WORD_PATTERN.findall(fold_text(text)))
+
+class EntityGazetteer:
+    """
+    Index des noms d'entités d'un monde: mots du nom -> entités [(type, id)], et pour chaque
+    premier mot, les longueurs de noms (en mots) à essayer. Une recherche coûte quelques
+    consultations de dictionnaire par mot de l'action, quel que soit le nombre d'entités. Les noms sont reconnus mot à mot (limites de mots, sans casse ni accents).
+    L'index suit WorldState.entity_version: seules les entités modifiées sont réindexées.
+    """
+    
+    def __init__(self, world_state: WorldState):
+        self.world_state = world_state
+        self.names: Dict[Tuple[str, ...], List[Tuple[str, str]]] = {}
+        self.name_lengths: Dict[str, Dict[int, int]] = {}
+        self.indexed: Dict[Tuple[str, str], Tuple[str, ...]] = {}
+        self.version = world_state.entity_version
+        self.stats = {'lookups': 0, 'rebuilds': 0, 'incremental_updates': 0}
+        self.lock = threading.Lock()
+        
+        self._build()
+    
+    def sync(self) -> None:
+        """Réindexe les entités modifiées depuis la dernière recherche"""
+        if self.version == self.world_state.entity_version:
+            return
+        
+        changes = self.world_state.entity_changes_since(self.version)
+        if changes is None:
+            self._build()
+        else:
+            for change in changes:
+                self._reindex(change['kind'], change['id'], change['location'])
+            self.stats['incremental_updates'] += len(changes)
+        self.version = self.world_state.entity_version
+    
+    def lookup(self, action_text: str, words: Optional[Tuple[str, ...]] = None) -> List[Tuple[str, str]]:
+        """
+        Entités nommées dans l'action, dans l'ordre du texte: [(type, id)] (type: npc, item, location).
+        words: mots de l'action déjà découpés par tokenize (évite un second découpage)
+        """
+        words = tokenize(action_text) if words is None else words
+        found = []
+        with self.lock:
+            self.sync()
+            self.stats['lookups'] += 1
+            for position, word in enumerate(words):
+                for length in self.name_lengths.get(word, ()):
+                    for entity in self.names.get(words[position:position + length], ()):
+                        if entity not in found:
+                            found.append(entity)
+        return found
+    
+    def find_entities(self, action_text: str, location_id: str,
+                      words: Optional[Tuple[str, ...]] = None) -> Dict[str, List[str]]:
+        """
+        Noms (en minuscules) des entités citées, limités au lieu du joueur: NPCs présents et objets
+        au sol. Les lieux sont reconnus dans tout le monde, le lieu actuel et ses voisins en tête.
+        """
+        world_state = self.world_state
+        location = world_state.locations.get(location_id)
+        nearby = set(location.connections) if location else set()
+        entities = {'npcs': [], 'objects': [], 'locations': []}
+        distant_locations = []
+        
+        for kind, entity_id in self.lookup(action_text, words):
+            if kind == 'npc':
+                npc = world_state.npcs[entity_id]
+                if npc.location == location_id:
+                    entities['npcs'].append(npc.name.lower())
+            elif kind == 'item':
+                item = world_state._items_by_location.get(location_id, {}).get(entity_id)
+                if item is not None:
+                    entities['objects'].append(item.name.lower())
+            elif entity_id == location_id or entity_id in nearby:
+                entities['locations'].append(world_state.locations[entity_id].name.lower())
+            else:
+                distant_locations.append(world_state.locations[entity_id].name.lower())
+        
+        entities['locations'].extend(distant_locations)
+        return entities
+    
+    def _build(self) -> None:
+        self.names = {}
+        self.name_lengths = {}
+        self.indexed = {}
+        for npc_id in self.world_state.npcs:
+            self._reindex('npc', npc_id)
+        for location_id, location in self.world_state.locations.items():
+            self._reindex('location', location_id)
+            for item in location.items:
+                self._reindex('item', item.id, location_id)
+        self.stats['rebuilds'] += 1
+    
+    def _reindex(self, kind: str, entity_id: str, location_id: Optional[str] = None) -> None:
+        """Retire l'ancien nom de l'entité et indexe son nom actuel (si elle existe encore)"""
+        entity = (kind, entity_id)
+        previous = self.indexed.pop(entity, None)
+        if previous:
+            entities = self.names[previous]
+            entities.remove(entity)
+            if not entities:
+                del self.names[previous]
+            lengths = self.name_lengths[previous[0]]
+            lengths[len(previous)] -= 1
+            if not lengths[len(previous)]:
+                del lengths[len(previous)]
+                if not lengths:
+                    del self.name_lengths[previous[0]]
+        
+        name = self._current_name(kind, entity_id, location_id)
+        name_words = tokenize(name) if name else ()
+        if name_words:
+            self.names.setdefault(name_words, []).append(entity)
+            lengths = self.name_lengths.setdefault(name_words[0], {})
+            lengths[len(name_words)] = lengths.get(len(name_words), 0) + 1
+            self.indexed[entity] = name_words
+    
+    def _current_name(self, kind: str, entity_id: str, location_id: Optional[str]) -> Optional[str]:
+        world_state = self.world_state
+        if kind == 'npc':
+            npc = world_state.npcs.get(entity_id)
+            return npc.name if npc else None
+        if kind == 'location':
+            location = world_state.locations.get(entity_id)
+            return location.name if location else None
+        item = world_state._items_by_location.get(location_id, {}).get(entity_id)
+        return item.name if item else None
+    
+    def metrics(self) -> Dict[str, Any]:
+        return dict(self.stats, entities=len(self.indexed), version=self.version)
+
+def _generate_world(num_npcs: int, num_locations: int = 200, seed: int = 42) -> WorldState:
+    """Génère un monde peuplé de NPCs aux noms composés (benchmark)"""
+    from src.models.game_state import Location, NPC
+    
+    rng = random.Random(seed)
+    first_names = ['Aldric', 'Brenna', 'Corwin', 'Delphine', 'Edmond', 'Fiona', 'Gaspard', 'Hélène']
+    last_names = ['le Forgeron', 'du Moulin', 'de la Tour', 'Ventfroid', 'Pierrelune', 'Corbeau']
+    locations = {
+        f"loc_{index}": Location(id=f"loc_{index}", name=f"Lieu {index}", description='', type='town')
+        for index in range(num_locations)
+    }
+    world_state = WorldState(current_location='loc_0', locations=locations)
+    for index in range(num_npcs):
+        name = f"{rng.choice(first_names)} {rng.choice(last_names)} {index}"
+        world_state.add_npc(NPC(id=f"npc_{index}", name=name, type='commoner',
+                                location=f"loc_{rng.randrange(num_locations)}", disposition='neutral'))
+    return world_state
+
+def run_benchmark(num_npcs: int = 5000, num_queries: int = 2000) -> Dict[str, Any]:
+    """Compare la recherche par sous-chaîne sur tous les NPCs et l'index des noms"""
+    import time
+    
+    world_state = _generate_world(num_npcs)
+    started = time.perf_counter()
+    gazetteer = EntityGazetteer(world_state)
+    build_ms = (time.perf_counter() - started) * 1000
+    
+    rng = random.Random(7)
+    npcs = list(world_state.npcs.values())
+    actions = [f"Je parle à {rng.choice(npcs).name} de la route du nord" for _ in range(num_queries)]
+    
+    started = time.perf_counter()
+    for action in actions:
+        action_lower = action.lower()
+        [npc.name.lower() for npc in npcs if npc.name.lower() in action_lower]
+    linear_us = (time.perf_counter() - started) * 1e6 / num_queries
+    
+    started = time.perf_counter()
+    for action in actions:
+        gazetteer.lookup(action)
+    indexed_us = (time.perf_counter() - started) * 1e6 / num_queries
+    
+    # Mise à jour incrémentale: un NPC déplacé, un NPC retiré
+    world_state.move_npc('npc_0', 'loc_1')
+    world_state.remove_npc('npc_1')
+    started = time.perf_counter()
+    gazetteer.sync()
+    sync_us = (time.perf_counter() - started) * 1e6
+    
+    return {
+        'npcs': num_npcs,
+        'queries': num_queries,
+        'build_ms': round(build_ms, 2),
+        'linear_scan_us': round(linear_us, 1),
+        'gazetteer_us': round(indexed_us, 1),
+        'sync_two_changes_us': round(sync_us, 1)
+    }
+
+if __name__ == '__main__':
+    print(json.dumps(run_benchmark(), indent=2))
@@ -1,7 +1,14 @@
 """Moteur d'Interaction - Parse et valide les actions du joueur"""
 
+import os
 import re
-from typing import Dict, List, Any
+import time
+from typing import Dict, List, Any, Optional
+
+from src.engines.action_classifier import ActionClassifier
+from src.engines.entity_gazetteer import EntityGazetteer
+from src.engines.parse_cache import ParseResultCache, context_fingerprint, normalize_action
+from src.engines.state_engine import state_engine
 
 class InteractionEngine:
     """Moteur responsable du parsing et de la validation des actions du joueur"""
@@ -16,22 +23,52 @@ class InteractionEngine:
             'magic': ['lance', 'incante', 'sort', 'magie', 'enchante', 'cast', 'spell', 'magic'],
             'social': ['persuade', 'intimide', 'négocie', 'marchande', 'séduit', 'persuade', 'intimidate', 'negotiate']
         }
+        
+        # Automate unique (types, paramètres, objets, sorts) compilé une fois
+        self.action_classifier = ActionClassifier(self.action_types)
+        
+        # Index des noms d'entités par session (mis à jour avec le monde)
+        self.gazetteers: Dict[str, EntityGazetteer] = {}
+        
+        # Cache des actions analysées (commandes répétées: "regarde", "attaque", "inventaire")
+        self.parse_cache = ParseResultCache(
+            max_entries=int(os.getenv('INTERACTION_PARSE_CACHE_SIZE', '1024')),
+            enabled=os.getenv('INTERACTION_PARSE_CACHE_ENABLED', 'true').lower() == 'true'
+        )
     
     def parse_action(self, action_text: str, context: Dict[str, Any]) -> Dict[str, Any]:
         """Parse l'action du joueur et retourne une structure d'action analysée"""
+        fingerprint = self._parse_fingerprint(context) if self.parse_cache.enabled else None
+        if fingerprint is None:
+            return self._parse_action(action_text, context)
+        
+        session_id = context.get('session', {}).get('session_id')
+        action_key = normalize_action(action_text)
+        cached = self.parse_cache.get(session_id, fingerprint, action_key)
+        if cached is not None:
+            return self._copy_parsed_action(cached, action_text)
+        
+        parsed_action = self._parse_action(action_text, context)
+        self.parse_cache.put(session_id, fingerprint, action_key, self._copy_parsed_action(parsed_action, action_text))
+        return parsed_action
+    
+    def _parse_action(self, action_text: str, context: Dict[str, Any]) -> Dict[str, Any]:
         action_lower = action_text.lower().strip()
         
+        # Type, paramètres et entités connues en un seul parcours du texte
+        classification = self.action_classifier.classify(action_lower)
+        
         # Déterminer le type d'action
-        action_type = self._determine_action_type(action_lower)
+        action_type = classification['action_type']
         
         # Déterminer la complexité
-        complexity = self._determine_complexity(action_lower, action_type, context)
+        complexity = self._determine_complexity(action_lower, action_type, context, classification)
         
         # Extraire les entités mentionnées
-        entities = self._extract_entities(action_lower, context)
+        entities = self._extract_entities(action_lower, context, classification)
         
         # Déterminer les paramètres spécifiques à l'action
-        action_parameters = self._extract_action_parameters(action_lower, action_type)
+        action_parameters = classification['parameters']
         
         # Calculer la confiance dans l'analyse
         confidence = self._calculate_confidence(action_type, entities, action_parameters)
@@ -46,6 +83,28 @@ class InteractionEngine:
             "confidence": confidence
         }
     
+    def _parse_fingerprint(self, context: Dict[str, Any]) -> Optional[tuple]:
+        """Empreinte du contexte; avec l'index des noms, la version du graphe (lieux nommés) en fait partie"""
+        fingerprint = context_fingerprint(context)
+        if fingerprint is None:
+            return None
+        gazetteer = self.get_gazetteer(context.get('session', {}).get('session_id'))
+        return fingerprint + (gazetteer.world_state.topology_version,) if gazetteer else fingerprint
+    
+    @staticmethod
+    def _copy_parsed_action(parsed_action: Dict[str, Any], action_text: str) -> Dict[str, Any]:
+        """Copie indépendante (les appelants peuvent modifier l'action analysée) avec le texte d'origine"""
+        return dict(
+            parsed_action,
+            parsed_action=action_text,
+            raw_action=action_text,
+            entities={kind: list(names) for kind, names in parsed_action['entities'].items()},
+            parameters=dict(parsed_action['parameters'])
+        )
+    
+    def get_parse_cache_metrics(self) -> Dict[str, Any]:
+        return self.parse_cache.metrics()
+    
     def validate_action(self, parsed_action: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """Valide si une action parsée est faisable dans le contexte actuel"""
         validation_result = {
@@ -75,37 +134,78 @@ class InteractionEngine:
         
         return validation_result
     
+    def process_batch(self, session_id: Optional[str], actions: Optional[List[Any]] = None,
+                      parsed_actions: Optional[List[Any]] = None, validate: bool = True,
+                      context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Analyse et/ou valide une liste d'actions (macros, rejeux, tests) avec un seul contexte de session.
+        actions: textes à analyser (puis à valider si validate); parsed_actions: actions déjà analysées
+        à valider. Les résultats suivent l'ordre de la liste; les éléments invalides sont listés à part.
+        context: contexte déjà résolu par l'appelant (routes); sinon extrait du moteur d'état.
+        """
+        started = time.perf_counter()
+        if context is None:
+            if session_id and state_engine.get_session(session_id) is None:
+                return {'success': False, 'error': 'Session non trouvée'}
+            context = state_engine.get_full_context(session_id) if session_id else {}
+        items = actions if actions is not None else parsed_actions or []
+        results = []
+        
+        for index, item in enumerate(items):
+            try:
+                if actions is not None:
+                    if not isinstance(item, str) or not item.strip():
+                        raise ValueError('Texte d\'action requis')
+                    parsed_action = self.parse_action(item, context)
+                else:
+                    if not isinstance(item, dict):
+                        raise ValueError('Action analysée requise')
+                    parsed_action = item
+                
+                result = {'index': index, 'success': True}
+                if actions is not None:
+                    result['parsed_action'] = parsed_action
+                if validate or actions is None:
+                    result['validation_result'] = self.validate_action(parsed_action, context)
+            except Exception as e:
+                result = {'index': index, 'success': False, 'error': str(e)}
+            results.append(result)
+        
+        failures = [{'index': result['index'], 'error': result['error']} for result in results if not result['success']]
+        elapsed = time.perf_counter() - started
+        return {
+            'success': not failures,
+            'results': results,
+            'failures': failures,
+            'stats': {
+                'items': len(items),
+                'succeeded': len(items) - len(failures),
+                'failed': len(failures),
+                'elapsed_ms': round(elapsed * 1000, 2),
+                'items_per_s': round(len(items) / elapsed) if elapsed > 0 else None
+            }
+        }
+    
     def _determine_action_type(self, action_lower: str) -> str:
         """Détermine le type d'action basé sur les mots-clés"""
-        type_scores = {}
-        
-        for action_type, keywords in self.action_types.items():
-            score = 0
-            for keyword in keywords:
-                if keyword in action_lower:
-                    if action_lower.startswith(keyword):
-                        score += 2
-                    else:
-                        score += 1
-            type_scores[action_type] = score
-        
-        if max(type_scores.values()) > 0:
-            return max(type_scores, key=type_scores.get)
-        
-        return 'exploration'  # Type par défaut
+        return self.action_classifier.classify(action_lower)['action_type']
     
-    def _determine_complexity(self, action_lower: str, action_type: str, context: Dict[str, Any]) -> str:
+    def _determine_complexity(self, action_lower: str, action_type: str, context: Dict[str, Any],
+                              classification: Optional[Dict[str, Any]] = None) -> str:
         """Détermine la complexité de l'action"""
+        classification = classification or self.action_classifier.classify(action_lower)
+        indicators = classification['complexity_indicators']
+        word_count = len(action_lower.split())
         complexity_indicators = {
             'simple': [
-                len(action_lower.split()) <= 3,
+                word_count <= 3,
                 action_type in ['exploration', 'inventory'],
-                'regarde' in action_lower or 'examine' in action_lower
+                'observation' in indicators
             ],
             'complex': [
-                len(action_lower.split()) > 8,
+                word_count > 8,
                 action_type in ['combat', 'magic'],
-                'simultanément' in action_lower or 'en même temps' in action_lower
+                'simultaneous' in indicators
             ]
         }
         
@@ -119,79 +219,63 @@ class InteractionEngine:
         else:
             return 'moderate'
     
-    def _extract_entities(self, action_lower: str, context: Dict[str, Any]) -> Dict[str, List[str]]:
+    def _extract_entities(self, action_lower: str, context: Dict[str, Any],
+                          classification: Optional[Dict[str, Any]] = None) -> Dict[str, List[str]]:
         """Extrait les entités mentionnées dans l'action"""
+        classification = classification or self.action_classifier.classify(action_lower)
         entities = {
             'npcs': [],
-            'objects': [],
+            'objects': classification['objects'],
             'locations': [],
-            'spells': []
+            'spells': classification['spells']
         }
         
-        # Extraire les NPCs du contexte
+        # Session connue: index des noms, limité aux NPCs et objets du lieu du joueur
+        gazetteer = self.get_gazetteer(context.get('session', {}).get('session_id'))
+        if gazetteer is not None:
+            found = gazetteer.find_entities(action_lower, gazetteer.world_state.current_location,
+                                            classification.get('words'))
+            entities['npcs'] = found['npcs']
+            entities['objects'] = entities['objects'] + [obj for obj in found['objects'] if obj not in entities['objects']]
+            entities['locations'] = found['locations']
+            return entities
+        
+        # Extraire les NPCs du contexte (ceux présents sur le lieu si l'index est disponible)
         world_state = context.get('world_state', {})
-        npcs = world_state.get('npcs', [])
+        npcs = world_state.get('npcs_here')
+        if npcs is None:
+            npcs = world_state.get('npcs', [])
         
         for npc_data in npcs:
             npc_name = npc_data.get('name', '').lower() if isinstance(npc_data, dict) else str(npc_data).lower()
             if npc_name in action_lower:
                 entities['npcs'].append(npc_name)
         
-        # Extraire les objets communs
-        common_objects = ['épée', 'bouclier', 'potion', 'clé', 'livre', 'coffre', 'porte', 'fenêtre']
-        for obj in common_objects:
-            if obj in action_lower:
-                entities['objects'].append(obj)
-        
-        # Extraire les sorts communs
-        common_spells = ['boule de feu', 'soin', 'téléportation', 'invisibilité', 'protection']
-        for spell in common_spells:
-            if spell in action_lower:
-                entities['spells'].append(spell)
-        
         return entities
     
+    def get_gazetteer(self, session_id: Optional[str]) -> Optional[EntityGazetteer]:
+        """Retourne l'index des noms d'une session (reconstruit si l'état a été rechargé)"""
+        game_state = state_engine.get_session(session_id) if session_id else None
+        if not game_state:
+            if session_id:
+                self.gazetteers.pop(session_id, None)
+            return None
+        
+        gazetteer = self.gazetteers.get(session_id)
+        if gazetteer is None or gazetteer.world_state is not game_state.world_state:
+            gazetteer = EntityGazetteer(game_state.world_state)
+            self.gazetteers[session_id] = gazetteer
+        return gazetteer
+    
+    def drop_session(self, session_id: str) -> None:
+        """Libère l'index des noms et les actions analysées d'une session"""
+        self.gazetteers.pop(session_id, None)
+        self.parse_cache.drop_session(session_id)
+    
     def _extract_action_parameters(self, action_lower: str, action_type: str) -> Dict[str, Any]:
         """Extrait les paramètres spécifiques à l'action"""
-        parameters = {}
-        
-        if action_type == 'combat':
-            if 'attaque' in action_lower:
-                parameters['attack_type'] = 'melee'
-            elif 'tire' in action_lower or 'arc' in action_lower:
-                parameters['attack_type'] = 'ranged'
-            
-            if 'défense' in action_lower or 'bloque' in action_lower:
-                parameters['defensive'] = True
-        
-        elif action_type == 'exploration':
-            if 'discrètement' in action_lower or 'silencieusement' in action_lower:
-                parameters['stealth'] = True
-            
-            if 'rapidement' in action_lower or 'vite' in action_lower:
-                parameters['speed'] = 'fast'
-        
-        elif action_type == 'dialogue':
-            if 'poliment' in action_lower or 'respectueusement' in action_lower:
-                parameters['tone'] = 'polite'
-            elif 'agressif' in action_lower or 'colère' in action_lower:
-                parameters['tone'] = 'aggressive'
-            elif 'amical' in action_lower or 'gentil' in action_lower:
-                parameters['tone'] = 'friendly'
-            elif 'persuasif' in action_lower:
-                parameters['tone'] = 'persuasive'
-            else:
-                parameters['tone'] = 'neutral'
-        
-        elif action_type == 'magic':
-            if 'puissant' in action_lower or 'fort' in action_lower:
-                parameters['power_level'] = 'high'
-            elif 'faible' in action_lower or 'léger' in action_lower:
-                parameters['power_level'] = 'low'
-            else:
-                parameters['power_level'] = 'medium'
-        
-        return parameters
+        classification = self.action_classifier.classify(action_lower)
+        return self.action_classifier.parameters_for(classification, action_type)
     
     def _calculate_confidence(self, action_type: str, entities: Dict[str, List[str]], parameters: Dict[str, Any]) -> float:
         """Calcule la confiance dans l'analyse de l'action"""
@@ -280,4 +364,49 @@ class InteractionEngine:
         validation_result['consequences'].append('Changement de réputation')
         validation_result['consequences'].append('Influence sur les relations sociales')
         
-        return validation_result
\ No newline at end of file
+        return validation_result
+
+# Instance globale
+interaction_engine = InteractionEngine()
+
+def run_batch_benchmark(num_actions: int = 50, num_npcs: int = 300, rounds: int = 20) -> Dict[str, Any]:
+    """
+    Actions par seconde: appels unitaires (contexte de session extrait à chaque action, comme
+    /parse_action puis /validate_action) contre process_batch (contexte extrait une fois).
+    Le cache des actions analysées est désactivé pour ne mesurer que l'extraction du contexte.
+    """
+    from src.engines.action_classifier import BENCHMARK_ACTIONS
+    from src.models.game_state import NPC
+    
+    engine = InteractionEngine()
+    engine.parse_cache.enabled = False
+    session_id = state_engine.create_session('Banc d\'essai')
+    for index in range(num_npcs):
+        state_engine.add_npc(session_id, NPC(id=f"npc_{index}", name=f"Villageois {index}", type='commoner',
+                                             location=f"loc_{index % 20}", disposition='neutral'))
+    actions = [BENCHMARK_ACTIONS[index % len(BENCHMARK_ACTIONS)] for index in range(num_actions)]
+    
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for action in actions:
+            parsed_action = engine.parse_action(action, state_engine.get_full_context(session_id))
+            engine.validate_action(parsed_action, state_engine.get_full_context(session_id))
+    single_elapsed = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    for _ in range(rounds):
+        engine.process_batch(session_id, actions)
+    batch_elapsed = time.perf_counter() - started
+    
+    state_engine.sessions.pop(session_id, None)
+    return {
+        'actions': num_actions,
+        'npcs': num_npcs,
+        'single_calls_per_s': round(num_actions * rounds / single_elapsed),
+        'batch_per_s': round(num_actions * rounds / batch_elapsed),
+        'speedup': round(single_elapsed / batch_elapsed, 1)
+    }
+
+if __name__ == '__main__':
+    import json
+    print(json.dumps(run_batch_benchmark(), indent=2))
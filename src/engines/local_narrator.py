@@ -0,0 +1,329 @@
+"""
+Narrateur local par gabarits - Architecture des 4 Moteurs
+Narration sans appel LLM: les gabarits narratifs sont remplis à partir de l'état du jeu
+"""
+
+import random
+import re
+from typing import Dict, List, Any, Optional, Tuple
+
+from src.utils.keyword_matcher import KeywordMatcher
+from src.utils.prompt_templates import CompiledTemplate
+
+# Ambiance selon le moment de la journée et la météo (WorldState.time_of_day / weather)
+TIME_ATMOSPHERE = {
+    'day': ["La lumière du jour éclaire les lieux.", "Le soleil baigne les environs d'une clarté franche."],
+    'night': ["L'obscurité enveloppe tout autour de vous.", "Seule la lueur des étoiles perce la nuit."],
+    'dawn': ["Les premières lueurs de l'aube teintent le ciel.", "Une brume matinale se dissipe lentement."],
+    'dusk': ["Le crépuscule allonge les ombres.", "Le ciel s'embrase des couleurs du couchant."]
+}
+WEATHER_ATMOSPHERE = {
+    'clear': ["", "L'air est calme."],
+    'rain': ["La pluie crépite sans relâche.", "Une pluie fine détrempe le sol."],
+    'storm': ["Le tonnerre gronde au loin.", "Le vent de l'orage hurle entre les pierres."],
+    'fog': ["Un brouillard épais étouffe les sons.", "La brume efface les contours du paysage."]
+}
+
+PHRASES = {
+    'discoveries': ["un détail qui vous avait échappé", "des traces récentes sur le sol", "un recoin que peu de gens remarquent"],
+    'transitions': ["Le chemin défile sous vos pas.", "Vous avancez d'un pas assuré.", "Vous progressez avec prudence."],
+    'observation_details': ["Rien ne semble laissé au hasard.", "Chaque détail mérite votre attention.", "Quelque chose attire votre regard."],
+    'implications': ["Cela pourrait vous être utile plus tard.", "Vous gardez cela en mémoire.", "Votre curiosité est piquée."],
+    'empty_place': ["Les lieux semblent déserts.", "Personne ne vous prête attention."],
+    'attacks': {'melee': "attaque", 'ranged': "tir", None: "offensive"},
+    'hit_results': ["atteint sa cible", "porte avec force", "trouve une faille dans la garde adverse"],
+    'enemy_reactions': ["recule sous le choc.", "riposte aussitôt.", "vacille mais tient bon."],
+    'battle_states': ["Le combat reste indécis.", "L'issue de l'affrontement se joue maintenant.", "Chaque seconde compte."],
+    'tactical': ["Vous jaugez votre adversaire.", "Le terrain ne laisse aucune échappatoire.", "Il faut agir vite."],
+    'greeting_styles': {
+        'friendly': "vous accueille chaleureusement",
+        'neutral': "vous salue d'un signe de tête",
+        'hostile': "vous toise avec méfiance"
+    },
+    'moods': {
+        'friendly': "Son visage s'éclaire.",
+        'neutral': "Son expression reste réservée.",
+        'hostile': "Son regard se durcit."
+    },
+    'openers': ["Que puis-je pour vous ?", "Vous cherchez quelque chose ?", "Parlez, je vous écoute."],
+    'response_styles': {
+        'friendly': "répond avec bienveillance",
+        'neutral': "répond posément",
+        'hostile': "répond sèchement"
+    },
+    'dialogues': {
+        'friendly': ["Vous êtes le bienvenu ici, voyageur.", "Ravi de vous voir ! Les nouvelles vont vite par ici.",
+                     "Si je peux vous aider, n'hésitez pas."],
+        'neutral': ["Les temps sont incertains, soyez prudent.", "Je n'en sais pas plus que ce que l'on raconte.",
+                    "Chacun ses affaires, voyageur."],
+        'hostile': ["Passez votre chemin.", "Je n'ai rien à vous dire.", "Vous feriez mieux de partir."]
+    },
+    'type_dialogues': {
+        'merchant': "Jetez donc un œil à mes marchandises.",
+        'guard': "Restez dans le droit chemin et tout ira bien."
+    },
+    'npc_reactions': {
+        'friendly': "Un sourire accompagne ses paroles.",
+        'neutral': "Votre interlocuteur attend la suite.",
+        'hostile': "Sa main ne s'éloigne pas de son arme."
+    },
+    'magical_effects': ["L'énergie arcanique crépite au bout de vos doigts.", "Des runes lumineuses tourbillonnent autour de vous.",
+                        "L'air se charge d'une puissance palpable."],
+    'environmental_impacts': ["Les ombres frémissent un instant.", "Une onde parcourt les environs.", "Le silence retombe aussitôt."],
+    'magical_backlashes': ["L'énergie se dissipe en étincelles inoffensives.", "Un vertige passager vous saisit."],
+    'persuasion_types': {
+        'intimid': "faire plier", 'négoci': "négocier", 'marchand': "marchander", 'sédui': "séduire"
+    },
+    'target_reactions': ["Votre interlocuteur pèse vos mots.", "Un silence suit votre proposition.", "Vos paroles semblent faire effet."],
+    'social_outcomes': ["Reste à voir si cela portera ses fruits.", "La situation pourrait tourner à votre avantage.",
+                        "Rien n'est encore joué."],
+    'inventory_notes': ["Vous le rangez soigneusement dans votre sac.", "Cela pourra servir."],
+    'use_effects': ["L'effet ne se fait pas attendre.", "Vous sentez la différence presque aussitôt."]
+}
+
+# Verbes reconnus par mots entiers (KeywordMatcher): 'entre' ne reconnaît pas 'rencontre'
+ACTION_WORDS = {
+    'movement': ['va', 'vais', 'aller', 'marche*', 'entre', 'entrer', 'sors', 'sortir', 'pars', 'partir',
+                 'dirige*', 'avance*', 'traverse*', 'rejoin*', 'rejoindre'],
+    'pickup': ['prend*', 'pris', 'ramasse*', 'take'],
+    'use': ['utilise*', 'use', 'bois', 'boire', 'mange*', 'équipe*', 'equip'],
+    'greeting': ['salue*', 'bonjour']
+}
+
+class LocalNarrator:
+    """
+    Narrateur sans LLM. Choisit un gabarit de `narrative_templates` selon le type d'action,
+    les entités visées et la validation, puis remplit ses emplacements à partir du contexte
+    (lieu, moment, météo, PNJ et objets présents, statistiques). Les variantes sont tirées
+    avec une graine (session, tour): une même situation produit le même texte.
+    """
+    
+    def __init__(self, narrative_templates: Dict[str, Dict[str, str]]):
+        self.templates = {
+            (action_type, name): CompiledTemplate(template)
+            for action_type, group in narrative_templates.items()
+            for name, template in group.items()
+        }
+        self.action_types = {action_type for action_type, _ in self.templates}
+        self.action_words = KeywordMatcher(ACTION_WORDS)
+    
+    def can_narrate(self, parsed_action: Dict[str, Any], validation_result: Dict[str, Any]) -> bool:
+        """Une action infaisable n'est racontée localement que si son type a un gabarit d'échec"""
+        action_type = parsed_action.get('action_type', 'exploration')
+        if action_type not in self.action_types:
+            return False
+        return validation_result.get('feasible', True) or (action_type, 'failure') in self.templates
+    
+    def narrate(self, context: Dict[str, Any], parsed_action: Dict[str, Any],
+                validation_result: Dict[str, Any]) -> Optional[str]:
+        """Narration locale de l'action, ou None si aucun gabarit ne convient"""
+        if not self.can_narrate(parsed_action, validation_result):
+            return None
+        
+        session = context.get('session', {})
+        rng = random.Random(f"{session.get('session_id', '')}:{context.get('arc_state', {}).get('total_entries', 0)}")
+        scene = self._scene(context, parsed_action, validation_result)
+        
+        template_key, values = self._select(parsed_action, validation_result, scene, rng)
+        template = self.templates.get(template_key)
+        if template is None:
+            return None
+        
+        text = template.render(values)
+        return re.sub(r'\s+', ' ', text).replace(' .', '.').strip()
+    
+    def _scene(self, context: Dict[str, Any], parsed_action: Dict[str, Any],
+               validation_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Éléments du contexte utilisés par les gabarits"""
+        world_state = context.get('world_state', {})
+        entities = parsed_action.get('entities', {})
+        npcs_here = world_state.get('npcs_here', [])
+        items_here = world_state.get('items_here', [])
+        raw_action = parsed_action.get('raw_action', '').lower()
+        
+        target_npc = next((npc for npc in npcs_here if npc.get('name', '').lower() in entities.get('npcs', [])), None)
+        target_item = next((item for item in items_here if item.get('name', '').lower() in raw_action), None)
+        location = world_state.get('current_location', {})
+        
+        return {
+            'raw_action': raw_action,
+            'action_words': set(self.action_words.find(raw_action)),
+            'target_location': self._target_location(parsed_action, location),
+            'location': location,
+            'time_of_day': world_state.get('time_of_day', 'day'),
+            'weather': world_state.get('weather', 'clear'),
+            'npcs_here': npcs_here,
+            'items_here': items_here,
+            'target_npc': target_npc,
+            'target_item': target_item,
+            'objects': entities.get('objects', []),
+            'spells': entities.get('spells', []),
+            'stats': context.get('player_stats', {}),
+            'inventory': context.get('inventory', []),
+            'recent_actions': context.get('arc_state', {}).get('recent_actions', []),
+            'warnings': validation_result.get('warnings', [])
+        }
+    
+    def _select(self, parsed_action: Dict[str, Any], validation_result: Dict[str, Any],
+                scene: Dict[str, Any], rng: random.Random) -> Tuple[Tuple[str, str], Dict[str, str]]:
+        action_type = parsed_action.get('action_type', 'exploration')
+        atmosphere = self._atmosphere(scene, rng)
+        raw_action = scene['raw_action']
+        
+        if action_type == 'combat':
+            enemy = scene['target_npc'] or next(
+                (npc for npc in scene['npcs_here'] if npc.get('disposition') == 'hostile'), None
+            )
+            enemy_name = enemy.get('name') if enemy else "votre adversaire"
+            if not scene['recent_actions'] or scene['recent_actions'][-1] != 'combat':
+                return ('combat', 'initiation'), {
+                    'enemy_description': f"{enemy_name.capitalize()} se dresse face à vous.",
+                    'tactical_situation': rng.choice(PHRASES['tactical'])
+                }
+            attack = PHRASES['attacks'].get(parsed_action.get('parameters', {}).get('attack_type'))
+            return ('combat', 'action'), {
+                'action': attack,
+                'result': rng.choice(PHRASES['hit_results']),
+                'enemy_reaction': f"{enemy_name.capitalize()} {rng.choice(PHRASES['enemy_reactions'])}",
+                'battle_state': self._battle_state(scene, rng)
+            }
+        
+        if action_type == 'dialogue':
+            npc = scene['target_npc'] or (scene['npcs_here'][0] if scene['npcs_here'] else None)
+            if npc is None:
+                return ('dialogue', 'silence'), {'atmosphere': atmosphere}
+            disposition = npc.get('disposition', 'neutral')
+            if disposition not in PHRASES['dialogues']:
+                disposition = 'neutral'
+            if 'greeting' in scene['action_words']:
+                return ('dialogue', 'greeting'), {
+                    'npc_name': npc.get('name', ''),
+                    'greeting_style': PHRASES['greeting_styles'][disposition],
+                    'npc_mood': PHRASES['moods'][disposition],
+                    'conversation_opener': f"« {rng.choice(PHRASES['openers'])} »"
+                }
+            lines = list(PHRASES['dialogues'][disposition])
+            if disposition != 'hostile' and npc.get('type') in PHRASES['type_dialogues']:
+                lines.append(PHRASES['type_dialogues'][npc.get('type')])
+            return ('dialogue', 'exchange'), {
+                'npc_name': npc.get('name', ''),
+                'response_style': PHRASES['response_styles'][disposition],
+                'dialogue': rng.choice(lines),
+                'npc_reaction': PHRASES['npc_reactions'][disposition]
+            }
+        
+        if action_type == 'magic':
+            if not validation_result.get('feasible', True):
+                reason = scene['warnings'][0] if scene['warnings'] else "La magie vous échappe"
+                return ('magic', 'failure'), {
+                    'failure_reason': f"{reason}.",
+                    'magical_backlash': rng.choice(PHRASES['magical_backlashes'])
+                }
+            return ('magic', 'casting'), {
+                'spell_name': scene['spells'][0] if scene['spells'] else "un sort",
+                'magical_effects': rng.choice(PHRASES['magical_effects']),
+                'environmental_impact': rng.choice(PHRASES['environmental_impacts'])
+            }
+        
+        if action_type == 'social':
+            persuasion_type = next(
+                (verb for stem, verb in PHRASES['persuasion_types'].items() if stem in raw_action), "convaincre"
+            )
+            target = scene['target_npc'] or (scene['npcs_here'][0] if scene['npcs_here'] else None)
+            return ('social', 'persuasion'), {
+                'persuasion_type': f"{persuasion_type} {target.get('name')}" if target else persuasion_type,
+                'target_reaction': rng.choice(PHRASES['target_reactions']),
+                'social_outcome': rng.choice(PHRASES['social_outcomes'])
+            }
+        
+        if action_type == 'inventory':
+            item = scene['target_item'] or (scene['items_here'][0] if scene['items_here'] else None)
+            if 'pickup' in scene['action_words']:
+                if item is None:
+                    return ('inventory', 'nothing'), {'atmosphere': atmosphere}
+                return ('inventory', 'pickup'), {
+                    'item': item.get('name', ''),
+                    'item_details': item.get('description', ''),
+                    'inventory_note': rng.choice(PHRASES['inventory_notes'])
+                }
+            if 'use' in scene['action_words'] and scene['objects']:
+                return ('inventory', 'use'), {
+                    'item': scene['objects'][0],
+                    'use_effect': rng.choice(PHRASES['use_effects'])
+                }
+            return ('inventory', 'check'), {'inventory_summary': self._inventory_summary(scene)}
+        
+        # Exploration (type par défaut)
+        location = scene['location']
+        location_name = location.get('name', 'les lieux')
+        if 'movement' in scene['action_words']:
+            return ('exploration', 'movement'), {
+                'destination': scene['target_location'] or f"les abords de {location_name}",
+                'transition': rng.choice(PHRASES['transitions']),
+                'new_environment': atmosphere
+            }
+        target = scene['target_npc'] or scene['target_item']
+        if target is not None or scene['objects']:
+            return ('exploration', 'observation'), {
+                'target': target.get('name') if target else scene['objects'][0],
+                'details': (target or {}).get('description') or rng.choice(PHRASES['observation_details']),
+                'implications': rng.choice(PHRASES['implications'])
+            }
+        return ('exploration', 'discovery'), {
+            'discovery': location_name if location else rng.choice(PHRASES['discoveries']),
+            'description': f"{location.get('description', '')} {self._presence(scene, rng)}",
+            'atmosphere': atmosphere
+        }
+    
+    @staticmethod
+    def _target_location(parsed_action: Dict[str, Any], location: Dict[str, Any]) -> Optional[str]:
+        """
+        Premier lieu cité dans l'action autre que le lieu actuel (entités de parse_action),
+        écrit comme le joueur l'a tapé s'il apparaît tel quel dans l'action
+        """
+        current_name = location.get('name', '').lower()
+        name = next((name for name in parsed_action.get('entities', {}).get('locations', [])
+                     if name != current_name), None)
+        if name is None:
+            return None
+        typed = re.search(re.escape(name), parsed_action.get('raw_action', ''), re.IGNORECASE)
+        return typed.group(0) if typed else name
+    
+    def _atmosphere(self, scene: Dict[str, Any], rng: random.Random) -> str:
+        time_phrases = TIME_ATMOSPHERE.get(scene['time_of_day'], TIME_ATMOSPHERE['day'])
+        weather_phrases = WEATHER_ATMOSPHERE.get(scene['weather'], WEATHER_ATMOSPHERE['clear'])
+        return f"{rng.choice(time_phrases)} {rng.choice(weather_phrases)}"
+    
+    def _presence(self, scene: Dict[str, Any], rng: random.Random) -> str:
+        """PNJ et objets visibles sur le lieu"""
+        parts = []
+        names = [npc.get('name', '') for npc in scene['npcs_here'][:3]]
+        if names:
+            parts.append(f"Vous apercevez {self._join(names)}.")
+        items = [item.get('name', '') for item in scene['items_here'][:3]]
+        if items:
+            parts.append(f"Au sol se trouve{'nt' if len(items) > 1 else ''} {self._join(items)}.")
+        return ' '.join(parts) if parts else rng.choice(PHRASES['empty_place'])
+    
+    def _battle_state(self, scene: Dict[str, Any], rng: random.Random) -> str:
+        stats = scene['stats']
+        if stats.get('max_health') and stats.get('health', 0) < stats['max_health'] * 0.3:
+            return "Vos blessures vous ralentissent dangereusement."
+        return rng.choice(PHRASES['battle_states'])
+    
+    def _inventory_summary(self, scene: Dict[str, Any]) -> str:
+        """Contenu du sac (objets et quantités)"""
+        items = [
+            f"{item.get('name', '')} (x{item['quantity']})" if item.get('quantity', 1) > 1 else item.get('name', '')
+            for item in scene['inventory'][:5]
+        ]
+        if not items:
+            return "Votre sac est vide."
+        more = len(scene['inventory']) - len(items)
+        if more > 0:
+            items.append(f"{more} autre{'s' if more > 1 else ''} objet{'s' if more > 1 else ''}")
+        return f"Votre sac contient {self._join(items)}."
+    
+    @staticmethod
+    def _join(names: List[str]) -> str:
+        return names[0] if len(names) == 1 else f"{', '.join(names[:-1])} et {names[-1]}"
@@ -0,0 +1,162 @@
+"""
+Routage des narrations par complexité - Architecture des 4 Moteurs
+Choix du palier de modèle (fournisseur, modèle, max_tokens, température) et suivi latence/coût par palier
+"""
+
+import os
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Any, Optional
+
+# Coût indicatif (USD par 1000 tokens: entrée, sortie) des modèles configurés dans LLM_PROVIDERS
+MODEL_TOKEN_COSTS = {
+    'deepseek-chat': (0.00027, 0.0011),
+    'google/gemini-2.0-flash-exp:free': (0.0, 0.0),
+    'gemini-pro': (0.0005, 0.0015),
+    'grok-beta': (0.005, 0.015)
+}
+
+COMPLEXITY_SCORES = {'simple': 0, 'moderate': 1, 'complex': 2}
+ACTION_TYPE_SCORES = {'combat': 1, 'magic': 1}
+HIGH_TENSION = 0.7
+
+# Paliers par défaut: (max_tokens, température)
+DEFAULT_TIERS = {
+    'fast': (400, 0.7),
+    'standard': (900, 0.8),
+    'premium': (2000, 0.8)
+}
+
+@dataclass
+class ModelTier:
+    """
+    Palier de modèle. provider: fournisseur préféré (None = DEFAULT_LLM_PROVIDER);
+    model: modèle à utiliser chez ce fournisseur (None = celui de LLM_PROVIDERS).
+    """
+    name: str
+    max_tokens: int
+    temperature: float
+    provider: Optional[str] = None
+    model: Optional[str] = None
+    
+    def models(self) -> Dict[str, str]:
+        """Surcharge de modèle par fournisseur (le basculement vers un autre fournisseur garde son modèle)"""
+        return {self.provider: self.model} if self.provider and self.model else {}
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'max_tokens': self.max_tokens,
+            'temperature': self.temperature,
+            'provider': self.provider,
+            'model': self.model
+        }
+
+class TierStats:
+    """Appels, latences (fenêtre glissante), tokens et coût estimé d'un palier"""
+    
+    def __init__(self, window: int = 200):
+        self.latencies = deque(maxlen=window)
+        self.calls = 0
+        self.failures = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.cost = 0.0
+        self.models: Dict[str, int] = {}
+    
+    def percentile(self, fraction: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        successes = self.calls - self.failures
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            'calls': self.calls,
+            'failures': self.failures,
+            'p50_ms': round(p50 * 1000, 1) if p50 is not None else None,
+            'p95_ms': round(p95 * 1000, 1) if p95 is not None else None,
+            'prompt_tokens': self.prompt_tokens,
+            'output_tokens': self.output_tokens,
+            'avg_output_tokens': round(self.output_tokens / successes, 1) if successes else 0.0,
+            'estimated_cost_usd': round(self.cost, 6),
+            'cost_per_call_usd': round(self.cost / successes, 6) if successes else 0.0,
+            'models': dict(self.models)
+        }
+
+class NarrativeModelRouter:
+    """
+    Associe chaque action à un palier de modèle.
+    Score = complexité (simple 0, moderate 1, complex 2) + type d'action (combat/magie +1)
+    + tension de l'arc élevée (+1). Score 0: 'fast', 1-2: 'standard', 3 et plus: 'premium'.
+    Désactivé, toutes les narrations utilisent le palier 'premium' (comportement historique).
+    """
+    
+    def __init__(self, tiers: Dict[str, ModelTier], enabled: bool = True):
+        self.tiers = tiers
+        self.enabled = enabled
+        self.stats: Dict[str, TierStats] = {name: TierStats() for name in tiers}
+        self.lock = threading.Lock()
+    
+    def score(self, parsed_action: Dict[str, Any], current_arc: Dict[str, Any]) -> int:
+        return (
+            COMPLEXITY_SCORES.get(parsed_action.get('complexity'), 1)
+            + ACTION_TYPE_SCORES.get(parsed_action.get('action_type'), 0)
+            + (1 if current_arc.get('tension_level', 0.0) >= HIGH_TENSION else 0)
+        )
+    
+    def select(self, parsed_action: Dict[str, Any], current_arc: Dict[str, Any]) -> ModelTier:
+        if not self.enabled:
+            return self.tiers['premium']
+        score = self.score(parsed_action, current_arc)
+        if score == 0:
+            return self.tiers['fast']
+        if score <= 2:
+            return self.tiers['standard']
+        return self.tiers['premium']
+    
+    def record(self, tier: ModelTier, latency: float, prompt_tokens: int = 0, output_tokens: int = 0,
+               model: Optional[str] = None, success: bool = True) -> None:
+        """Enregistre un appel du palier; le coût est estimé d'après le modèle ayant répondu"""
+        input_cost, output_cost = MODEL_TOKEN_COSTS.get(model, (0.0, 0.0))
+        with self.lock:
+            stats = self.stats[tier.name]
+            stats.calls += 1
+            stats.latencies.append(latency)
+            if not success:
+                stats.failures += 1
+                return
+            stats.prompt_tokens += prompt_tokens
+            stats.output_tokens += output_tokens
+            stats.cost += prompt_tokens / 1000 * input_cost + output_tokens / 1000 * output_cost
+            if model:
+                stats.models[model] = stats.models.get(model, 0) + 1
+    
+    def metrics(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'enabled': self.enabled,
+                'tiers': {
+                    name: dict(tier.to_dict(), **self.stats[name].to_dict())
+                    for name, tier in self.tiers.items()
+                }
+            }
+
+def load_model_tiers() -> Dict[str, ModelTier]:
+    """
+    Paliers configurés par NARRATIVE_TIER_<PALIER>_PROVIDER, _MODEL, _MAX_TOKENS et _TEMPERATURE
+    (ex: NARRATIVE_TIER_FAST_PROVIDER=openrouter)
+    """
+    tiers = {}
+    for name, (max_tokens, temperature) in DEFAULT_TIERS.items():
+        prefix = f'NARRATIVE_TIER_{name.upper()}_'
+        tiers[name] = ModelTier(
+            name=name,
+            max_tokens=int(os.getenv(prefix + 'MAX_TOKENS', str(max_tokens))),
+            temperature=float(os.getenv(prefix + 'TEMPERATURE', str(temperature))),
+            provider=os.getenv(prefix + 'PROVIDER') or None,
+            model=os.getenv(prefix + 'MODEL') or None
+        )
+    return tiers
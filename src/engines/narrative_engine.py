@@ -3,14 +3,28 @@ Moteur de Narration Avancé - Architecture des 4 Moteurs
 Génération narrative adaptative, cohérence temporelle et gestion des arcs narratifs
 """
 
+import os
 import json
 import re
-from typing import Dict, List, Any, Optional, Tuple
+import asyncio
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple, Iterator
 from datetime import datetime
 from dataclasses import asdict
 
 from src.engines.state_engine import state_engine
-from src.routes.llm import call_openai_compatible_api, call_gemini_api, LLM_PROVIDERS
+from src.engines.interaction_engine import interaction_engine
+from src.engines.speculation import SpeculativeNarrationCache, predict_next_actions
+from src.engines.local_narrator import LocalNarrator
+from src.engines.model_routing import ModelTier, NarrativeModelRouter, load_model_tiers
+from src.routes.llm import LLM_PROVIDERS, llm_router, get_failover_order
+from src.utils.prompt_templates import CompiledTemplate, StaticPromptCache
+from src.utils.keyword_matcher import KeywordMatcher
+from src.utils.prompt_budget import (
+    PromptBudgetPlanner, PromptSection, render_sections, prompt_budget_for_model, truncate_to_tokens,
+    estimate_tokens
+)
 
 class NarrativeEngine:
     """
@@ -27,54 +41,471 @@ class NarrativeEngine:
         self.style_profiles = self._load_style_profiles()
         self.arc_patterns = self._load_arc_patterns()
         
+        # Lexiques de ton et de tension, reconnus en un seul parcours de la réponse
+        self.tone_matcher = KeywordMatcher(self._load_tone_lexicons())
+        
+        # Budget de tokens des prompts (taille d'entrée maîtrisée par tour)
+        self.prompt_planner = PromptBudgetPlanner()
+        
+        # Gabarits précompilés et sections statiques rendues une fois par univers
+        self.prompt_templates = self._compile_prompt_templates()
+        self.static_prompts = StaticPromptCache(self._render_static_prompt)
+        self.prompt_stats = {
+            'prompts': 0, 'original_tokens': 0, 'planned_tokens': 0, 'static_tokens': 0,
+            'trimmed_prompts': 0, 'over_budget': 0, 'last_plan': None
+        }
+        
+        # Paliers de modèle selon la complexité de l'action, le type et la tension de l'arc
+        self.model_router = NarrativeModelRouter(
+            load_model_tiers(), enabled=os.getenv('NARRATIVE_MODEL_ROUTING', 'true').lower() == 'true'
+        )
+        
+        # Narrateur local (gabarits remplis depuis l'état du jeu): tours sans appel LLM
+        self.local_narrator = LocalNarrator(self.narrative_templates)
+        self.local_tier_mode = os.getenv('NARRATIVE_LOCAL_TIER', 'fallback').lower()
+        self.llm_turn_budget = int(os.getenv('NARRATIVE_LLM_TURN_BUDGET', '0'))
+        self.llm_turns: Dict[str, int] = {}
+        self.tier_stats = {'local': 0, 'speculation': 0, 'llm': 0, 'local_reasons': {}}
+        
+        # Pré-génération spéculative des narrations pour les actions probables du prochain tour
+        self.speculation_enabled = os.getenv('NARRATIVE_SPECULATION_ENABLED', 'false').lower() == 'true'
+        self.speculation_max = int(os.getenv('NARRATIVE_SPECULATION_MAX', '2'))
+        self.speculation_wait = float(os.getenv('NARRATIVE_SPECULATION_WAIT', '30'))
+        self.speculations = SpeculativeNarrationCache()
+        self.speculation_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='narrative-speculation')
+        
+        # Résumé glissant de l'historique (appel LLM) exécuté hors du tour du joueur
+        self.compression_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='narrative-compression')
+        
+        # Génération par lots (narrations déclenchées par le serveur pour de nombreuses sessions)
+        self.batch_concurrency = int(os.getenv('NARRATIVE_BATCH_CONCURRENCY', '8'))
+        
     def generate_narrative_response(self, session_id: str, parsed_action: Dict[str, Any], 
                                   validation_result: Dict[str, Any]) -> Dict[str, Any]:
         """
         Génère une réponse narrative adaptative basée sur l'action et l'état du jeu
         """
         try:
-            # Récupérer le contexte complet depuis le moteur d'état
-            context = state_engine.get_full_context(session_id)
-            
-            # Analyser l'arc narratif actuel
-            current_arc = self._analyze_current_arc(context)
+            context, current_arc, narrative_style = self._prepare_narrative(session_id, parsed_action)
             
-            # Déterminer le style narratif approprié
-            narrative_style = self._determine_narrative_style(context, parsed_action)
+            # Narrateur local, narration anticipée, sinon génération via LLM
+            llm_response = self._local_narrative(session_id, context, parsed_action, validation_result)
+            if llm_response is None:
+                llm_response = self._speculated_narrative(session_id, context, parsed_action)
+            if llm_response is None:
+                tier = self.model_router.select(parsed_action, current_arc)
+                narrative_messages = self._build_narrative_prompt(
+                    context, parsed_action, validation_result, current_arc, narrative_style, tier
+                )
+                try:
+                    llm_response = self._generate_llm_response(narrative_messages, context, tier)
+                    self._record_llm_turn(session_id)
+                except Exception:
+                    llm_response = self._local_narrative(session_id, context, parsed_action, validation_result,
+                                                         llm_failed=True)
+                    if llm_response is None:
+                        raise
             
-            # Construire le prompt narratif
-            narrative_prompt = self._build_narrative_prompt(
-                context, parsed_action, validation_result, current_arc, narrative_style
+            return self._finalize_narrative(
+                session_id, llm_response, context, parsed_action, current_arc, narrative_style
             )
             
-            # Générer la réponse via LLM
-            llm_response = self._generate_llm_response(narrative_prompt, context)
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f'Erreur dans la génération narrative: {str(e)}',
+                'fallback_response': self._generate_fallback_response(parsed_action)
+            }
+    
+    async def agenerate_narrative_response(self, session_id: str, parsed_action: Dict[str, Any],
+                                           validation_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Variante asynchrone: l'appel LLM n'occupe pas de thread pendant l'attente du fournisseur"""
+        try:
+            context, current_arc, narrative_style = self._prepare_narrative(session_id, parsed_action)
             
-            # Post-traiter la réponse
-            processed_response = self._post_process_narrative(llm_response, context, parsed_action)
+            llm_response = self._local_narrative(session_id, context, parsed_action, validation_result)
+            if llm_response is None:
+                llm_response = await self._aspeculated_narrative(session_id, context, parsed_action)
+            if llm_response is None:
+                tier = self.model_router.select(parsed_action, current_arc)
+                narrative_messages = self._build_narrative_prompt(
+                    context, parsed_action, validation_result, current_arc, narrative_style, tier
+                )
+                try:
+                    llm_response = await self._agenerate_llm_response(narrative_messages, context, tier)
+                    self._record_llm_turn(session_id)
+                except Exception:
+                    llm_response = self._local_narrative(session_id, context, parsed_action, validation_result,
+                                                         llm_failed=True)
+                    if llm_response is None:
+                        raise
             
-            # Mettre à jour l'arc narratif
-            self._update_narrative_arc(session_id, processed_response, parsed_action)
+            return self._finalize_narrative(
+                session_id, llm_response, context, parsed_action, current_arc, narrative_style
+            )
             
+        except Exception as e:
             return {
-                'success': True,
-                'narrative_response': processed_response['text'],
-                'narrative_metadata': {
-                    'style': narrative_style,
-                    'arc_phase': current_arc['phase'],
-                    'tension_level': processed_response['tension_level'],
-                    'emotional_tone': processed_response['emotional_tone'],
-                    'suggested_consequences': processed_response.get('consequences', [])
-                }
+                'success': False,
+                'error': f'Erreur dans la génération narrative: {str(e)}',
+                'fallback_response': self._generate_fallback_response(parsed_action)
             }
+    
+    def stream_narrative_response(self, session_id: str, parsed_action: Dict[str, Any],
+                                  validation_result: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        Variante en streaming: produit des événements {'type': 'token'} au fil de la génération,
+        puis un événement {'type': 'done'} contenant la réponse post-traitée et ses métadonnées
+        """
+        try:
+            context, current_arc, narrative_style = self._prepare_narrative(session_id, parsed_action)
+            
+            chunks = []
+            for token in self._narrative_tokens(session_id, context, parsed_action, validation_result,
+                                                current_arc, narrative_style):
+                # Les espaces de tête sont retirés comme dans le post-traitement final
+                if not chunks:
+                    token = token.lstrip()
+                    if not token:
+                        continue
+                chunks.append(token)
+                yield {'type': 'token', 'text': token}
+            
+            result = self._finalize_narrative(
+                session_id, ''.join(chunks), context, parsed_action, current_arc, narrative_style
+            )
+            yield dict(result, type='done')
             
         except Exception as e:
-            return {
+            yield {
+                'type': 'error',
                 'success': False,
                 'error': f'Erreur dans la génération narrative: {str(e)}',
                 'fallback_response': self._generate_fallback_response(parsed_action)
             }
     
+    def generate_narrative_batch(self, items: List[Dict[str, Any]],
+                                 max_concurrency: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Génère les narrations de nombreuses sessions en parallèle (au plus max_concurrency à la fois).
+        Chaque élément: session_id, parsed_action (ou action: texte à analyser), validation_result optionnel.
+        Les éléments d'une même session sont traités dans l'ordre, l'un après l'autre.
+        Les résultats suivent l'ordre des éléments; les échecs sont aussi listés à part.
+        """
+        started = time.perf_counter()
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        
+        by_session: Dict[Any, List[int]] = {}
+        for index, item in enumerate(items):
+            by_session.setdefault(item.get('session_id'), []).append(index)
+        
+        def run_session(indexes: List[int]) -> None:
+            for index in indexes:
+                results[index] = dict(self._generate_batch_item(items[index]), index=index)
+        
+        # max_concurrency ne peut que réduire le parallélisme configuré (NARRATIVE_BATCH_CONCURRENCY)
+        workers = max(1, min(max_concurrency or self.batch_concurrency, self.batch_concurrency, len(by_session)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='narrative-batch') as pool:
+            list(pool.map(run_session, by_session.values()))
+        
+        failures = [
+            {'index': result['index'], 'session_id': result.get('session_id'), 'error': result.get('error')}
+            for result in results if not result.get('success')
+        ]
+        return {
+            'success': not failures,
+            'results': results,
+            'failures': failures,
+            'stats': {
+                'items': len(items),
+                'sessions': len(by_session),
+                'succeeded': len(items) - len(failures),
+                'failed': len(failures),
+                'concurrency': workers,
+                'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+            }
+        }
+    
+    def _generate_batch_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        session_id = item.get('session_id')
+        if not session_id or state_engine.get_session(session_id) is None:
+            return {'success': False, 'session_id': session_id, 'error': 'Session non trouvée'}
+        
+        try:
+            parsed_action = item.get('parsed_action')
+            validation_result = item.get('validation_result')
+            if not parsed_action or not validation_result:
+                context = state_engine.get_full_context(session_id)
+                if not parsed_action:
+                    if not item.get('action'):
+                        return {'success': False, 'session_id': session_id, 'error': 'Action requise'}
+                    parsed_action = interaction_engine.parse_action(item['action'], context)
+                if not validation_result:
+                    validation_result = interaction_engine.validate_action(parsed_action, context)
+            
+            result = self.generate_narrative_response(session_id, parsed_action, validation_result)
+        except Exception as e:
+            result = {'success': False, 'error': f'Erreur dans la génération narrative: {str(e)}'}
+        return dict(result, session_id=session_id)
+    
+    def _narrative_tokens(self, session_id: str, context: Dict[str, Any], parsed_action: Dict[str, Any],
+                          validation_result: Dict[str, Any], current_arc: Dict[str, Any],
+                          narrative_style: str) -> Iterator[str]:
+        """Tokens de la narration: texte local ou anticipé d'un bloc, sinon flux du LLM"""
+        narration = self._local_narrative(session_id, context, parsed_action, validation_result)
+        if narration is None:
+            narration = self._speculated_narrative(session_id, context, parsed_action)
+        if narration is not None:
+            yield narration
+            return
+        
+        tier = self.model_router.select(parsed_action, current_arc)
+        narrative_messages = self._build_narrative_prompt(
+            context, parsed_action, validation_result, current_arc, narrative_style, tier
+        )
+        streamed = False
+        try:
+            for token in self._stream_llm_response(narrative_messages, context, tier):
+                streamed = True
+                yield token
+        except Exception:
+            # Narration locale seulement si aucun token n'a encore été envoyé
+            narration = None if streamed else self._local_narrative(
+                session_id, context, parsed_action, validation_result, llm_failed=True
+            )
+            if narration is None:
+                raise
+            yield narration
+            return
+        self._record_llm_turn(session_id)
+    
+    def _prepare_narrative(self, session_id: str,
+                           parsed_action: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any], str]:
+        """Récupère le contexte, analyse l'arc et détermine le style narratif"""
+        # Récupérer le contexte complet depuis le moteur d'état
+        context = state_engine.get_full_context(session_id)
+        
+        # Analyser l'arc narratif actuel
+        current_arc = self._analyze_current_arc(context)
+        
+        # Déterminer le style narratif approprié
+        narrative_style = self._determine_narrative_style(context, parsed_action)
+        
+        return context, current_arc, narrative_style
+    
+    def _finalize_narrative(self, session_id: str, llm_response: str, context: Dict[str, Any],
+                            parsed_action: Dict[str, Any], current_arc: Dict[str, Any],
+                            narrative_style: str) -> Dict[str, Any]:
+        """Post-traite la réponse complète et met à jour l'arc narratif"""
+        # Post-traiter la réponse
+        processed_response = self._post_process_narrative(llm_response, context, parsed_action)
+        
+        # Enregistrer le tour (met à jour l'état d'arc) et compresser l'historique si nécessaire
+        self._record_turn(session_id, parsed_action, processed_response)
+        
+        # Mettre à jour l'arc narratif
+        self._update_narrative_arc(session_id, processed_response, parsed_action)
+        
+        # Anticiper les prochaines actions pendant que le joueur lit la réponse
+        if self.speculation_enabled:
+            self._schedule_speculation(session_id)
+        
+        return {
+            'success': True,
+            'narrative_response': processed_response['text'],
+            'narrative_metadata': {
+                'style': narrative_style,
+                'arc_phase': current_arc['phase'],
+                'tension_level': processed_response['tension_level'],
+                'emotional_tone': processed_response['emotional_tone'],
+                'suggested_consequences': processed_response.get('consequences', [])
+            }
+        }
+    
+    def _local_tier_reason(self, session_id: str, parsed_action: Dict[str, Any],
+                           validation_result: Dict[str, Any]) -> Optional[str]:
+        """
+        Raison de narrer localement plutôt que via LLM, ou None.
+        NARRATIVE_LOCAL_TIER: 'off', 'fallback' (budget LLM épuisé ou aucun fournisseur disponible),
+        'simple' (fallback + actions simples et faisables) ou 'always'
+        """
+        if self.local_tier_mode == 'off' or not self.local_narrator.can_narrate(parsed_action, validation_result):
+            return None
+        if self.local_tier_mode == 'always':
+            return 'always'
+        if self.llm_turn_budget and self.llm_turns.get(session_id, 0) >= self.llm_turn_budget:
+            return 'budget'
+        if not llm_router.has_available_provider():
+            return 'unavailable'
+        if (self.local_tier_mode == 'simple' and parsed_action.get('complexity') == 'simple'
+                and validation_result.get('feasible', True)):
+            return 'simple'
+        return None
+    
+    def _local_narrative(self, session_id: str, context: Dict[str, Any], parsed_action: Dict[str, Any],
+                         validation_result: Dict[str, Any], llm_failed: bool = False) -> Optional[str]:
+        """Narration par gabarits si le tier local s'applique (ou si l'appel LLM a échoué)"""
+        if llm_failed:
+            reason = 'llm_error' if self.local_tier_mode != 'off' else None
+        else:
+            reason = self._local_tier_reason(session_id, parsed_action, validation_result)
+        if reason is None:
+            return None
+        
+        narration = self.local_narrator.narrate(context, parsed_action, validation_result)
+        if narration is not None:
+            reasons = self.tier_stats['local_reasons']
+            reasons[reason] = reasons.get(reason, 0) + 1
+            self.tier_stats['local'] += 1
+        return narration
+    
+    def _record_llm_turn(self, session_id: str) -> None:
+        self.llm_turns[session_id] = self.llm_turns.get(session_id, 0) + 1
+        self.tier_stats['llm'] += 1
+    
+    def get_tier_metrics(self) -> Dict[str, Any]:
+        """Répartition des tours entre narrateur local, narrations anticipées et LLM"""
+        turns = self.tier_stats['local'] + self.tier_stats['speculation'] + self.tier_stats['llm']
+        return dict(
+            self.tier_stats,
+            local_reasons=dict(self.tier_stats['local_reasons']),
+            mode=self.local_tier_mode,
+            llm_turn_budget=self.llm_turn_budget,
+            local_share=self.tier_stats['local'] / turns if turns else 0.0
+        )
+    
+    def _speculation_version(self, context: Dict[str, Any]) -> Tuple:
+        """Version d'état pour laquelle une narration anticipée reste valable"""
+        return (
+            context.get('arc_state', {}).get('total_entries', 0),
+            context.get('player', {}).get('current_location'),
+            context.get('session', {}).get('game_time')
+        )
+    
+    def _schedule_speculation(self, session_id: str) -> None:
+        """Lance en arrière-plan la génération des narrations pour les actions les plus probables"""
+        context = state_engine.get_full_context(session_id)
+        if not context:
+            return
+        
+        version = self._speculation_version(context)
+        for action_text in predict_next_actions(context, list(interaction_engine.action_types), self.speculation_max):
+            parsed_action = interaction_engine.parse_action(action_text, context)
+            validation_result = interaction_engine.validate_action(parsed_action, context)
+            # Inutile d'anticiper ce que le narrateur local produira sans LLM
+            if self._local_tier_reason(session_id, parsed_action, validation_result) is not None:
+                continue
+            future = self.speculations.reserve(session_id, version, parsed_action)
+            if future is not None:
+                self.speculation_executor.submit(self._speculate, future, context, parsed_action, validation_result)
+    
+    def _speculate(self, future: Future, context: Dict[str, Any], parsed_action: Dict[str, Any],
+                   validation_result: Dict[str, Any]) -> None:
+        try:
+            current_arc = self._analyze_current_arc(context)
+            narrative_style = self._determine_narrative_style(context, parsed_action)
+            tier = self.model_router.select(parsed_action, current_arc)
+            messages = self._build_narrative_prompt(
+                context, parsed_action, validation_result, current_arc, narrative_style, tier
+            )
+            llm_response = self._generate_llm_response(messages, context, tier)
+            tokens = sum(estimate_tokens(message['content']) for message in messages) + estimate_tokens(llm_response)
+            future.set_result((llm_response, tokens))
+        except Exception as e:
+            self.speculations.record_failure()
+            future.set_exception(e)
+    
+    def _take_speculation(self, session_id: str, parsed_action: Dict[str, Any],
+                          context: Dict[str, Any]) -> Optional[Future]:
+        if not self.speculation_enabled:
+            return None
+        return self.speculations.take(session_id, self._speculation_version(context), parsed_action)
+    
+    def _speculated_narrative(self, session_id: str, context: Dict[str, Any],
+                              parsed_action: Dict[str, Any]) -> Optional[str]:
+        """Narration anticipée correspondant à l'action (attend la fin si elle est en cours); None sinon"""
+        speculation = self._take_speculation(session_id, parsed_action, context)
+        if speculation is None:
+            return None
+        try:
+            llm_response, tokens = speculation.result(timeout=self.speculation_wait)
+        except Exception:
+            return None
+        self.speculations.record_served(tokens)
+        self.llm_turns[session_id] = self.llm_turns.get(session_id, 0) + 1
+        self.tier_stats['speculation'] += 1
+        return llm_response
+    
+    async def _aspeculated_narrative(self, session_id: str, context: Dict[str, Any],
+                                     parsed_action: Dict[str, Any]) -> Optional[str]:
+        speculation = self._take_speculation(session_id, parsed_action, context)
+        if speculation is None:
+            return None
+        try:
+            llm_response, tokens = await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(speculation)), self.speculation_wait
+            )
+        except Exception:
+            return None
+        self.speculations.record_served(tokens)
+        self.llm_turns[session_id] = self.llm_turns.get(session_id, 0) + 1
+        self.tier_stats['speculation'] += 1
+        return llm_response
+    
+    def get_speculation_metrics(self) -> Dict[str, Any]:
+        """Taux de succès et tokens gaspillés de la pré-génération spéculative"""
+        return dict(self.speculations.metrics(), enabled=self.speculation_enabled,
+                    max_per_turn=self.speculation_max)
+    
+    def _record_turn(self, session_id: str, parsed_action: Dict[str, Any],
+                     processed_response: Dict[str, Any]) -> None:
+        """
+        Ajoute l'action et la réponse à l'historique; résumé glissant tous les compression_threshold
+        ajouts, en arrière-plan (ni le tour ni la boucle asynchrone n'attendent le LLM de résumé)
+        """
+        state_engine.add_narrative_entry(session_id, {
+            'type': 'user_action',
+            'content': parsed_action.get('raw_action', ''),
+            'metadata': {'parsed': {'action_type': parsed_action.get('action_type', 'exploration')}}
+        })
+        state_engine.add_narrative_entry(session_id, {
+            'type': 'narrative_response',
+            'content': processed_response['text'],
+            'metadata': {
+                'tension_level': processed_response['tension_level'],
+                'emotional_tone': processed_response['emotional_tone']
+            }
+        })
+        state_engine.commit_turn(session_id)
+        
+        if state_engine.needs_compression(session_id):
+            state_engine.schedule_compression(session_id, self._summarize_history, self.compression_executor)
+    
+    def _summarize_history(self, previous_summary: str, entries: List[Dict[str, Any]]) -> str:
+        """Résumé LLM des entrées les plus anciennes, fusionné avec le résumé précédent"""
+        transcript = "\n".join(
+            f"{'Joueur' if entry['type'] == 'user_action' else 'MJ'}: {truncate_to_tokens(entry['content'], 120)}"
+            for entry in entries if entry['type'] in ('user_action', 'narrative_response')
+        )
+        prompt = f"""Résume l'aventure en 5 phrases maximum, au passé, en conservant les faits importants
+(lieux, personnages, objets, décisions, conséquences). Pas de style, uniquement les faits.
+
+RÉSUMÉ PRÉCÉDENT:
+{previous_summary or 'Aucun'}
+
+NOUVEAUX ÉVÉNEMENTS:
+{transcript}
+
+Résumé:"""
+        response = llm_router.complete(
+            [{"role": "user", "content": prompt}],
+            300,
+            0.3,
+            preferred=self._get_default_provider(),
+            fallback_order=get_failover_order()
+        )
+        return response.get('response', '').strip()
+    
     def _load_narrative_templates(self) -> Dict[str, Any]:
         """Charge les templates narratifs pour différents types d'actions"""
         return {
@@ -91,7 +522,8 @@ class NarrativeEngine:
             'dialogue': {
                 'greeting': "{npc_name} {greeting_style}. {npc_mood} {conversation_opener}",
                 'exchange': "{npc_name} {response_style} : \"{dialogue}\" {npc_reaction}",
-                'conclusion': "La conversation {conclusion_type}. {relationship_change} {future_implications}"
+                'conclusion': "La conversation {conclusion_type}. {relationship_change} {future_implications}",
+                'silence': "Vos paroles restent sans réponse. {atmosphere}"
             },
             'magic': {
                 'casting': "Vous invoquez {spell_name}. {magical_effects} {environmental_impact}",
@@ -102,9 +534,36 @@ class NarrativeEngine:
                 'persuasion': "Vous tentez de {persuasion_type}. {target_reaction} {social_outcome}",
                 'reputation': "Votre réputation {reputation_change}. {social_consequences}",
                 'relationship': "Votre relation avec {target} {relationship_change}."
+            },
+            'inventory': {
+                'pickup': "Vous ramassez {item}. {item_details} {inventory_note}",
+                'use': "Vous utilisez {item}. {use_effect}",
+                'check': "Vous faites le point sur votre équipement. {inventory_summary}",
+                'nothing': "Il n'y a rien à ramasser ici. {atmosphere}"
             }
         }
     
+    def _load_tone_lexicons(self) -> Dict[str, List[str]]:
+        """Lexiques d'analyse des réponses ('*' final: toutes les formes commençant par ce préfixe)"""
+        return {
+            'positive': [
+                'succès', 'réussi*', 'victoire*', 'victorieu*', 'joie', 'joyeu*', 'espoir*', 'triomph*',
+                'soulag*', 'sourire*', 'rire*', 'paix', 'paisible*', 'chaleureu*', 'bonheur', 'heureu*',
+                'gloire', 'glorieu*', 'récompense*', 'trésor*', 'allié*', 'amitié*', 'guéri*', 'lumineu*'
+            ],
+            'negative': [
+                'échec*', 'échou*', 'défaite*', 'vaincu*', 'peur*', 'effroi', 'terreur*', 'terrifi*',
+                'danger*', 'mort', 'morte', 'mortes', 'morts', 'mourir', 'meurt*', 'mortel*', 'sang', 'sanglant*',
+                'blessure*', 'blessé*', 'douleur*', 'désespoir', 'trahi*', 'maudit*', 'malédiction*',
+                'sombre*', 'ruine*', 'perdu*', 'cri', 'cris', 'hurle*'
+            ],
+            'tension': [
+                'danger*', 'combat*', 'mort', 'morte', 'mortes', 'mortel*', 'peur*', 'urgence*', 'urgent*',
+                'menace*', 'attaque*', 'assaut*', 'embuscade*', 'piège*', 'ennemi*', 'lame*', 'épée*',
+                'sang', 'cri', 'cris', 'hurle*', 'fuir', 'fuite*', 'soudain*', 'tremble*', 'alerte*'
+            ]
+        }
+    
     def _load_style_profiles(self) -> Dict[str, Any]:
         """Charge les profils de style narratif"""
         return {
@@ -170,10 +629,12 @@ class NarrativeEngine:
         }
     
     def _analyze_current_arc(self, context: Dict[str, Any]) -> Dict[str, Any]:
-        """Analyse l'arc narratif actuel basé sur l'historique"""
-        narrative_history = context.get('narrative_history', [])
-        
-        if not narrative_history:
+        """Analyse l'arc narratif actuel à partir de l'état d'arc incrémental de la session"""
+        return self._arc_from_state(context.get('arc_state'))
+    
+    def _arc_from_state(self, arc_state: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Type, phase, progression et tension de l'arc en O(1) (compteurs maintenus par le moteur d'état)"""
+        if not arc_state or not arc_state.get('total_entries'):
             return {
                 'type': 'exploration',
                 'phase': 'departure',
@@ -181,23 +642,21 @@ class NarrativeEngine:
                 'tension_level': 0.3
             }
         
-        # Analyser les patterns dans l'historique
-        action_types = [entry.get('parsed', {}).get('action_type', 'exploration') 
-                       for entry in narrative_history if entry.get('type') == 'user_action']
-        
-        # Déterminer le type d'arc basé sur les actions dominantes
-        arc_type = self._determine_arc_type(action_types)
+        # Déterminer le type d'arc basé sur l'action dominante
+        arc_type = self._arc_type_for_action(arc_state.get('dominant_action'))
         
         # Calculer la progression dans l'arc
-        progress = min(len(narrative_history) / 20.0, 1.0)  # 20 actions = arc complet
+        progress = min(arc_state['total_entries'] / 20.0, 1.0)  # 20 actions = arc complet
         
-        # Déterminer la phase actuelle
-        arc_pattern = self.arc_patterns[arc_type]
-        phase_index = int(progress * len(arc_pattern['phases']))
-        current_phase = arc_pattern['phases'][min(phase_index, len(arc_pattern['phases']) - 1)]
+        # Déterminer la phase actuelle (une transition d'arc peut l'avoir avancée)
+        phases = self.arc_patterns[arc_type]['phases']
+        phase_index = min(int(progress * len(phases)), len(phases) - 1)
+        if arc_state.get('phase') in phases:
+            phase_index = max(phase_index, phases.index(arc_state['phase']))
+        current_phase = phases[phase_index]
         
         # Calculer le niveau de tension
-        tension_level = self._calculate_tension_level(progress, current_phase, action_types)
+        tension_level = self._calculate_tension_level(progress, current_phase, arc_state.get('recent_actions', []))
         
         return {
             'type': arc_type,
@@ -206,17 +665,8 @@ class NarrativeEngine:
             'tension_level': tension_level
         }
     
-    def _determine_arc_type(self, action_types: List[str]) -> str:
-        """Détermine le type d'arc narratif basé sur les actions"""
-        if not action_types:
-            return 'exploration'
-        
-        action_counts = {}
-        for action_type in action_types:
-            action_counts[action_type] = action_counts.get(action_type, 0) + 1
-        
-        dominant_action = max(action_counts, key=action_counts.get)
-        
+    def _arc_type_for_action(self, dominant_action: Optional[str]) -> str:
+        """Type d'arc associé à l'action dominante"""
         if dominant_action == 'combat':
             return 'hero_journey'
         elif dominant_action == 'dialogue':
@@ -266,60 +716,128 @@ class NarrativeEngine:
         
         return base_style
     
+    def _compile_prompt_templates(self) -> Dict[str, CompiledTemplate]:
+        """Gabarits du prompt narratif, analysés une seule fois"""
+        return {
+            'static': CompiledTemplate("""Tu es un Maître du Jeu expert pour un RPG {universe}.
+
+INSTRUCTIONS:
+1. Génère une réponse narrative immersive de 2-3 paragraphes
+2. Respecte le style narratif demandé
+3. Intègre les conséquences de l'action
+4. Maintiens la cohérence avec l'historique
+5. Adapte le niveau de tension à la phase narrative
+6. Termine par une question ou situation qui invite à l'action"""),
+            'style': CompiledTemplate("""- Ton: {tone}
+- Vocabulaire: {vocabulary}
+- Rythme: {pacing}
+- Perspective: {perspective}"""),
+            'context': CompiledTemplate("""- Joueur: {player_name} (Niveau {level})
+- Lieu actuel: {location_name}
+- PNJ présents: {npcs_here}
+- Arc narratif: {arc_type} - Phase: {arc_phase}
+- Niveau de tension: {tension_level:.1f}/1.0"""),
+            'action': CompiledTemplate("""Type: {action_type}
+Action: {raw_action}
+Complexité: {complexity}
+Entités impliquées: {entities}"""),
+            'validation': CompiledTemplate("""Faisabilité: {feasible}
+Conséquences: {consequences}""")
+        }
+    
+    def _render_static_prompt(self, universe: str) -> str:
+        """
+        Sections invariantes (rôle, consignes): rendues une fois par univers.
+        Le style, qui varie d'une action à l'autre, reste dans le message utilisateur.
+        """
+        return self.prompt_templates['static'].render({'universe': universe})
+    
     def _build_narrative_prompt(self, context: Dict[str, Any], parsed_action: Dict[str, Any], 
                                validation_result: Dict[str, Any], current_arc: Dict[str, Any], 
-                               narrative_style: str) -> str:
-        """Construit le prompt pour la génération narrative"""
+                               narrative_style: str, tier: ModelTier) -> List[Dict[str, str]]:
+        """
+        Construit les messages de la génération narrative (budget selon le palier qui répondra):
+        - message système: sections statiques mises en cache, préfixe identique d'un tour
+          à l'autre (réutilisable par le cache de prompt des fournisseurs)
+        - message utilisateur: sections dynamiques, ajustées au budget de tokens restant
+        """
         
         # Informations de base
         session = context.get('session', {})
         player = context.get('player', {})
         world_state = context.get('world_state', {})
+        entities = parsed_action.get('entities', {})
         
-        # Contexte narratif récent
-        recent_history = self._get_recent_narrative_context(context, 3)
+        static_prompt, static_tokens = self.static_prompts.get((session.get('universe', 'fantasy'),))
         
-        # Style et arc
-        style_profile = self.style_profiles.get(narrative_style, self.style_profiles['epic'])
+        # Sections par priorité: 0 = obligatoire, plus élevé = réduit en premier
+        sections = [
+            PromptSection('style', self.prompt_templates['style'].render(
+                self.style_profiles.get(narrative_style, self.style_profiles['epic'])
+            ), header=f"STYLE NARRATIF ({narrative_style}):"),
+            PromptSection('context', self.prompt_templates['context'].render({
+                'player_name': player.get('name', 'Aventurier'),
+                'level': player.get('level', 1),
+                'location_name': world_state.get('current_location', {}).get('name', 'Lieu inconnu'),
+                # PNJ présents sur le lieu (index spatial du moteur d'état)
+                'npcs_here': ', '.join(npc.get('name', '') for npc in world_state.get('npcs_here', [])) or 'Aucun',
+                'arc_type': current_arc['type'],
+                'arc_phase': current_arc['phase'],
+                'tension_level': current_arc['tension_level']
+            }), header="CONTEXTE DU JEU:"),
+            PromptSection('summary', context.get('narrative_summary', ''), priority=2, strategy='truncate',
+                          min_tokens=30, header="RÉSUMÉ DE L'AVENTURE:"),
+            # Contexte narratif récent (réduit par le planificateur si le budget l'exige)
+            PromptSection('history', self._get_recent_narrative_context(context, 8), priority=3,
+                          strategy='lines', min_tokens=15, header="HISTORIQUE RÉCENT:"),
+            PromptSection('action', self.prompt_templates['action'].render({
+                'action_type': parsed_action.get('action_type', 'exploration'),
+                'raw_action': parsed_action.get('raw_action', ''),
+                'complexity': parsed_action.get('complexity', 'simple'),
+                'entities': ', '.join(entities.get('npcs', []) + entities.get('objects', []))
+            }), header="ACTION DU JOUEUR:"),
+            PromptSection('validation', self.prompt_templates['validation'].render({
+                'feasible': validation_result.get('feasible', True),
+                'consequences': ', '.join(validation_result.get('consequences', []))
+            }), priority=1, strategy='truncate', min_tokens=10, header="VALIDATION:"),
+            PromptSection('cue', "Réponse narrative:")
+        ]
         
-        prompt = f"""Tu es un Maître du Jeu expert pour un RPG {session.get('universe', 'fantasy')}. 
-
-CONTEXTE DU JEU:
-- Joueur: {player.get('name', 'Aventurier')} (Niveau {player.get('level', 1)})
-- Lieu actuel: {world_state.get('current_location', {}).get('name', 'Lieu inconnu')}
-- Arc narratif: {current_arc['type']} - Phase: {current_arc['phase']}
-- Niveau de tension: {current_arc['tension_level']:.1f}/1.0
-
-STYLE NARRATIF ({narrative_style}):
-- Ton: {style_profile['tone']}
-- Vocabulaire: {style_profile['vocabulary']}
-- Rythme: {style_profile['pacing']}
-- Perspective: {style_profile['perspective']}
-
-HISTORIQUE RÉCENT:
-{recent_history}
-
-ACTION DU JOUEUR:
-Type: {parsed_action.get('action_type', 'exploration')}
-Action: {parsed_action.get('raw_action', '')}
-Complexité: {parsed_action.get('complexity', 'simple')}
-Entités impliquées: {', '.join(parsed_action.get('entities', {}).get('npcs', []) + parsed_action.get('entities', {}).get('objects', []))}
-
-VALIDATION:
-Faisabilité: {validation_result.get('feasible', True)}
-Conséquences: {', '.join(validation_result.get('consequences', []))}
-
-INSTRUCTIONS:
-1. Génère une réponse narrative immersive de 2-3 paragraphes
-2. Respecte le style narratif demandé
-3. Intègre les conséquences de l'action
-4. Maintiens la cohérence avec l'historique
-5. Adapte le niveau de tension à la phase narrative
-6. Termine par une question ou situation qui invite à l'action
-
-Réponse narrative:"""
-
-        return prompt
+        planned, report = self.prompt_planner.plan(sections, max(0, self._get_prompt_budget(tier) - static_tokens))
+        self._record_prompt_plan(report, static_tokens)
+        
+        return [
+            {"role": "system", "content": static_prompt},
+            {"role": "user", "content": render_sections(planned)}
+        ]
+    
+    def _get_prompt_budget(self, tier: ModelTier) -> int:
+        """Budget d'entrée selon le modèle du palier chez le fournisseur sollicité en premier et sa sortie maximale"""
+        try:
+            provider, provider_config = self._get_llm_provider(self._tier_provider(tier))
+            model = tier.models().get(provider) or provider_config.get('model')
+        except Exception:
+            model = None
+        return prompt_budget_for_model(model, tier.max_tokens)
+    
+    def _record_prompt_plan(self, report: Dict[str, Any], static_tokens: int = 0) -> None:
+        stats = self.prompt_stats
+        stats['prompts'] += 1
+        stats['static_tokens'] += static_tokens
+        stats['original_tokens'] += report['original_tokens'] + static_tokens
+        stats['planned_tokens'] += report['planned_tokens'] + static_tokens
+        stats['trimmed_prompts'] += 1 if report['trimmed_tokens'] else 0
+        stats['over_budget'] += 1 if report['over_budget'] else 0
+        stats['last_plan'] = dict(report, static_tokens=static_tokens)
+    
+    def get_prompt_metrics(self) -> Dict[str, Any]:
+        """Statistiques de budget des prompts narratifs"""
+        stats = dict(self.prompt_stats)
+        prompts = stats['prompts']
+        stats['avg_planned_tokens'] = stats['planned_tokens'] / prompts if prompts else 0.0
+        stats['avg_saved_tokens'] = (stats['original_tokens'] - stats['planned_tokens']) / prompts if prompts else 0.0
+        stats['static_prompt_cache'] = self.static_prompts.metrics()
+        return stats
     
     def _get_recent_narrative_context(self, context: Dict[str, Any], num_entries: int) -> str:
         """Récupère le contexte narratif récent"""
@@ -336,48 +854,115 @@ Réponse narrative:"""
                 context_lines.append(f"Joueur: {entry.get('content', '')}")
             elif entry.get('type') == 'narrative_response':
                 # Résumer la réponse narrative si elle est trop longue
-                response = entry.get('content', '')
-                if len(response) > 200:
-                    response = response[:200] + "..."
+                response = truncate_to_tokens(entry.get('content', ''), 60)
                 context_lines.append(f"MJ: {response}")
         
         return "\n".join(context_lines) if context_lines else "Début de l'aventure."
     
-    def _generate_llm_response(self, prompt: str, context: Dict[str, Any]) -> str:
-        """Génère la réponse via LLM"""
+    def _get_default_provider(self) -> str:
+        """Fournisseur préféré (DEFAULT_LLM_PROVIDER)"""
+        provider = os.getenv('DEFAULT_LLM_PROVIDER', 'deepseek')
+        return provider if provider in LLM_PROVIDERS else 'deepseek'
+    
+    def _get_llm_provider(self, preferred: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+        """Retourne le fournisseur le mieux classé par le routeur et sa configuration"""
+        candidates = llm_router.ordered_providers(preferred or self._get_default_provider(), get_failover_order())
+        
+        if not candidates:
+            raise Exception('Aucun fournisseur LLM disponible (clés API manquantes)')
+        
+        return candidates[0], LLM_PROVIDERS[candidates[0]]
+    
+    def _tier_provider(self, tier: ModelTier) -> str:
+        """Fournisseur préféré du palier (DEFAULT_LLM_PROVIDER s'il n'en précise pas)"""
+        return tier.provider if tier.provider in LLM_PROVIDERS else self._get_default_provider()
+    
+    def _record_tier_call(self, tier: ModelTier, started: float, messages: List[Dict[str, str]],
+                          response: Dict[str, Any]) -> None:
+        """Latence, tokens (usage du fournisseur, sinon estimation) et modèle d'un appel du palier"""
+        if response.get('cached'):
+            self.model_router.record(tier, time.perf_counter() - started)
+            return
+        usage = response.get('usage') or {}
+        self.model_router.record(
+            tier,
+            time.perf_counter() - started,
+            prompt_tokens=usage.get('prompt_tokens') or sum(estimate_tokens(m['content']) for m in messages),
+            output_tokens=usage.get('completion_tokens') or estimate_tokens(response.get('response', '')),
+            model=response.get('model')
+        )
+    
+    def get_model_routing_metrics(self) -> Dict[str, Any]:
+        """Latence, tokens et coût estimé par palier de modèle"""
+        return self.model_router.metrics()
+    
+    def _generate_llm_response(self, messages: List[Dict[str, str]], context: Dict[str, Any],
+                               tier: ModelTier) -> str:
+        """Génère la réponse via LLM avec les paramètres du palier (basculement entre fournisseurs en cas d'échec)"""
+        started = time.perf_counter()
         try:
-            # Utiliser le fournisseur configuré par défaut
-            import os
-            provider = os.getenv('DEFAULT_LLM_PROVIDER', 'deepseek')
-            
-            if provider not in LLM_PROVIDERS:
-                provider = 'deepseek'
-            
-            provider_config = LLM_PROVIDERS[provider]
-            api_key = provider_config['api_key']
-            
-            if not api_key:
-                raise Exception(f'Clé API manquante pour {provider}')
+            response = llm_router.complete(
+                messages,
+                tier.max_tokens,
+                tier.temperature,
+                preferred=self._tier_provider(tier),
+                fallback_order=get_failover_order(),
+                models=tier.models()
+            )
             
-            # Appel à l'API
-            if provider == 'gemini':
-                response = call_gemini_api(api_key, prompt)
-            else:
-                messages = [{"role": "user", "content": prompt}]
-                response = call_openai_compatible_api(
-                    provider_config['base_url'],
-                    api_key,
-                    provider_config['model'],
-                    messages,
-                    2000,
-                    0.8,
-                    provider
-                )
+        except Exception as e:
+            self.model_router.record(tier, time.perf_counter() - started, success=False)
+            raise Exception(f'Erreur LLM: {str(e)}')
+        
+        self._record_tier_call(tier, started, messages, response)
+        return response.get('response', '')
+    
+    async def _agenerate_llm_response(self, messages: List[Dict[str, str]], context: Dict[str, Any],
+                                      tier: ModelTier) -> str:
+        """Génère la réponse via le client LLM asynchrone (mêmes règles de basculement)"""
+        started = time.perf_counter()
+        try:
+            response = await llm_router.acomplete(
+                messages,
+                tier.max_tokens,
+                tier.temperature,
+                preferred=self._tier_provider(tier),
+                fallback_order=get_failover_order(),
+                models=tier.models()
+            )
             
-            return response.get('response', '')
+        except Exception as e:
+            self.model_router.record(tier, time.perf_counter() - started, success=False)
+            raise Exception(f'Erreur LLM: {str(e)}')
+        
+        self._record_tier_call(tier, started, messages, response)
+        return response.get('response', '')
+    
+    def _stream_llm_response(self, messages: List[Dict[str, str]], context: Dict[str, Any],
+                             tier: ModelTier) -> Iterator[str]:
+        """Génère la réponse via LLM en relayant les tokens au fil de l'eau (basculement avant le premier token)"""
+        started = time.perf_counter()
+        chunks = []
+        try:
+            provider, tokens = llm_router.stream(
+                messages,
+                tier.max_tokens,
+                tier.temperature,
+                preferred=self._tier_provider(tier),
+                fallback_order=get_failover_order(),
+                models=tier.models()
+            )
+            model = 'gemini-pro' if provider == 'gemini' else (
+                tier.models().get(provider) or LLM_PROVIDERS[provider]['model'])
+            for token in tokens:
+                chunks.append(token)
+                yield token
             
         except Exception as e:
+            self.model_router.record(tier, time.perf_counter() - started, success=False)
             raise Exception(f'Erreur LLM: {str(e)}')
+        
+        self._record_tier_call(tier, started, messages, {'response': ''.join(chunks), 'model': model})
     
     def _post_process_narrative(self, llm_response: str, context: Dict[str, Any], 
                                parsed_action: Dict[str, Any]) -> Dict[str, Any]:
@@ -386,11 +971,14 @@ Réponse narrative:"""
             # Nettoyer la réponse
             cleaned_response = llm_response.strip()
             
+            # Mots-clés de ton et de tension (un seul parcours de la réponse)
+            keyword_counts = self.tone_matcher.count(cleaned_response)
+            
             # Analyser le ton émotionnel
-            emotional_tone = self._analyze_emotional_tone(cleaned_response)
+            emotional_tone = self._analyze_emotional_tone(cleaned_response, keyword_counts)
             
             # Calculer le niveau de tension
-            tension_level = self._calculate_response_tension(cleaned_response, parsed_action)
+            tension_level = self._calculate_response_tension(cleaned_response, parsed_action, keyword_counts)
             
             return {
                 'text': cleaned_response,
@@ -407,14 +995,11 @@ Réponse narrative:"""
                 'word_count': len(llm_response.split()) if llm_response else 0
             }
     
-    def _analyze_emotional_tone(self, text: str) -> str:
+    def _analyze_emotional_tone(self, text: str, keyword_counts: Optional[Dict[str, int]] = None) -> str:
         """Analyse le ton émotionnel du texte"""
-        positive_words = ['succès', 'victoire', 'joie', 'espoir', 'triomphe']
-        negative_words = ['échec', 'défaite', 'peur', 'danger', 'mort']
-        
-        text_lower = text.lower()
-        positive_count = sum(1 for word in positive_words if word in text_lower)
-        negative_count = sum(1 for word in negative_words if word in text_lower)
+        keyword_counts = keyword_counts or self.tone_matcher.count(text)
+        positive_count = keyword_counts['positive']
+        negative_count = keyword_counts['negative']
         
         if positive_count > negative_count:
             return 'positive'
@@ -423,7 +1008,8 @@ Réponse narrative:"""
         else:
             return 'neutral'
     
-    def _calculate_response_tension(self, text: str, parsed_action: Dict[str, Any]) -> float:
+    def _calculate_response_tension(self, text: str, parsed_action: Dict[str, Any],
+                                    keyword_counts: Optional[Dict[str, int]] = None) -> float:
         """Calcule le niveau de tension de la réponse"""
         base_tension = 0.3
         
@@ -435,9 +1021,8 @@ Réponse narrative:"""
             base_tension += 0.1
         
         # Ajustement basé sur le contenu
-        tension_words = ['danger', 'combat', 'mort', 'peur', 'urgence']
-        text_lower = text.lower()
-        tension_count = sum(1 for word in tension_words if word in text_lower)
+        keyword_counts = keyword_counts or self.tone_matcher.count(text)
+        tension_count = keyword_counts['tension']
         
         return min(base_tension + (tension_count * 0.1), 1.0)
     
@@ -445,9 +1030,9 @@ Réponse narrative:"""
                              parsed_action: Dict[str, Any]) -> None:
         """Met à jour l'arc narratif"""
         try:
-            # Récupérer l'état actuel
-            context = state_engine.get_full_context(session_id)
-            current_arc = self._analyze_current_arc(context)
+            # État d'arc incrémental (déjà à jour de ce tour)
+            arc_state = state_engine.get_arc_state(session_id)
+            current_arc = self._arc_from_state(arc_state.to_dict() if arc_state else None)
             
             # Déterminer si une transition d'arc est nécessaire
             if self._should_transition_arc(current_arc, processed_response, parsed_action):
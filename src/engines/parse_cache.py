@@ -0,0 +1,113 @@
+"""
+Cache des actions analysées - Architecture des 4 Moteurs
+Résultats de parse_action par texte normalisé et empreinte du contexte; éviction LRU
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Hashable, Optional, Set, Tuple
+
+def normalize_action(action_text: str) -> str:
+    """Texte d'action sans casse ni espaces superflus: '  Regarde   ' -> 'regarde'"""
+    return ' '.join(action_text.lower().split())
+
+def context_fingerprint(context: Dict[str, Any]) -> Optional[Tuple]:
+    """
+    Empreinte des éléments du contexte dont dépend l'analyse: lieu, noms des NPCs présents,
+    objets au sol et inventaire (identifiants et quantités). None si le contexte n'est pas
+    un contexte de get_full_context (l'action n'est alors pas mise en cache).
+    """
+    world_state = context.get('world_state', {})
+    if not isinstance(world_state, dict):
+        return None
+    
+    location = world_state.get('current_location', context.get('location'))
+    location_id = location.get('id') if isinstance(location, dict) else location
+    npcs = world_state.get('npcs_here')
+    if npcs is None:
+        npcs = world_state.get('npcs', [])
+    
+    return (
+        location_id,
+        frozenset(npc.get('name', '') if isinstance(npc, dict) else str(npc) for npc in npcs),
+        frozenset(item.get('name', '') for item in world_state.get('items_here', [])),
+        tuple((item.get('id'), item.get('quantity')) for item in context.get('inventory', []))
+    )
+
+class ParseResultCache:
+    """
+    Cache mémoire des actions analysées, borné en taille (LRU).
+    Clé: session, empreinte du contexte et texte normalisé. Quand l'empreinte d'une session
+    change (déplacement, NPC arrivé ou parti, inventaire modifié), ses entrées sont retirées.
+    """
+    
+    def __init__(self, max_entries: int = 1024, enabled: bool = True):
+        self.max_entries = max_entries
+        self.enabled = enabled
+        
+        self.entries: OrderedDict = OrderedDict()  # (session, empreinte, texte) -> action analysée
+        self.session_keys: Dict[Optional[str], Set[Tuple]] = {}
+        self.fingerprints: Dict[Optional[str], Hashable] = {}
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+    
+    def get(self, session_id: Optional[str], fingerprint: Hashable, action_key: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            self._check_fingerprint(session_id, fingerprint)
+            key = (session_id, fingerprint, action_key)
+            parsed_action = self.entries.get(key)
+            if parsed_action is None:
+                self.stats['misses'] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return parsed_action
+    
+    def put(self, session_id: Optional[str], fingerprint: Hashable, action_key: str,
+            parsed_action: Dict[str, Any]) -> None:
+        with self.lock:
+            self._check_fingerprint(session_id, fingerprint)
+            key = (session_id, fingerprint, action_key)
+            self.entries[key] = parsed_action
+            self.entries.move_to_end(key)
+            self.session_keys.setdefault(session_id, set()).add(key)
+            
+            while len(self.entries) > self.max_entries:
+                evicted, _ = self.entries.popitem(last=False)
+                self._forget_key(evicted)
+                self.stats['evictions'] += 1
+    
+    def drop_session(self, session_id: str) -> None:
+        with self.lock:
+            for key in self.session_keys.pop(session_id, set()):
+                self.entries.pop(key, None)
+            self.fingerprints.pop(session_id, None)
+    
+    def _check_fingerprint(self, session_id: Optional[str], fingerprint: Hashable) -> None:
+        """Le contexte de la session a changé: ses analyses précédentes ne serviront plus"""
+        if self.fingerprints.get(session_id) == fingerprint:
+            return
+        stale = self.session_keys.pop(session_id, set())
+        for key in stale:
+            self.entries.pop(key, None)
+        if stale:
+            self.stats['invalidations'] += 1
+        self.fingerprints[session_id] = fingerprint
+    
+    def _forget_key(self, key: Tuple) -> None:
+        keys = self.session_keys.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.session_keys[key[0]]
+    
+    def metrics(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return dict(
+                self.stats,
+                enabled=self.enabled,
+                entries=len(self.entries),
+                max_entries=self.max_entries,
+                hit_rate=self.stats['hits'] / lookups if lookups else 0.0
+            )
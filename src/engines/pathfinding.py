@@ -0,0 +1,409 @@
+"""
+Service d'Itinéraires - Architecture des 4 Moteurs
+Plus courts chemins et temps de trajet sur le graphe des lieux (Location.connections)
+"""
+
+import heapq
+import json
+import random
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+
+from src.engines.state_engine import state_engine
+from src.models.game_state import WorldState
+
+class LocationGraph:
+    """
+    Graphe pondéré des lieux d'un monde.
+    
+    Les connexions sont considérées comme bidirectionnelles. La distance d'une
+    arête est lue dans Location.properties['distances'][voisin] (en km), 1.0 par défaut.
+    Les requêtes utilisent A* avec une heuristique ALT (landmarks précalculés) et
+    les itinéraires trouvés sont conservés dans un cache LRU.
+    
+    Une arête supprimée ne fait qu'allonger les distances: les landmarks restent admissibles.
+    Une arête ou un lieu ajouté peut créer un raccourci: les landmarks sont alors ignorés
+    (A* sans heuristique, résultats exacts) le temps d'être recalculés en arrière-plan.
+    """
+    
+    def __init__(self, world_state: WorldState, num_landmarks: int = 8,
+                 cache_size: int = 2048, default_distance: float = 1.0,
+                 background_refresh: bool = True):
+        self.world_state = world_state
+        self.num_landmarks = num_landmarks
+        self.cache_size = cache_size
+        self.default_distance = default_distance
+        self.background_refresh = background_refresh
+        
+        self.adjacency: Dict[str, Dict[str, float]] = {}
+        self.landmark_distances: List[Dict[str, float]] = []
+        self.landmarks_dirty = True  # aucun landmark: calcul au premier itinéraire
+        self.landmarks_admissible = True
+        self.refreshing = False
+        self.lock = threading.Lock()
+        self.path_cache: OrderedDict = OrderedDict()
+        self.version = world_state.topology_version
+        self.stats = {'queries': 0, 'cache_hits': 0, 'landmark_builds': 0, 'invalidations': 0}
+        
+        self._build_adjacency()
+    
+    def shortest_path(self, start: str, goal: str) -> Optional[Tuple[List[str], float]]:
+        """Retourne (chemin, distance) entre deux lieux, ou None s'ils ne sont pas reliés"""
+        self.sync()
+        
+        key = (start, goal)
+        with self.lock:
+            self.stats['queries'] += 1
+            if start not in self.adjacency or goal not in self.adjacency:
+                return None
+            
+            if key in self.path_cache:
+                self.path_cache.move_to_end(key)
+                self.stats['cache_hits'] += 1
+                return self._copy_result(self.path_cache[key])
+            
+            if self.landmarks_dirty:
+                self._build_landmarks()
+            version = self.version
+        
+        result = self._astar(start, goal)
+        with self.lock:
+            # Un itinéraire calculé avant une modification du graphe n'est pas mis en cache
+            if self.version == version:
+                self.path_cache[key] = result
+                if len(self.path_cache) > self.cache_size:
+                    self.path_cache.popitem(last=False)
+        
+        return self._copy_result(result)
+    
+    @staticmethod
+    def _copy_result(result: Optional[Tuple[List[str], float]]) -> Optional[Tuple[List[str], float]]:
+        """Copie du chemin: un appelant qui le modifie ne corrompt pas le cache"""
+        return (list(result[0]), result[1]) if result is not None else None
+    
+    def sync(self) -> None:
+        """Applique les modifications du graphe survenues depuis la dernière requête"""
+        if self.version == self.world_state.topology_version:
+            return
+        
+        with self.lock:
+            changes = self.world_state.topology_changes_since(self.version)
+            if changes is None:
+                self._build_adjacency()
+                self.path_cache.clear()
+                edges_added = True
+            else:
+                for change in changes:
+                    self._apply_change(change)
+                edges_added = any(change['kind'] != 'disconnect' for change in changes)
+            
+            self.version = self.world_state.topology_version
+            self.stats['invalidations'] += 1
+        
+        if edges_added and not self.landmarks_dirty:
+            self._invalidate_landmarks()
+    
+    def _invalidate_landmarks(self) -> None:
+        """Landmarks ignorés jusqu'à leur recalcul (en arrière-plan, ou au prochain itinéraire)"""
+        if not self.background_refresh:
+            self.landmarks_dirty = True
+            return
+        
+        with self.lock:
+            self.landmarks_admissible = False
+            if self.refreshing:
+                return
+            self.refreshing = True
+        threading.Thread(target=self._refresh_landmarks, name='landmarks-refresh', daemon=True).start()
+    
+    def _refresh_landmarks(self) -> None:
+        """Recalcule les landmarks sur une copie du graphe; recommence si le graphe a encore changé"""
+        while True:
+            with self.lock:
+                version = self.version
+                adjacency = {node: dict(neighbors) for node, neighbors in self.adjacency.items()}
+            
+            landmark_distances = self._compute_landmarks(adjacency)
+            
+            with self.lock:
+                if self.version == version:
+                    self.landmark_distances = landmark_distances
+                    self.landmarks_admissible = True
+                    self.refreshing = False
+                    self.stats['landmark_builds'] += 1
+                    return
+    
+    def _apply_change(self, change: Dict[str, Any]) -> None:
+        kind = change['kind']
+        
+        if kind == 'disconnect':
+            location_a, location_b = change['locations']
+            self.adjacency.get(location_a, {}).pop(location_b, None)
+            self.adjacency.get(location_b, {}).pop(location_a, None)
+            # Seuls les itinéraires empruntant l'arête supprimée deviennent invalides
+            for key, result in list(self.path_cache.items()):
+                if result is not None and self._path_uses_edge(result[0], location_a, location_b):
+                    del self.path_cache[key]
+        
+        elif kind == 'connect':
+            location_a, location_b = change['locations']
+            distance = self._edge_distance(location_a, location_b)
+            self.adjacency.setdefault(location_a, {})[location_b] = distance
+            self.adjacency.setdefault(location_b, {})[location_a] = distance
+            # Une nouvelle arête peut raccourcir n'importe quel itinéraire
+            self.path_cache.clear()
+        
+        elif kind == 'add_location':
+            location_id = change['locations'][0]
+            self.adjacency.setdefault(location_id, {})
+            for neighbor in self.world_state.locations[location_id].connections:
+                if neighbor in self.world_state.locations:
+                    distance = self._edge_distance(location_id, neighbor)
+                    self.adjacency[location_id][neighbor] = distance
+                    self.adjacency.setdefault(neighbor, {})[location_id] = distance
+            self.path_cache.clear()
+    
+    def _build_adjacency(self) -> None:
+        adjacency: Dict[str, Dict[str, float]] = {loc_id: {} for loc_id in self.world_state.locations}
+        for loc_id, location in self.world_state.locations.items():
+            for neighbor in location.connections:
+                if neighbor in adjacency:
+                    distance = self._edge_distance(loc_id, neighbor)
+                    adjacency[loc_id][neighbor] = distance
+                    adjacency[neighbor][loc_id] = distance
+        self.adjacency = adjacency
+    
+    def _edge_distance(self, location_a: str, location_b: str) -> float:
+        locations = self.world_state.locations
+        for source, target in ((location_a, location_b), (location_b, location_a)):
+            distances = locations[source].properties.get('distances', {})
+            if target in distances:
+                return float(distances[target])
+        return self.default_distance
+    
+    @staticmethod
+    def _path_uses_edge(path: List[str], location_a: str, location_b: str) -> bool:
+        for current, following in zip(path, path[1:]):
+            if (current, following) in ((location_a, location_b), (location_b, location_a)):
+                return True
+        return False
+    
+    def _dijkstra(self, source: str, adjacency: Optional[Dict[str, Dict[str, float]]] = None) -> Dict[str, float]:
+        adjacency = self.adjacency if adjacency is None else adjacency
+        distances = {source: 0.0}
+        heap = [(0.0, source)]
+        while heap:
+            distance, node = heapq.heappop(heap)
+            if distance > distances[node]:
+                continue
+            for neighbor, weight in adjacency[node].items():
+                candidate = distance + weight
+                if candidate < distances.get(neighbor, float('inf')):
+                    distances[neighbor] = candidate
+                    heapq.heappush(heap, (candidate, neighbor))
+        return distances
+    
+    def _build_landmarks(self) -> None:
+        """Calcule les landmarks avant l'itinéraire en cours (premier itinéraire du graphe)"""
+        self.landmark_distances = self._compute_landmarks(self.adjacency)
+        self.landmarks_dirty = False
+        self.landmarks_admissible = True
+        if self.landmark_distances:
+            self.stats['landmark_builds'] += 1
+    
+    def _compute_landmarks(self, adjacency: Dict[str, Dict[str, float]]) -> List[Dict[str, float]]:
+        """Choisit les landmarks par parcours du point le plus éloigné et précalcule leurs distances"""
+        landmark_distances: List[Dict[str, float]] = []
+        if not adjacency or self.num_landmarks <= 0:
+            return landmark_distances
+        
+        landmark = next(iter(adjacency))
+        min_distances: Dict[str, float] = {}
+        for _ in range(min(self.num_landmarks, len(adjacency))):
+            distances = self._dijkstra(landmark, adjacency)
+            landmark_distances.append(distances)
+            for node, distance in distances.items():
+                min_distances[node] = min(min_distances.get(node, float('inf')), distance)
+            candidates = [node for node, distance in min_distances.items() if distance > 0]
+            if not candidates:
+                break
+            landmark = max(candidates, key=min_distances.get)
+        
+        return landmark_distances
+    
+    def _heuristic(self, node: str, goal: str, landmark_distances: List[Dict[str, float]]) -> float:
+        best = 0.0
+        for distances in landmark_distances:
+            to_node = distances.get(node)
+            to_goal = distances.get(goal)
+            if to_node is not None and to_goal is not None:
+                best = max(best, abs(to_goal - to_node))
+        return best
+    
+    def _astar(self, start: str, goal: str) -> Optional[Tuple[List[str], float]]:
+        landmark_distances = self.landmark_distances if self.landmarks_admissible else []
+        
+        # Deux lieux joignables depuis un landmark sont dans sa composante connexe
+        for distances in landmark_distances:
+            if (start in distances) != (goal in distances):
+                return None
+        
+        distances = {start: 0.0}
+        previous: Dict[str, str] = {}
+        heap = [(self._heuristic(start, goal, landmark_distances), 0.0, start)]
+        closed = set()
+        
+        while heap:
+            _, distance, node = heapq.heappop(heap)
+            if node == goal:
+                path = [goal]
+                while path[-1] != start:
+                    path.append(previous[path[-1]])
+                path.reverse()
+                return path, distance
+            if node in closed:
+                continue
+            closed.add(node)
+            for neighbor, weight in self.adjacency[node].items():
+                candidate = distance + weight
+                if candidate < distances.get(neighbor, float('inf')):
+                    distances[neighbor] = candidate
+                    previous[neighbor] = node
+                    heapq.heappush(heap, (candidate + self._heuristic(neighbor, goal, landmark_distances),
+                                          candidate, neighbor))
+        
+        return None
+
+class PathfindingService:
+    """Calcul d'itinéraires et de temps de trajet, avec un graphe mis en cache par session"""
+    
+    def __init__(self, travel_speed: float = 5.0, num_landmarks: int = 8):
+        self.travel_speed = travel_speed  # km par heure de jeu
+        self.num_landmarks = num_landmarks
+        self.graphs: Dict[str, LocationGraph] = {}
+    
+    def get_graph(self, session_id: str) -> Optional[LocationGraph]:
+        """Retourne le graphe des lieux d'une session (reconstruit si l'état a été rechargé)"""
+        game_state = state_engine.get_session(session_id)
+        if not game_state:
+            self.graphs.pop(session_id, None)
+            return None
+        
+        graph = self.graphs.get(session_id)
+        if graph is None or graph.world_state is not game_state.world_state:
+            graph = LocationGraph(game_state.world_state, self.num_landmarks)
+            self.graphs[session_id] = graph
+        return graph
+    
+    def find_route(self, session_id: str, start: str, goal: str) -> Optional[Dict[str, Any]]:
+        """Calcule l'itinéraire le plus court et le temps de trajet (heures de jeu)"""
+        graph = self.get_graph(session_id)
+        if graph is None:
+            return None
+        
+        result = graph.shortest_path(start, goal)
+        if result is None:
+            return None
+        
+        path, distance = result
+        return {
+            'path': path,
+            'distance': distance,
+            'travel_time': distance / self.travel_speed if self.travel_speed > 0 else 0.0
+        }
+    
+    def travel_time(self, session_id: str, start: str, goal: str) -> Optional[float]:
+        """Temps de trajet en heures de jeu entre deux lieux"""
+        route = self.find_route(session_id, start, goal)
+        return route['travel_time'] if route else None
+    
+    def drop_session(self, session_id: str) -> None:
+        """Libère le graphe mis en cache pour une session"""
+        self.graphs.pop(session_id, None)
+
+def _generate_world(num_locations: int, extra_edges: int, seed: int = 42) -> WorldState:
+    """Génère un monde en grille avec des raccourcis aléatoires (benchmark)"""
+    from src.models.game_state import Location
+    
+    rng = random.Random(seed)
+    width = int(num_locations ** 0.5)
+    locations = {}
+    for index in range(num_locations):
+        loc_id = f"loc_{index}"
+        connections = []
+        if index % width:
+            connections.append(f"loc_{index - 1}")
+        if index >= width:
+            connections.append(f"loc_{index - width}")
+        locations[loc_id] = Location(
+            id=loc_id, name=loc_id, description='', type='wilderness',
+            connections=connections,
+            properties={'distances': {neighbor: rng.uniform(0.5, 3.0) for neighbor in connections}}
+        )
+    for _ in range(extra_edges):
+        location_a = f"loc_{rng.randrange(num_locations)}"
+        location_b = f"loc_{rng.randrange(num_locations)}"
+        if location_a != location_b:
+            locations[location_a].connections.append(location_b)
+            locations[location_a].properties['distances'][location_b] = rng.uniform(5.0, 15.0)
+    
+    return WorldState(current_location='loc_0', locations=locations)
+
+def run_benchmark(num_locations: int = 10000, num_queries: int = 200) -> Dict[str, Any]:
+    """Compare Dijkstra simple, A*+ALT et le cache sur un monde généré"""
+    import time
+    
+    world_state = _generate_world(num_locations, extra_edges=num_locations // 20)
+    graph = LocationGraph(world_state)
+    rng = random.Random(7)
+    queries = [(f"loc_{rng.randrange(num_locations)}", f"loc_{rng.randrange(num_locations)}")
+               for _ in range(num_queries)]
+    
+    started = time.perf_counter()
+    for start, _ in queries[:20]:
+        graph._dijkstra(start)
+    dijkstra_ms = (time.perf_counter() - started) * 1000 / 20
+    
+    started = time.perf_counter()
+    graph._build_landmarks()
+    landmarks_ms = (time.perf_counter() - started) * 1000
+    
+    started = time.perf_counter()
+    for start, goal in queries:
+        graph.shortest_path(start, goal)
+    astar_ms = (time.perf_counter() - started) * 1000 / num_queries
+    
+    started = time.perf_counter()
+    for start, goal in queries:
+        graph.shortest_path(start, goal)
+    cached_ms = (time.perf_counter() - started) * 1000 / num_queries
+    
+    # Invalidation incrémentale: suppression d'une arête d'un itinéraire en cache
+    path = next(result[0] for result in graph.path_cache.values() if result and len(result[0]) > 1)
+    world_state.disconnect_locations(path[0], path[1])
+    started = time.perf_counter()
+    graph.sync()
+    sync_ms = (time.perf_counter() - started) * 1000
+    cache_entries = len(graph.path_cache)
+    
+    # Raccourci ajouté: itinéraire suivant sans attendre le recalcul des landmarks (arrière-plan)
+    world_state.connect_locations(queries[0][0], queries[1][1])
+    started = time.perf_counter()
+    graph.shortest_path(queries[2][0], queries[2][1])
+    after_connect_ms = (time.perf_counter() - started) * 1000
+    
+    return {
+        'locations': num_locations,
+        'queries': num_queries,
+        'dijkstra_full_ms': round(dijkstra_ms, 3),
+        'landmark_build_ms': round(landmarks_ms, 3),
+        'astar_alt_ms': round(astar_ms, 3),
+        'cached_ms': round(cached_ms, 4),
+        'disconnect_sync_ms': round(sync_ms, 3),
+        'cache_entries_after_disconnect': cache_entries,
+        'first_query_after_connect_ms': round(after_connect_ms, 3)
+    }
+
+if __name__ == '__main__':
+    print(json.dumps(run_benchmark(), indent=2))
@@ -0,0 +1,224 @@
+"""
+Graphe des Relations - Architecture des 4 Moteurs
+Relations pondérées entre NPCs (stockage CSR) pour la simulation sociale
+"""
+
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Any, Optional, Tuple, Iterable
+
+from src.models.game_state import NPC, WorldState
+
+# Correspondance entre libellés de NPC.relationships et poids numériques [-1, 1]
+LABEL_WEIGHTS = {
+    'allié': 0.9,
+    'ami': 0.6,
+    'neutre': 0.0,
+    'rival': -0.4,
+    'ennemi': -0.8
+}
+
+def weight_for_label(label: str) -> float:
+    """Poids numérique d'un libellé de relation (0.0 si inconnu)"""
+    return LABEL_WEIGHTS.get(label, 0.0)
+
+def label_for_weight(weight: float) -> str:
+    """Libellé le plus proche d'un poids numérique"""
+    return min(LABEL_WEIGHTS, key=lambda label: abs(LABEL_WEIGHTS[label] - weight))
+
+class RelationshipGraph:
+    """
+    Graphe orienté et pondéré des relations (NPCs, factions, joueur).
+    
+    Les arêtes sont stockées au format CSR (indptr / indices / weights) pour des
+    parcours de voisins par simple tranche de tableau et des mises à jour par lot.
+    Les nouvelles arêtes sont accumulées puis intégrées au prochain accès.
+    """
+    
+    def __init__(self):
+        self.node_ids: List[str] = []
+        self.node_index: Dict[str, int] = {}
+        self.indptr = array('l', [0])
+        self.indices = array('l')
+        self.weights = array('d')
+        self.pending: Dict[Tuple[int, int], float] = {}
+        # Monde source et version des entités au moment de la construction (cache du moteur de simulation)
+        self.world_state: Optional[WorldState] = None
+        self.entity_version = 0
+    
+    @classmethod
+    def from_npcs(cls, npcs: Iterable[NPC]) -> 'RelationshipGraph':
+        """Construit le graphe à partir des relations des NPCs"""
+        graph = cls()
+        for npc in npcs:
+            graph._node(npc.id)
+            for target_id, label in npc.relationships.items():
+                weight = npc.relationship_weights.get(target_id, weight_for_label(label))
+                graph.set_weight(npc.id, target_id, weight)
+        graph.compact()
+        return graph
+    
+    def _node(self, node_id: str) -> int:
+        index = self.node_index.get(node_id)
+        if index is None:
+            index = len(self.node_ids)
+            self.node_ids.append(node_id)
+            self.node_index[node_id] = index
+            self.indptr.append(self.indptr[-1])
+        return index
+    
+    def _edge_position(self, source: int, target: int) -> Optional[int]:
+        start, end = self.indptr[source], self.indptr[source + 1]
+        position = bisect_left(self.indices, target, start, end)
+        if position < end and self.indices[position] == target:
+            return position
+        return None
+    
+    def set_weight(self, source_id: str, target_id: str, weight: float) -> None:
+        """Définit le poids de la relation source -> cible"""
+        source = self._node(source_id)
+        target = self._node(target_id)
+        weight = max(-1.0, min(1.0, weight))
+        
+        position = self._edge_position(source, target)
+        if position is not None:
+            self.weights[position] = weight
+        else:
+            self.pending[(source, target)] = weight
+    
+    def weight(self, source_id: str, target_id: str) -> float:
+        """Poids de la relation source -> cible (0.0 si absente)"""
+        self.compact()
+        source = self.node_index.get(source_id)
+        target = self.node_index.get(target_id)
+        if source is None or target is None:
+            return 0.0
+        position = self._edge_position(source, target)
+        return self.weights[position] if position is not None else 0.0
+    
+    def neighbors(self, node_id: str, min_weight: Optional[float] = None) -> List[Tuple[str, float]]:
+        """Relations sortantes d'un nœud, filtrées éventuellement par poids minimal"""
+        self.compact()
+        source = self.node_index.get(node_id)
+        if source is None:
+            return []
+        start, end = self.indptr[source], self.indptr[source + 1]
+        return [
+            (self.node_ids[self.indices[position]], self.weights[position])
+            for position in range(start, end)
+            if min_weight is None or self.weights[position] >= min_weight
+        ]
+    
+    def compact(self) -> None:
+        """Intègre les arêtes en attente dans les tableaux CSR"""
+        if not self.pending and len(self.indptr) == len(self.node_ids) + 1:
+            return
+        
+        rows: List[Dict[int, float]] = [{} for _ in self.node_ids]
+        for source in range(len(self.indptr) - 1):
+            for position in range(self.indptr[source], self.indptr[source + 1]):
+                rows[source][self.indices[position]] = self.weights[position]
+        for (source, target), weight in self.pending.items():
+            rows[source][target] = weight
+        self.pending = {}
+        
+        indptr = array('l', [0])
+        indices = array('l')
+        weights = array('d')
+        for row in rows:
+            for target in sorted(row):
+                indices.append(target)
+                weights.append(row[target])
+            indptr.append(len(indices))
+        
+        self.indptr, self.indices, self.weights = indptr, indices, weights
+    
+    def apply_decay(self, time_elapsed: float, alliance_decay: float,
+                    conflict_escalation: float, neutral_drift: float,
+                    neutral_band: float = 0.2) -> int:
+        """
+        Fait évoluer toutes les relations en un seul passage:
+        les alliances s'érodent, les conflits s'intensifient et les relations
+        tièdes dérivent vers la neutralité. Retourne le nombre d'arêtes modifiées.
+        """
+        self.compact()
+        weights = self.weights
+        keep_alliance = max(0.0, 1.0 - alliance_decay * time_elapsed)
+        escalate = 1.0 + conflict_escalation * time_elapsed
+        drift = neutral_drift * time_elapsed
+        changed = 0
+        
+        for position in range(len(weights)):
+            weight = weights[position]
+            if -neutral_band < weight < neutral_band:
+                new_weight = max(0.0, weight - drift) if weight > 0 else min(0.0, weight + drift)
+            elif weight > 0:
+                new_weight = weight * keep_alliance
+            else:
+                new_weight = max(-1.0, weight * escalate)
+            if new_weight != weight:
+                weights[position] = new_weight
+                changed += 1
+        
+        return changed
+    
+    def propagate_event(self, actor_id: str, target_id: str, impact: float,
+                        max_depth: int = 2, attenuation: float = 0.5,
+                        friend_threshold: float = 0.3) -> List[Dict[str, Any]]:
+        """
+        Propage un événement (actor agit sur target avec un impact [-1, 1]) :
+        la cible, puis ses amis et les amis de ses amis révisent leur relation
+        envers l'acteur, proportionnellement à leur amitié et atténué à chaque saut.
+        """
+        self.compact()
+        changes = []
+        visited = {actor_id}
+        frontier = [(target_id, 1.0)]
+        
+        for depth in range(max_depth + 1):
+            next_frontier = []
+            for node_id, strength in frontier:
+                if node_id in visited:
+                    continue
+                visited.add(node_id)
+                
+                delta = impact * strength
+                new_weight = max(-1.0, min(1.0, self.weight(node_id, actor_id) + delta))
+                changes.append({'npc_id': node_id, 'towards': actor_id, 'delta': delta,
+                                'weight': new_weight, 'depth': depth})
+                
+                for friend_id, friendship in self.neighbors(node_id, friend_threshold):
+                    next_frontier.append((friend_id, strength * attenuation * friendship))
+            frontier = next_frontier
+        
+        # Application groupée après le parcours (une seule compaction)
+        for change in changes:
+            self.set_weight(change['npc_id'], actor_id, change['weight'])
+        self.compact()
+        return changes
+    
+    def write_back(self, npcs: Dict[str, NPC], node_ids: Optional[Iterable[str]] = None) -> int:
+        """
+        Reporte dans NPC.relationship_weights / NPC.relationships les seules relations dont le poids
+        a changé. Un libellé hors de LABEL_WEIGHTS ('famille', 'maître'...) est conservé tel quel;
+        seul son poids est mis à jour. Retourne le nombre de relations modifiées.
+        """
+        self.compact()
+        updated = 0
+        for npc_id in (npcs if node_ids is None else node_ids):
+            npc = npcs.get(npc_id)
+            if npc is None:
+                continue
+            for target_id, weight in self.neighbors(npc_id):
+                weight = round(weight, 4)
+                label = npc.relationships.get(target_id)
+                previous = npc.relationship_weights.get(target_id)
+                if previous is None and label is not None:
+                    previous = weight_for_label(label)
+                if previous is not None and abs(previous - weight) < 1e-9:
+                    continue
+                npc.relationship_weights[target_id] = weight
+                if label is None or label in LABEL_WEIGHTS:
+                    npc.relationships[target_id] = label_for_weight(weight)
+                updated += 1
+        return updated
@@ -8,6 +8,8 @@ from datetime import datetime, timedelta
 from dataclasses import asdict
 
 from src.engines.state_engine import state_engine
+from src.engines.pathfinding import PathfindingService
+from src.engines.relationship_graph import RelationshipGraph
 from src.models.game_state import NPC, Location
 
 class SimulationEngine:
@@ -25,6 +27,9 @@ class SimulationEngine:
         self.npc_behaviors = self._load_npc_behaviors()
         self.event_generators = self._load_event_generators()
         self.world_dynamics = self._load_world_dynamics()
+        self.time_bonus_tables = self._build_time_bonus_tables()
+        self.pathfinding = PathfindingService(self.simulation_rules['time_scale']['travel_speed'])
+        self.relationship_graphs: Dict[str, RelationshipGraph] = {}
         
     def simulate_world_step(self, session_id: str, time_elapsed: float = 1.0) -> Dict[str, Any]:
         """
@@ -32,7 +37,13 @@ class SimulationEngine:
         time_elapsed: temps écoulé en heures de jeu
         """
         try:
-            context = state_engine.get_full_context(session_id)
+            # Avancer l'horloge de jeu avant d'extraire le contexte
+            state_engine.advance_game_time(session_id, time_elapsed)
+            context = state_engine.get_full_context(session_id, include_world=True)
+            game_time = context.get('session', {}).get('game_time', 0.0)
+            
+            # Table des bonus horaires pour ce tick (une seule recherche par tick)
+            time_bonuses = self._get_time_bonus_table(game_time)
             
             simulation_results = {
                 'npc_actions': [],
@@ -43,7 +54,7 @@ class SimulationEngine:
             }
             
             # 1. Simuler les NPCs
-            npc_results = self._simulate_npcs(context, time_elapsed)
+            npc_results = self._simulate_npcs(context, time_elapsed, time_bonuses)
             simulation_results['npc_actions'] = npc_results
             
             # 2. Générer des événements du monde
@@ -62,13 +73,19 @@ class SimulationEngine:
             reputation_changes = self._calculate_reputation_changes(context, time_elapsed)
             simulation_results['reputation_changes'] = reputation_changes
             
-            # 6. Appliquer tous les changements au moteur d'état
+            # 6. Faire évoluer les relations entre NPCs
+            game_state = state_engine.get_session(session_id)
+            if game_state:
+                simulation_results['relationship_changes'] = self.update_npc_relationships(game_state, time_elapsed)
+            
+            # 7. Appliquer tous les changements au moteur d'état
             self._apply_simulation_results(session_id, simulation_results)
             
             return {
                 'success': True,
                 'simulation_results': simulation_results,
-                'world_time_advanced': time_elapsed
+                'world_time_advanced': time_elapsed,
+                'game_time': game_time
             }
             
         except Exception as e:
@@ -77,6 +94,53 @@ class SimulationEngine:
                 'error': f'Erreur de simulation: {str(e)}'
             }
     
+    def plan_route(self, session_id: str, start: str, goal: str) -> Optional[Dict[str, Any]]:
+        """Calcule l'itinéraire et le temps de trajet (heures de jeu) entre deux lieux"""
+        return self.pathfinding.find_route(session_id, start, goal)
+    
+    def get_relationship_graph(self, game_state) -> RelationshipGraph:
+        """
+        Retourne le graphe des relations de la session, reconstruit quand des NPCs ont été ajoutés,
+        retirés ou remplacés (WorldState.entity_version). Seul le graphe d'une session active est
+        conservé: un état reconstruit depuis une requête ne remplace pas celui de la session.
+        """
+        world_state = game_state.world_state
+        graph = self.relationship_graphs.get(game_state.session_id)
+        if graph is not None and graph.world_state is world_state and graph.entity_version != world_state.entity_version:
+            changes = world_state.entity_changes_since(graph.entity_version)
+            if changes is not None and all(change['kind'] != 'npc' for change in changes):
+                graph.entity_version = world_state.entity_version  # objets ou lieux seulement
+        
+        if graph is None or graph.world_state is not world_state or graph.entity_version != world_state.entity_version:
+            graph = RelationshipGraph.from_npcs(world_state.npcs.values())
+            graph.world_state = world_state
+            graph.entity_version = world_state.entity_version
+            if state_engine.get_session(game_state.session_id) is game_state:
+                self.relationship_graphs[game_state.session_id] = graph
+        return graph
+    
+    def update_npc_relationships(self, game_state, time_elapsed: float = 1.0) -> int:
+        """Applique en lot l'érosion et la dérive des relations entre NPCs"""
+        dynamics = self.world_dynamics['faction_relationships']
+        graph = self.get_relationship_graph(game_state)
+        
+        changed = graph.apply_decay(
+            time_elapsed,
+            dynamics['alliance_decay'],
+            dynamics['conflict_escalation'],
+            dynamics['neutral_drift']
+        )
+        graph.write_back(game_state.world_state.npcs)
+        return changed
+    
+    def propagate_relationship_event(self, game_state, actor_id: str, target_id: str,
+                                     impact: float) -> List[Dict[str, Any]]:
+        """Propage un événement social à la cible, ses amis et les amis de ses amis"""
+        graph = self.get_relationship_graph(game_state)
+        changes = graph.propagate_event(actor_id, target_id, impact)
+        graph.write_back(game_state.world_state.npcs, [change['npc_id'] for change in changes])
+        return changes
+    
     def _load_simulation_rules(self) -> Dict[str, Any]:
         """Charge les règles de simulation du monde"""
         return {
@@ -94,7 +158,23 @@ class SimulationEngine:
                 'base_stability': 0.7,
                 'chaos_threshold': 0.3,
                 'order_threshold': 0.9
-            }
+            },
+            'activity_hours': {
+                # action: (heure de début, heure de fin), plage éventuellement à cheval sur minuit
+                'open_shop': (6, 10),
+                'serve_customers': (9, 18),
+                'manage_inventory': (14, 20),
+                'close_shop': (18, 22),
+                'patrol': (0, 24),
+                'guard_post': (6, 22),
+                'investigate': (8, 20),
+                'report': (17, 21),
+                'work': (8, 18),
+                'family_time': (18, 22),
+                'social_interaction': (18, 23),
+                'rest': (22, 6)
+            },
+            'time_bonus': 0.3
         }
     
     def _load_npc_behaviors(self) -> Dict[str, Any]:
@@ -142,31 +222,66 @@ class SimulationEngine:
             }
         }
     
-    def _simulate_npcs(self, context: Dict[str, Any], time_elapsed: float) -> List[Dict[str, Any]]:
+    def _build_time_bonus_tables(self) -> List[Dict[str, float]]:
+        """Précalcule, pour chaque heure de la journée, le bonus horaire de chaque action"""
+        activity_hours = self.simulation_rules['activity_hours']
+        bonus = self.simulation_rules['time_bonus']
+        tables = []
+        
+        for hour in range(24):
+            table = {}
+            for action, (start, end) in activity_hours.items():
+                if start <= end:
+                    active = start <= hour < end
+                else:
+                    active = hour >= start or hour < end
+                table[action] = bonus if active else 0.0
+            tables.append(table)
+        
+        return tables
+    
+    def _get_time_bonus_table(self, game_time: float) -> Dict[str, float]:
+        """Retourne la table des bonus horaires correspondant à l'heure de jeu"""
+        return self.time_bonus_tables[int(game_time) % 24]
+    
+    def _calculate_time_bonus(self, action: str, time_bonuses: Dict[str, float]) -> float:
+        """Calcule le bonus basé sur l'heure de jeu (simple lecture de table)"""
+        return time_bonuses.get(action, 0.0)
+    
+    def _simulate_npcs(self, context: Dict[str, Any], time_elapsed: float,
+                       time_bonuses: Dict[str, float]) -> List[Dict[str, Any]]:
         """Simule les actions des NPCs"""
         npc_actions = []
         npcs = context.get('npcs', [])
+        game_time = context.get('session', {}).get('game_time', 0.0)
+        timestamp = datetime.now().isoformat()
+        npcs_here = {npc_data['id'] for npc_data in context.get('npcs_here', [])}
         
         for npc in npcs:
-            action = self._determine_npc_action(npc, context, time_elapsed)
+            action = self._determine_npc_action(npc, context, time_elapsed, time_bonuses)
             if action:
                 npc_actions.append({
                     'npc_id': npc.id,
                     'npc_name': npc.name,
                     'action': action,
-                    'location': npc.current_location,
-                    'timestamp': datetime.now().isoformat()
+                    'location': npc.location,
+                    'visible_to_player': npc.id in npcs_here,
+                    'game_time': game_time,
+                    'timestamp': timestamp
                 })
         
         return npc_actions
     
-    def _determine_npc_action(self, npc: NPC, context: Dict[str, Any], time_elapsed: float) -> Optional[Dict[str, Any]]:
+    def _determine_npc_action(self, npc: NPC, context: Dict[str, Any], time_elapsed: float,
+                              time_bonuses: Dict[str, float]) -> Optional[Dict[str, Any]]:
         """Détermine l'action qu'un NPC va effectuer"""
         behavior = self.npc_behaviors.get(npc.type, self.npc_behaviors['commoner'])
         
         if random.random() < time_elapsed * 0.3:
             routine = behavior['daily_routine']
-            action_type = random.choice(routine)
+            # Les actions adaptées à l'heure de jeu sont favorisées
+            weights = [0.5 + self._calculate_time_bonus(action, time_bonuses) for action in routine]
+            action_type = random.choices(routine, weights=weights)[0]
             
             return {
                 'type': 'routine',
@@ -208,19 +323,16 @@ class SimulationEngine:
         return changes
     
     def _update_quests(self, context: Dict[str, Any], time_elapsed: float) -> List[Dict[str, Any]]:
-        """Met à jour les quêtes actives"""
+        """Met à jour les quêtes actives (seules les échéances atteintes sont examinées)"""
         updates = []
-        active_quests = context.get('active_quests', [])
+        session_id = context.get('session', {}).get('session_id')
         
-        for quest in active_quests:
-            if quest.get('time_limit'):
-                remaining_time = quest['time_limit'] - time_elapsed
-                if remaining_time <= 0:
-                    updates.append({
-                        'quest_id': quest['id'],
-                        'type': 'expired',
-                        'description': f"La quête {quest['name']} a expiré"
-                    })
+        for quest in state_engine.collect_expired_quests(session_id):
+            updates.append({
+                'quest_id': quest.id,
+                'type': 'expired',
+                'description': f"La quête {quest.title} a expiré"
+            })
         
         return updates
     
@@ -248,9 +360,17 @@ class SimulationEngine:
                 rep_change['change']
             )
         
+        # Marquer les quêtes expirées comme échouées
+        for quest_update in results.get('quest_updates', []):
+            if quest_update['type'] == 'expired':
+                state_engine.update_quest_status(session_id, quest_update['quest_id'], 'failed')
+        
         # Appliquer les événements du monde
         for event in results.get('world_events', []):
             state_engine.add_world_event(session_id, event)
+        
+        # Un seul instantané pour l'ensemble du pas de simulation
+        state_engine.commit_turn(session_id)
 
 # Instance globale
 simulation_engine = SimulationEngine()
\ No newline at end of file
@@ -0,0 +1,137 @@
+"""
+Pré-génération spéculative des narrations - Architecture des 4 Moteurs
+Narrations anticipées pour les actions probables, servies si l'action réelle correspond
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Any, Optional, Tuple
+
+ActionKey = Tuple[str, Tuple[str, ...], Tuple[str, ...], Tuple[str, ...], Tuple]
+
+class SpeculativeNarrationCache:
+    """
+    Narrations spéculatives par session, valables pour une version d'état donnée
+    (tour, lieu, heure de jeu). Une entrée est un Future: une action réelle qui
+    correspond à une génération encore en cours attend simplement son résultat.
+    Les entrées d'une version dépassée ou expirées sont comptées comme gaspillées.
+    """
+    
+    def __init__(self, ttl_seconds: float = 300.0):
+        self.ttl_seconds = ttl_seconds
+        self.entries: Dict[str, Dict[ActionKey, Dict[str, Any]]] = {}
+        self.versions: Dict[str, Tuple] = {}
+        self.lock = threading.Lock()
+        self.stats = {
+            'speculated': 0, 'hits': 0, 'misses': 0, 'failed': 0,
+            'wasted': 0, 'wasted_tokens': 0, 'served_tokens': 0
+        }
+    
+    @staticmethod
+    def action_key(parsed_action: Dict[str, Any]) -> ActionKey:
+        """
+        Clé d'une action parsée, indépendante de la formulation: type, entités visées (lieux compris)
+        et paramètres. Les paramètres d'intention et de direction séparent les actions d'exploration
+        sans entité ('Je vais vers le nord', 'Je regarde autour de moi').
+        """
+        entities = parsed_action.get('entities', {})
+        return (
+            parsed_action.get('action_type', 'exploration'),
+            tuple(sorted(entities.get('npcs', []))),
+            tuple(sorted(entities.get('objects', []))),
+            tuple(sorted(entities.get('locations', []))),
+            tuple(sorted((name, repr(value)) for name, value in parsed_action.get('parameters', {}).items()))
+        )
+    
+    def reserve(self, session_id: str, version: Tuple, parsed_action: Dict[str, Any]) -> Optional[Future]:
+        """Réserve une spéculation pour l'action; None si elle existe déjà pour cette version"""
+        key = self.action_key(parsed_action)
+        with self.lock:
+            self._discard_stale(session_id, version)
+            session_entries = self.entries.setdefault(session_id, {})
+            if key in session_entries:
+                return None
+            future = Future()
+            session_entries[key] = {'future': future, 'created': time.monotonic()}
+            self.stats['speculated'] += 1
+            return future
+    
+    def take(self, session_id: str, version: Tuple, parsed_action: Dict[str, Any]) -> Optional[Future]:
+        """Retire et retourne la spéculation correspondant à l'action réelle, s'il y en a une"""
+        with self.lock:
+            self._discard_stale(session_id, version)
+            session_entries = self.entries.get(session_id)
+            if not session_entries:
+                return None
+            
+            entry = session_entries.pop(self.action_key(parsed_action), None)
+            if entry is None or time.monotonic() - entry['created'] > self.ttl_seconds:
+                self.stats['misses'] += 1
+                if entry is not None:
+                    self._count_wasted(entry)
+                return None
+            self.stats['hits'] += 1
+            return entry['future']
+    
+    def record_served(self, tokens: int) -> None:
+        with self.lock:
+            self.stats['served_tokens'] += tokens
+    
+    def record_failure(self) -> None:
+        with self.lock:
+            self.stats['failed'] += 1
+    
+    def drop_session(self, session_id: str) -> None:
+        with self.lock:
+            for entry in self.entries.pop(session_id, {}).values():
+                self._count_wasted(entry)
+            self.versions.pop(session_id, None)
+    
+    def _discard_stale(self, session_id: str, version: Tuple) -> None:
+        """L'état a changé depuis la spéculation: les narrations anticipées sont perdues"""
+        if self.versions.get(session_id) == version:
+            return
+        for entry in self.entries.pop(session_id, {}).values():
+            self._count_wasted(entry)
+        self.versions[session_id] = version
+    
+    def _count_wasted(self, entry: Dict[str, Any]) -> None:
+        self.stats['wasted'] += 1
+        future = entry['future']
+        if future.done() and not future.exception():
+            self.stats['wasted_tokens'] += future.result()[1]
+    
+    def metrics(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return dict(
+                self.stats,
+                pending=sum(len(entries) for entries in self.entries.values()),
+                hit_rate=self.stats['hits'] / lookups if lookups else 0.0,
+                waste_ratio=(self.stats['wasted_tokens'] /
+                             (self.stats['wasted_tokens'] + self.stats['served_tokens']))
+                            if self.stats['wasted_tokens'] + self.stats['served_tokens'] else 0.0
+            )
+
+def predict_next_actions(context: Dict[str, Any], action_types: List[str], limit: int) -> List[str]:
+    """
+    Actions les plus probables au prochain tour, formulées en texte joueur:
+    dialogue avec les PNJ présents, prise des objets présents, combat contre les PNJ hostiles,
+    observation des lieux. Les types d'action récents du joueur pondèrent les candidats.
+    """
+    world_state = context.get('world_state', {})
+    recent_actions = context.get('arc_state', {}).get('recent_actions', [])
+    
+    candidates = [('exploration', "Je regarde autour de moi")]
+    for npc in world_state.get('npcs_here', []):
+        candidates.append(('dialogue', f"Je parle à {npc.get('name', '')}"))
+        if npc.get('disposition') == 'hostile':
+            candidates.append(('combat', f"J'attaque {npc.get('name', '')}"))
+    for item in world_state.get('items_here', []):
+        candidates.append(('inventory', f"Je prends {item.get('name', '')}"))
+    
+    # Tri stable: à score égal, l'ordre ci-dessus (observation, PNJ, objets) est conservé
+    candidates = [candidate for candidate in candidates if candidate[0] in action_types]
+    candidates.sort(key=lambda candidate: -(1 + recent_actions.count(candidate[0])))
+    return [text for _, text in candidates[:limit]]
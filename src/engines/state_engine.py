@@ -3,16 +3,20 @@ Source de vérité unique pour l'état du jeu, gestion de la cohérence et compr
 """
 
 import json
+import re
+import threading
 import uuid
+from collections import Counter
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, Callable
 from dataclasses import asdict
 import copy
 
 from src.models.game_state import (
     GameState, Player, WorldState, Quest, NPC, Location, 
-    InventoryItem, NarrativeEntry, PlayerStats
+    InventoryItem, NarrativeEntry, PlayerStats, ArcState
 )
+from src.utils.timer_wheel import HierarchicalTimerWheel
 
 class StateEngine:
     """
@@ -28,8 +32,16 @@ class StateEngine:
         self.sessions: Dict[str, GameState] = {}
         self.state_history: Dict[str, List[Dict[str, Any]]] = {}
         self.compression_counters: Dict[str, int] = {}
+        self.compressing: set = set()  # sessions dont le résumé est en cours (résumé hors du tour)
+        self.compression_lock = threading.Lock()
+        self.quest_timers: Dict[str, Tuple[GameState, HierarchicalTimerWheel]] = {}
+        # Sessions modifiées par des mutations unitaires (PNJ, lieux, quêtes, événements) depuis le
+        # dernier instantané: un seul instantané en fin de tour, de pas de simulation ou avant sauvegarde
+        self.dirty_sessions: set = set()
         self.max_history_size = 10  # Nombre de versions d'état à conserver
         self.compression_threshold = 15  # Compression après X actions
+        self.recent_window = 6  # Entrées narratives conservées telles quelles après compression
+        self.summary_max_chars = 1200  # Taille maximale du résumé glissant
         
     def create_session(self, player_name: str = "Aventurier", 
                       universe: str = "fantasy", 
@@ -157,8 +169,354 @@ class StateEngine:
         self._save_state_snapshot(session_id)
         return True
     
+    def add_npc(self, session_id: str, npc: NPC) -> bool:
+        """Ajoute un NPC au monde (index spatial mis à jour)"""
+        if session_id not in self.sessions:
+            return False
+        
+        self.sessions[session_id].world_state.add_npc(npc)
+        self.dirty_sessions.add(session_id)
+        return True
+    
+    def remove_npc(self, session_id: str, npc_id: str) -> bool:
+        """Retire un NPC du monde"""
+        if session_id not in self.sessions:
+            return False
+        
+        if self.sessions[session_id].world_state.remove_npc(npc_id) is None:
+            return False
+        
+        self.dirty_sessions.add(session_id)
+        return True
+    
+    def move_npc(self, session_id: str, npc_id: str, location_id: str) -> bool:
+        """Déplace un NPC vers un autre lieu"""
+        if session_id not in self.sessions:
+            return False
+        
+        if not self.sessions[session_id].world_state.move_npc(npc_id, location_id):
+            return False
+        
+        self.dirty_sessions.add(session_id)
+        return True
+    
+    def connect_locations(self, session_id: str, location_a: str, location_b: str) -> bool:
+        """Relie deux lieux du monde"""
+        if session_id not in self.sessions:
+            return False
+        
+        if not self.sessions[session_id].world_state.connect_locations(location_a, location_b):
+            return False
+        
+        self.dirty_sessions.add(session_id)
+        return True
+    
+    def disconnect_locations(self, session_id: str, location_a: str, location_b: str) -> bool:
+        """Supprime la connexion entre deux lieux du monde"""
+        if session_id not in self.sessions:
+            return False
+        
+        if not self.sessions[session_id].world_state.disconnect_locations(location_a, location_b):
+            return False
+        
+        self.dirty_sessions.add(session_id)
+        return True
+    
+    def add_quest(self, session_id: str, quest: Quest) -> bool:
+        """Ajoute une quête; une limite de temps devient une échéance en temps de jeu"""
+        if session_id not in self.sessions:
+            return False
+        
+        game_state = self.sessions[session_id]
+        if quest.deadline is None and quest.time_limit is not None:
+            quest.deadline = game_state.world_state.game_time + quest.time_limit
+        game_state.quests.append(quest)
+        
+        if quest.status == 'active' and quest.deadline is not None:
+            self._get_quest_timers(session_id).schedule(quest.id, quest.deadline)
+        
+        self.dirty_sessions.add(session_id)
+        return True
+    
+    def update_quest_status(self, session_id: str, quest_id: str, new_status: str) -> bool:
+        """Change le statut d'une quête (l'échéance est annulée si elle n'est plus active)"""
+        if session_id not in self.sessions:
+            return False
+        
+        quest = next((q for q in self.sessions[session_id].quests if q.id == quest_id), None)
+        if quest is None:
+            return False
+        
+        quest.status = new_status
+        if new_status != 'active':
+            self._get_quest_timers(session_id).cancel(quest_id)
+        
+        self.dirty_sessions.add(session_id)
+        return True
+    
+    def collect_expired_quests(self, session_id: str) -> List[Quest]:
+        """Retourne les quêtes actives dont l'échéance est atteinte à l'heure de jeu actuelle"""
+        if session_id not in self.sessions:
+            return []
+        
+        game_state = self.sessions[session_id]
+        expired_ids = set(self._get_quest_timers(session_id).advance(game_state.world_state.game_time))
+        if not expired_ids:
+            return []
+        
+        return [q for q in game_state.quests if q.id in expired_ids and q.status == 'active']
+    
+    def _get_quest_timers(self, session_id: str) -> HierarchicalTimerWheel:
+        """Roue des échéances de quêtes, reconstruite depuis Quest.deadline après un chargement"""
+        game_state = self.sessions[session_id]
+        entry = self.quest_timers.get(session_id)
+        if entry is not None and entry[0] is game_state:
+            return entry[1]
+        
+        timers = HierarchicalTimerWheel(start_time=game_state.world_state.game_time)
+        for quest in game_state.quests:
+            if quest.status != 'active':
+                continue
+            if quest.deadline is None and quest.time_limit is not None:
+                quest.deadline = game_state.world_state.game_time + quest.time_limit
+            if quest.deadline is not None:
+                timers.schedule(quest.id, quest.deadline)
+        
+        self.quest_timers[session_id] = (game_state, timers)
+        return timers
+    
+    def advance_game_time(self, session_id: str, hours: float) -> Optional[float]:
+        """Avance l'horloge de jeu de la session et retourne la nouvelle heure de jeu"""
+        if session_id not in self.sessions:
+            return None
+        
+        return self.sessions[session_id].world_state.advance_time(hours)
+    
+    def add_world_event(self, session_id: str, event: Dict[str, Any]) -> bool:
+        """Ajoute un événement global au monde"""
+        if session_id not in self.sessions:
+            return False
+        
+        world_state = self.sessions[session_id].world_state
+        world_state.global_events.append(event)
+        
+        self.dirty_sessions.add(session_id)
+        return True
+    
+    def add_narrative_entry(self, session_id: str, entry: Dict[str, Any]) -> bool:
+        """Ajoute une entrée à l'historique narratif (type, content, metadata)"""
+        if session_id not in self.sessions:
+            return False
+        
+        game_state = self.sessions[session_id]
+        game_state.narrative_history.append(NarrativeEntry(
+            id=entry.get('id') or str(uuid.uuid4()),
+            type=entry.get('type', 'system_event'),
+            content=entry.get('content', ''),
+            timestamp=datetime.now(),
+            metadata=entry.get('metadata', {})
+        ))
+        game_state.arc_state.record_entry(
+            entry.get('type', 'system_event'),
+            entry.get('metadata', {}).get('parsed', {}).get('action_type')
+        )
+        game_state.last_updated = datetime.now()
+        self.compression_counters[session_id] = self.compression_counters.get(session_id, 0) + 1
+        return True
+    
+    def get_arc_state(self, session_id: str) -> Optional[ArcState]:
+        """État incrémental de l'arc narratif d'une session"""
+        game_state = self.sessions.get(session_id)
+        return game_state.arc_state if game_state else None
+    
+    def update_narrative_phase(self, session_id: str, phase: str) -> bool:
+        """Impose la phase de l'arc narratif (transition d'arc)"""
+        if session_id not in self.sessions:
+            return False
+        
+        self.sessions[session_id].arc_state.phase = phase
+        return True
+    
+    def needs_compression(self, session_id: str) -> bool:
+        """Vrai lorsque compression_threshold entrées ont été ajoutées depuis la dernière compression"""
+        return self.compression_counters.get(session_id, 0) >= self.compression_threshold
+    
+    def schedule_compression(self, session_id: str, summarize_fn: Callable[[str, List[Dict[str, Any]]], str],
+                             executor) -> None:
+        """Compression en arrière-plan sur executor; le compteur repart de zéro dès la planification"""
+        self.compression_counters[session_id] = 0
+        executor.submit(self.compress_context, session_id, summarize_fn)
+    
+    def compress_context(self, session_id: str,
+                         summarize_fn: Optional[Callable[[str, List[Dict[str, Any]]], str]] = None) -> bool:
+        """
+        Compression contextuelle: les entrées antérieures aux `recent_window` dernières sont
+        fusionnées dans une entrée 'summary' unique en tête de l'historique.
+        summarize_fn(résumé_précédent, entrées) produit le nouveau résumé (ex: via LLM);
+        en cas d'échec ou d'absence, un résumé heuristique local est utilisé.
+        Peut s'exécuter hors du tour de jeu: les entrées ajoutées pendant le résumé sont conservées.
+        """
+        if session_id not in self.sessions:
+            return False
+        
+        with self.compression_lock:
+            if session_id in self.compressing:
+                return False
+            self.compressing.add(session_id)
+        try:
+            return self._compress_context(session_id, summarize_fn)
+        finally:
+            with self.compression_lock:
+                self.compressing.discard(session_id)
+    
+    def _compress_context(self, session_id: str,
+                          summarize_fn: Optional[Callable[[str, List[Dict[str, Any]]], str]]) -> bool:
+        game_state = self.sessions[session_id]
+        history = game_state.narrative_history
+        previous = history[0] if history and history[0].type == 'summary' else None
+        entries = history[1:] if previous else history
+        self.compression_counters[session_id] = 0
+        
+        if len(entries) <= self.recent_window:
+            return True
+        
+        to_fold = entries[:-self.recent_window]
+        folded = len(history) - self.recent_window
+        previous_summary = previous.content if previous else ''
+        previous_metadata = previous.metadata if previous else {}
+        
+        summary = None
+        method = 'llm'
+        if summarize_fn:
+            try:
+                summary = summarize_fn(previous_summary, [entry.to_dict() for entry in to_fold])
+            except Exception as e:
+                print(f"Erreur lors du résumé narratif, repli heuristique: {e}")
+        if not summary:
+            summary = self._heuristic_summary(previous_summary, to_fold)
+            method = 'heuristic'
+        
+        action_types = Counter(previous_metadata.get('action_types', {}))
+        action_types.update(
+            entry.metadata.get('parsed', {}).get('action_type', 'exploration')
+            for entry in to_fold if entry.type == 'user_action'
+        )
+        
+        # Historique remplacé pendant le résumé (restauration, nouvelle session): résumé abandonné
+        history = game_state.narrative_history
+        if self.sessions.get(session_id) is not game_state or len(history) < folded or (
+                history[folded - 1] is not to_fold[-1]):
+            return False
+        
+        # Remplacement en place du préfixe résumé: un ajout concurrent reste dans la liste
+        history[:folded] = [NarrativeEntry(
+            id=str(uuid.uuid4()),
+            type='summary',
+            content=self._clip_summary(summary),
+            timestamp=to_fold[-1].timestamp,
+            metadata={
+                'entries': previous_metadata.get('entries', 0) + len(to_fold),
+                'action_types': dict(action_types),
+                'method': method
+            }
+        )]
+        
+        self._save_state_snapshot(session_id)
+        return True
+    
+    def _heuristic_summary(self, previous_summary: str, entries: List[NarrativeEntry]) -> str:
+        """Résumé local: actions du joueur par type et première phrase de chaque réponse du MJ"""
+        action_counts = Counter(
+            entry.metadata.get('parsed', {}).get('action_type', 'exploration')
+            for entry in entries if entry.type == 'user_action'
+        )
+        parts = [previous_summary] if previous_summary else []
+        if action_counts:
+            parts.append('Actions du joueur: ' + ', '.join(
+                f"{action_type} x{count}" for action_type, count in action_counts.most_common()
+            ) + '.')
+        for entry in entries:
+            if entry.type == 'narrative_response' and entry.content:
+                first_sentence = re.split(r'(?<=[.!?])\s', entry.content.strip(), maxsplit=1)[0]
+                parts.append(first_sentence[:160])
+        return ' '.join(parts)
+    
+    def _clip_summary(self, summary: str) -> str:
+        """Borne le résumé en conservant sa partie la plus récente"""
+        summary = summary.strip()
+        if len(summary) <= self.summary_max_chars:
+            return summary
+        clipped = summary[-self.summary_max_chars:]
+        return '...' + clipped[clipped.find(' ') + 1:] if ' ' in clipped else clipped
+    
+    def get_full_context(self, session_id: str, include_world: bool = False) -> Dict[str, Any]:
+        """
+        Extrait le contexte d'une session pour les autres moteurs. Par défaut seuls les NPCs et
+        objets du lieu du joueur sont inclus (coût indépendant de la taille du monde);
+        include_world=True ajoute 'npcs', tous les NPCs du monde (objets NPC, pour la simulation).
+        """
+        if session_id not in self.sessions:
+            return {}
+        
+        game_state = self.sessions[session_id]
+        player = game_state.player
+        world_state = game_state.world_state
+        current_location = world_state.locations.get(world_state.current_location)
+        npcs_here = [npc.to_dict() for npc in world_state.npcs_at(world_state.current_location)]
+        items_here = [item.to_dict() for item in world_state.items_at(world_state.current_location)]
+        
+        context = {
+            'session': {
+                'session_id': session_id,
+                'universe': game_state.game_settings.get('universe', 'fantasy'),
+                'narrative_style': game_state.game_settings.get('narrative_style', 'epic'),
+                'game_time': world_state.game_time
+            },
+            'player': {
+                'name': player.name,
+                'character_class': player.character_class,
+                'level': player.stats.level,
+                'current_location': world_state.current_location
+            },
+            'player_stats': player.stats.to_dict(),
+            'inventory': [item.to_dict() for item in player.inventory],
+            'world_state': {
+                'current_location': current_location.to_dict() if current_location else {},
+                'time_of_day': world_state.time_of_day,
+                'weather': world_state.weather,
+                'game_time': world_state.game_time,
+                'npcs_here': npcs_here,
+                'items_here': items_here
+            },
+            'npcs_here': npcs_here,
+            'active_quests': [
+                dict(quest.to_dict(), remaining_time=(
+                    quest.deadline - world_state.game_time if quest.deadline is not None else None
+                ))
+                for quest in game_state.quests if quest.status == 'active'
+            ],
+            'narrative_history': [entry.to_dict() for entry in game_state.narrative_history],
+            'arc_state': game_state.arc_state.to_dict(),
+            'narrative_summary': next(
+                (entry.content for entry in game_state.narrative_history[:1] if entry.type == 'summary'), ''
+            )
+        }
+        
+        if include_world:
+            context['npcs'] = list(world_state.npcs.values())
+        return context
+    
+    def commit_turn(self, session_id: str) -> bool:
+        """Instantané de fin de tour, seulement si l'état a changé depuis le précédent"""
+        if session_id not in self.dirty_sessions:
+            return False
+        
+        self._save_state_snapshot(session_id)
+        return True
+    
     def _save_state_snapshot(self, session_id: str):
         """Sauvegarde un instantané de l'état"""
+        self.dirty_sessions.discard(session_id)
         if session_id not in self.sessions:
             return
         
@@ -3,7 +3,7 @@ Modèles de données pour l'état du jeu - Architecture des 4 Moteurs
 """
 
 from dataclasses import dataclass, field
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Set
 from datetime import datetime
 import json
 
@@ -86,6 +86,7 @@ class NPC:
     motivations: List[str] = field(default_factory=list) # Ex: ['protéger le village', 'chercher de la nourriture']
     daily_routine: List[Dict[str, Any]] = field(default_factory=list) # Ex: [{'time': 'morning', 'action': 'aller au marché'}]
     relationships: Dict[str, str] = field(default_factory=dict) # Ex: {'npc_id_1': 'ami', 'faction_id_A': 'ennemi'}
+    relationship_weights: Dict[str, float] = field(default_factory=dict) # Ex: {'npc_id_1': 0.6}, dans [-1, 1]
     
     def to_dict(self) -> dict:
         return {
@@ -98,7 +99,8 @@ class NPC:
             'inventory': [item.to_dict() for item in self.inventory],
             'motivations': self.motivations,
             'daily_routine': self.daily_routine,
-            'relationships': self.relationships
+            'relationships': self.relationships,
+            'relationship_weights': self.relationship_weights
         }
 
 @dataclass
@@ -134,6 +136,8 @@ class Quest:
     status: str  # active, completed, failed
     objectives: List[Dict[str, Any]] = field(default_factory=list)
     rewards: List[InventoryItem] = field(default_factory=list)
+    time_limit: Optional[float] = None  # Durée accordée en heures de jeu
+    deadline: Optional[float] = None  # Échéance absolue (WorldState.game_time)
     
     def to_dict(self) -> dict:
         return {
@@ -142,14 +146,16 @@ class Quest:
             'description': self.description,
             'status': self.status,
             'objectives': self.objectives,
-            'rewards': [reward.to_dict() for reward in self.rewards]
+            'rewards': [reward.to_dict() for reward in self.rewards],
+            'time_limit': self.time_limit,
+            'deadline': self.deadline
         }
 
 @dataclass
 class NarrativeEntry:
     """Entrée narrative"""
     id: str
-    type: str  # user_action, ai_response, system_event
+    type: str  # user_action, ai_response, narrative_response, system_event, summary
     content: str
     timestamp: datetime
     metadata: Dict[str, Any] = field(default_factory=dict)
@@ -163,6 +169,70 @@ class NarrativeEntry:
             'metadata': self.metadata
         }
 
+@dataclass
+class ArcState:
+    """
+    État incrémental de l'arc narratif: mis à jour en O(1) à chaque entrée d'historique,
+    indépendamment de la longueur (ou de la compression) de narrative_history
+    """
+    total_entries: int = 0
+    action_counts: Dict[str, int] = field(default_factory=dict)
+    dominant_action: Optional[str] = None
+    recent_actions: List[str] = field(default_factory=list)  # 5 derniers types d'action
+    phase: Optional[str] = None  # Phase imposée par une transition d'arc
+    
+    RECENT_SIZE = 5
+    
+    def record_entry(self, entry_type: str, action_type: Optional[str] = None) -> None:
+        """Comptabilise une nouvelle entrée narrative"""
+        self.total_entries += 1
+        if entry_type != 'user_action':
+            return
+        
+        action_type = action_type or 'exploration'
+        count = self.action_counts.get(action_type, 0) + 1
+        self.action_counts[action_type] = count
+        if self.dominant_action is None or count > self.action_counts.get(self.dominant_action, 0):
+            self.dominant_action = action_type
+        
+        self.recent_actions.append(action_type)
+        if len(self.recent_actions) > self.RECENT_SIZE:
+            self.recent_actions.pop(0)
+    
+    @classmethod
+    def from_history(cls, entries: List['NarrativeEntry']) -> 'ArcState':
+        """Reconstruit l'état d'arc depuis un historique (sessions antérieures au suivi incrémental)"""
+        arc_state = cls()
+        for entry in entries:
+            if entry.type == 'summary':
+                arc_state.total_entries += entry.metadata.get('entries', 0)
+                for action_type, count in entry.metadata.get('action_types', {}).items():
+                    for _ in range(count):
+                        arc_state.record_entry('user_action', action_type)
+                    arc_state.total_entries -= count
+            else:
+                arc_state.record_entry(entry.type, entry.metadata.get('parsed', {}).get('action_type'))
+        return arc_state
+    
+    def to_dict(self) -> dict:
+        return {
+            'total_entries': self.total_entries,
+            'action_counts': self.action_counts,
+            'dominant_action': self.dominant_action,
+            'recent_actions': self.recent_actions,
+            'phase': self.phase
+        }
+
+def time_of_day_for_hour(hour: float) -> str:
+    """Retourne le moment de la journée (dawn, day, dusk, night) pour une heure de jeu"""
+    if 5 <= hour < 7:
+        return "dawn"
+    if 7 <= hour < 18:
+        return "day"
+    if 18 <= hour < 21:
+        return "dusk"
+    return "night"
+
 @dataclass
 class WorldState:
     """État du monde"""
@@ -172,12 +242,179 @@ class WorldState:
     locations: Dict[str, Location] = field(default_factory=dict)
     npcs: Dict[str, NPC] = field(default_factory=dict)
     global_events: List[Dict[str, Any]] = field(default_factory=list)
+    game_time: float = 8.0  # Heures de jeu écoulées depuis le début (jour 0, 8h)
+    # Index spatiaux (lieu -> NPCs, lieu -> objets), maintenus par add/move/remove
+    _npcs_by_location: Dict[str, Set[str]] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _items_by_location: Dict[str, Dict[str, InventoryItem]] = field(default_factory=dict, init=False, repr=False, compare=False)
+    # Version du graphe des lieux et journal des modifications (pour l'invalidation des itinéraires)
+    topology_version: int = field(default=0, init=False, compare=False)
+    _topology_changes: List[Dict[str, Any]] = field(default_factory=list, init=False, repr=False, compare=False)
+    # Version des entités nommées (NPCs, objets au sol, lieux) et journal des modifications (index des noms)
+    entity_version: int = field(default=0, init=False, compare=False)
+    _entity_changes: List[Dict[str, Any]] = field(default_factory=list, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        self.rebuild_spatial_index()
+    
+    def rebuild_spatial_index(self) -> None:
+        """Reconstruit les index spatiaux à partir de NPC.location et Location.items"""
+        self._npcs_by_location = {}
+        for location in self.locations.values():
+            location.npcs = []
+        for npc in self.npcs.values():
+            self._index_npc(npc)
+        
+        self._items_by_location = {
+            loc_id: {item.id: item for item in location.items}
+            for loc_id, location in self.locations.items()
+        }
+        # Journal vidé: les index de noms existants se reconstruisent entièrement
+        self.entity_version += 1
+        self._entity_changes = []
+    
+    def _index_npc(self, npc: NPC) -> None:
+        self._npcs_by_location.setdefault(npc.location, set()).add(npc.id)
+        location = self.locations.get(npc.location)
+        if location is not None and npc.id not in location.npcs:
+            location.npcs.append(npc.id)
+    
+    def _unindex_npc(self, npc: NPC) -> None:
+        present = self._npcs_by_location.get(npc.location)
+        if present is not None:
+            present.discard(npc.id)
+            if not present:
+                del self._npcs_by_location[npc.location]
+        location = self.locations.get(npc.location)
+        if location is not None and npc.id in location.npcs:
+            location.npcs.remove(npc.id)
+    
+    def add_npc(self, npc: NPC) -> None:
+        """Ajoute (ou remplace) un NPC et l'indexe à son lieu"""
+        previous = self.npcs.get(npc.id)
+        if previous is not None:
+            self._unindex_npc(previous)
+        self.npcs[npc.id] = npc
+        self._index_npc(npc)
+        self._record_entity_change('npc', npc.id, npc.location)
+    
+    def remove_npc(self, npc_id: str) -> Optional[NPC]:
+        """Retire un NPC du monde"""
+        npc = self.npcs.pop(npc_id, None)
+        if npc is not None:
+            self._unindex_npc(npc)
+            self._record_entity_change('npc', npc_id, npc.location)
+        return npc
+    
+    def move_npc(self, npc_id: str, location_id: str) -> bool:
+        """Déplace un NPC vers un autre lieu"""
+        npc = self.npcs.get(npc_id)
+        if npc is None:
+            return False
+        self._unindex_npc(npc)
+        npc.location = location_id
+        self._index_npc(npc)
+        self._record_entity_change('npc', npc_id, location_id)
+        return True
+    
+    def add_location(self, location: Location) -> None:
+        """Ajoute un lieu et ses connexions au graphe du monde"""
+        self.locations[location.id] = location
+        self._items_by_location[location.id] = {item.id: item for item in location.items}
+        self._record_topology_change('add_location', location.id)
+        self._record_entity_change('location', location.id, location.id)
+    
+    def connect_locations(self, location_a: str, location_b: str) -> bool:
+        """Relie deux lieux (connexion bidirectionnelle)"""
+        if location_a not in self.locations or location_b not in self.locations:
+            return False
+        for source, target in ((location_a, location_b), (location_b, location_a)):
+            if target not in self.locations[source].connections:
+                self.locations[source].connections.append(target)
+        self._record_topology_change('connect', location_a, location_b)
+        return True
+    
+    def disconnect_locations(self, location_a: str, location_b: str) -> bool:
+        """Supprime la connexion entre deux lieux"""
+        if location_a not in self.locations or location_b not in self.locations:
+            return False
+        for source, target in ((location_a, location_b), (location_b, location_a)):
+            if target in self.locations[source].connections:
+                self.locations[source].connections.remove(target)
+        self._record_topology_change('disconnect', location_a, location_b)
+        return True
+    
+    def topology_changes_since(self, version: int) -> Optional[List[Dict[str, Any]]]:
+        """Modifications du graphe depuis une version (None si le journal ne remonte pas assez loin)"""
+        if version == self.topology_version:
+            return []
+        oldest = self.topology_version - len(self._topology_changes)
+        if version < oldest:
+            return None
+        return self._topology_changes[version - oldest:]
+    
+    def _record_topology_change(self, kind: str, *location_ids: str) -> None:
+        self.topology_version += 1
+        self._topology_changes.append({'kind': kind, 'locations': location_ids})
+        if len(self._topology_changes) > 256:
+            self._topology_changes.pop(0)
+    
+    def entity_changes_since(self, version: int) -> Optional[List[Dict[str, Any]]]:
+        """Entités ajoutées, déplacées ou retirées depuis une version (None si le journal ne remonte pas assez loin)"""
+        if version == self.entity_version:
+            return []
+        oldest = self.entity_version - len(self._entity_changes)
+        if version < oldest:
+            return None
+        return self._entity_changes[version - oldest:]
+    
+    def _record_entity_change(self, kind: str, entity_id: str, location_id: str) -> None:
+        self.entity_version += 1
+        self._entity_changes.append({'kind': kind, 'id': entity_id, 'location': location_id})
+        if len(self._entity_changes) > 256:
+            self._entity_changes.pop(0)
+    
+    def npcs_at(self, location_id: str) -> List[NPC]:
+        """Retourne les NPCs présents dans un lieu"""
+        return [self.npcs[npc_id] for npc_id in self._npcs_by_location.get(location_id, ())]
+    
+    def add_item(self, location_id: str, item: InventoryItem) -> bool:
+        """Dépose un objet au sol dans un lieu"""
+        location = self.locations.get(location_id)
+        if location is None:
+            return False
+        location_items = self._items_by_location.setdefault(location_id, {})
+        previous = location_items.get(item.id)
+        if previous is not None:
+            location.items.remove(previous)
+        location.items.append(item)
+        location_items[item.id] = item
+        self._record_entity_change('item', item.id, location_id)
+        return True
+    
+    def remove_item(self, location_id: str, item_id: str) -> Optional[InventoryItem]:
+        """Retire un objet du sol d'un lieu"""
+        item = self._items_by_location.get(location_id, {}).pop(item_id, None)
+        if item is not None:
+            self.locations[location_id].items.remove(item)
+            self._record_entity_change('item', item_id, location_id)
+        return item
+    
+    def items_at(self, location_id: str) -> List[InventoryItem]:
+        """Retourne les objets au sol dans un lieu"""
+        return list(self._items_by_location.get(location_id, {}).values())
+    
+    def advance_time(self, hours: float) -> float:
+        """Avance l'horloge de jeu et met à jour le moment de la journée"""
+        self.game_time += max(0.0, hours)
+        self.time_of_day = time_of_day_for_hour(self.game_time % 24)
+        return self.game_time
     
     def to_dict(self) -> dict:
         return {
             'current_location': self.current_location,
             'time_of_day': self.time_of_day,
             'weather': self.weather,
+            'game_time': self.game_time,
             'locations': {k: v.to_dict() for k, v in self.locations.items()},
             'npcs': {k: v.to_dict() for k, v in self.npcs.items()},
             'global_events': self.global_events
@@ -191,6 +428,7 @@ class GameState:
     world_state: WorldState
     quests: List[Quest] = field(default_factory=list)
     narrative_history: List[NarrativeEntry] = field(default_factory=list)
+    arc_state: ArcState = field(default_factory=ArcState)
     game_settings: Dict[str, Any] = field(default_factory=dict)
     created_at: datetime = field(default_factory=datetime.now)
     last_updated: datetime = field(default_factory=datetime.now)
@@ -202,6 +440,7 @@ class GameState:
             'world_state': self.world_state.to_dict(),
             'quests': [quest.to_dict() for quest in self.quests],
             'narrative_history': [entry.to_dict() for entry in self.narrative_history],
+            'arc_state': self.arc_state.to_dict(),
             'game_settings': self.game_settings,
             'created_at': self.created_at.isoformat(),
             'last_updated': self.last_updated.isoformat()
@@ -255,7 +494,8 @@ class GameState:
                 inventory=npc_inventory,
                 motivations=npc_data.get('motivations', []),
                 daily_routine=npc_data.get('daily_routine', []),
-                relationships=npc_data.get('relationships', {})
+                relationships=npc_data.get('relationships', {}),
+                relationship_weights=npc_data.get('relationship_weights', {})
             )
         
         world_state = WorldState(
@@ -264,7 +504,8 @@ class GameState:
             weather=world_data['weather'],
             locations=locations,
             npcs=npcs,
-            global_events=world_data['global_events']
+            global_events=world_data['global_events'],
+            game_time=world_data.get('game_time', 8.0)
         )
         
         # Reconstruction des quêtes
@@ -277,7 +518,9 @@ class GameState:
                 description=quest_data['description'],
                 status=quest_data['status'],
                 objectives=quest_data['objectives'],
-                rewards=rewards
+                rewards=rewards,
+                time_limit=quest_data.get('time_limit'),
+                deadline=quest_data.get('deadline')
             ))
         
         # Reconstruction de l'historique narratif
@@ -291,12 +534,16 @@ class GameState:
                 metadata=entry_data['metadata']
             ))
         
+        arc_data = data.get('arc_state')
+        arc_state = ArcState(**arc_data) if arc_data else ArcState.from_history(narrative_history)
+        
         return cls(
             session_id=data['session_id'],
             player=player,
             world_state=world_state,
             quests=quests,
             narrative_history=narrative_history,
+            arc_state=arc_state,
             game_settings=data['game_settings'],
             created_at=datetime.fromisoformat(data['created_at']),
             last_updated=datetime.fromisoformat(data['last_updated'])
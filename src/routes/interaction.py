@@ -1,7 +1,8 @@
+import os
 from flask import Blueprint, request, jsonify
 from src.engines.interaction_engine import InteractionEngine
 from src.engines.simulation_engine import SimulationEngine
-from src.engines.state_engine import StateEngine
+from src.engines.state_engine import state_engine
 from src.engines.narrative_engine import NarrativeEngine
 from src.models.game_state import GameState
 from src.utils.session_manager import session_manager
@@ -12,9 +13,17 @@ interaction_bp = Blueprint('interaction', __name__)
 # Initialiser les moteurs
 interaction_engine = InteractionEngine()
 simulation_engine = SimulationEngine()
-state_engine = StateEngine()
 narrative_engine = NarrativeEngine()
 
+def _session_context(session_id: str):
+    """
+    Contexte de jeu d'une session active, résolu comme dans le reste de l'API (moteur d'état global);
+    None si la session n'existe pas. Partagé par les routes unitaires et par lots.
+    """
+    if not session_id or state_engine.get_session(session_id) is None:
+        return None
+    return state_engine.get_full_context(session_id)
+
 @interaction_bp.route('/process_complete_action', methods=['POST'])
 def process_complete_action():
     """Endpoint principal pour traiter une action complète du joueur"""
@@ -27,17 +36,10 @@ def process_complete_action():
             return jsonify({'error': 'session_id et action sont requis'}), 400
         
         # Récupérer le contexte de jeu
-        game_state = session_manager.get_session(session_id)
-        if not game_state:
+        context = _session_context(session_id)
+        if context is None:
             return jsonify({'error': 'Session non trouvée'}), 404
         
-        context = {
-            'player_stats': game_state.player_stats,
-            'world_state': game_state.world_state,
-            'inventory': game_state.inventory,
-            'location': game_state.current_location
-        }
-        
         # 1. Moteur d'Interaction - Parser l'action
         parsed_action = interaction_engine.parse_action(action_text, context)
         
@@ -85,16 +87,7 @@ def parse_action():
             return jsonify({'error': 'Action text is required'}), 400
         
         # Récupérer le contexte si session_id fourni
-        context = {}
-        if session_id:
-            game_state = session_manager.get_session(session_id)
-            if game_state:
-                context = {
-                    'player_stats': game_state.player_stats,
-                    'world_state': game_state.world_state,
-                    'inventory': game_state.inventory,
-                    'location': game_state.current_location
-                }
+        context = (_session_context(session_id) if session_id else None) or {}
         
         parsed_action = interaction_engine.parse_action(action_text, context)
         
@@ -117,17 +110,10 @@ def validate_action():
         if not parsed_action or not session_id:
             return jsonify({'error': 'parsed_action et session_id sont requis'}), 400
         
-        game_state = session_manager.get_session(session_id)
-        if not game_state:
+        context = _session_context(session_id)
+        if context is None:
             return jsonify({'error': 'Session non trouvée'}), 404
         
-        context = {
-            'player_stats': game_state.player_stats,
-            'world_state': game_state.world_state,
-            'inventory': game_state.inventory,
-            'location': game_state.current_location
-        }
-        
         validation_result = interaction_engine.validate_action(parsed_action, context)
         
         return jsonify({
@@ -138,6 +124,85 @@ def validate_action():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _batch_list(data: dict, field: str):
+    """Liste d'éléments d'une requête par lots, ou message d'erreur"""
+    items = data.get(field)
+    if not isinstance(items, list) or not items:
+        return None, f'Liste {field} requise'
+    
+    max_items = int(os.getenv('INTERACTION_BATCH_MAX_ITEMS', '200'))
+    if len(items) > max_items:
+        return None, f'Trop d\'éléments (maximum {max_items})'
+    return items, None
+
+@interaction_bp.route('/parse_action/batch', methods=['POST'])
+def parse_action_batch():
+    """
+    Parse (et valide) plusieurs actions avec un seul contexte de session.
+    Corps: {"actions": [textes], "session_id"?, "validate"?: true}
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'Aucune donnée fournie'}), 400
+        
+        actions, error = _batch_list(data, 'actions')
+        if error:
+            return jsonify({'error': error}), 400
+        
+        # Comme /parse_action: une session inconnue donne un contexte vide
+        session_id = data.get('session_id')
+        context = (_session_context(session_id) if session_id else None) or {}
+        
+        result = interaction_engine.process_batch(
+            session_id, actions=actions, validate=bool(data.get('validate', True)), context=context
+        )
+        return jsonify(result)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@interaction_bp.route('/validate_action/batch', methods=['POST'])
+def validate_action_batch():
+    """
+    Valide plusieurs actions analysées avec un seul contexte de session.
+    Corps: {"parsed_actions": [actions analysées], "session_id"}
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'Aucune donnée fournie'}), 400
+        
+        session_id = data.get('session_id')
+        if not session_id:
+            return jsonify({'error': 'session_id est requis'}), 400
+        
+        parsed_actions, error = _batch_list(data, 'parsed_actions')
+        if error:
+            return jsonify({'error': error}), 400
+        
+        context = _session_context(session_id)
+        if context is None:
+            return jsonify({'error': 'Session non trouvée'}), 404
+        
+        result = interaction_engine.process_batch(session_id, parsed_actions=parsed_actions, context=context)
+        return jsonify(result)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@interaction_bp.route('/parse_action/metrics', methods=['GET'])
+def get_parse_action_metrics():
+    """Statistiques du cache des actions analysées"""
+    try:
+        return jsonify({
+            'success': True,
+            'parse_cache': interaction_engine.get_parse_cache_metrics()
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # Fonctions internes pour appliquer les conséquences
 def _apply_action_consequences(session_id: str, parsed_action: dict, consequences: list) -> list:
     """Applique les conséquences d'une action selon son type"""
@@ -1,14 +1,23 @@
 import os
 import json
-import requests
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from dotenv import load_dotenv
 
+from src.utils.llm_http import llm_http_pool
+from src.utils.llm_async import async_llm_client
+from src.utils.llm_cache import get_llm_cache
+from src.utils.llm_router import LLMRouter
+from src.utils.single_flight import SingleFlight
+from src.utils.streaming import sse_event, iter_sse_data
+
 # Charger les variables d'environnement
 load_dotenv()
 
 llm_bp = Blueprint('llm', __name__)
 
+# Coalescence des requêtes identiques en vol (un seul appel amont partagé)
+llm_single_flight = SingleFlight(enabled=os.getenv('LLM_COALESCE_ENABLED', 'true').lower() == 'true')
+
 # Configuration des fournisseurs LLM
 LLM_PROVIDERS = {
     'deepseek': {
@@ -33,6 +42,124 @@ LLM_PROVIDERS = {
     }
 }
 
+def call_llm_provider(provider, messages, max_tokens, temperature, cache=None, models=None):
+    """
+    Appelle un fournisseur configuré, quel que soit son format d'API.
+    models: modèle à utiliser par fournisseur à la place de celui de LLM_PROVIDERS (compatibles OpenAI)
+    """
+    provider_config = LLM_PROVIDERS[provider]
+    api_key = provider_config['api_key']
+    
+    if not api_key:
+        raise Exception(f'Clé API manquante pour {provider}')
+    
+    if provider == 'gemini':
+        system_prompt = '\n\n'.join(m['content'] for m in messages if m.get('role') == 'system')
+        prompt = '\n\n'.join(m['content'] for m in messages if m.get('role') != 'system')
+        return call_gemini_api(api_key, prompt, system_prompt, temperature, max_tokens, cache)
+    
+    return call_openai_compatible_api(
+        provider_config['base_url'],
+        api_key,
+        (models or {}).get(provider) or provider_config['model'],
+        messages,
+        max_tokens,
+        temperature,
+        provider,
+        cache
+    )
+
+async def acall_llm_provider(provider, messages, max_tokens, temperature, cache=None, models=None):
+    """Équivalent asynchrone de call_llm_provider (client aiohttp, même cache et même disjoncteur)"""
+    provider_config = LLM_PROVIDERS[provider]
+    api_key = provider_config['api_key']
+    
+    if not api_key:
+        raise Exception(f'Clé API manquante pour {provider}')
+    
+    if provider == 'gemini':
+        system_prompt = '\n\n'.join(m['content'] for m in messages if m.get('role') == 'system')
+        prompt = '\n\n'.join(m['content'] for m in messages if m.get('role') != 'system')
+        model = 'gemini-pro'
+        url, headers, payload = _build_gemini_request(api_key, prompt, system_prompt, temperature, max_tokens)
+        parse = _parse_gemini_response
+        # Même clé de cache que call_gemini_api
+        messages = [{"role": "system", "content": system_prompt}] if system_prompt else []
+        messages.append({"role": "user", "content": prompt})
+    else:
+        model = (models or {}).get(provider) or provider_config['model']
+        url, headers, payload = _build_openai_compatible_request(
+            provider_config['base_url'], api_key, model, messages, max_tokens, temperature, provider
+        )
+        parse = lambda result: _parse_openai_compatible_response(result, provider, model)
+    
+    return await _acall_with_cache(
+        provider, model, messages, max_tokens, temperature, cache,
+        lambda: _apost_and_parse(provider, url, headers, payload, parse)
+    )
+
+async def _apost_and_parse(provider, url, headers, payload, parse):
+    return parse(await async_llm_client.post_json(provider, url, headers, payload))
+
+def stream_llm_provider(provider, messages, max_tokens, temperature, cache=None, models=None):
+    """
+    Équivalent en streaming de call_llm_provider: produit les fragments de texte au fil de l'eau.
+    Une réponse en cache est servie d'un bloc; un flux complet et cacheable est mis en cache.
+    """
+    provider_config = LLM_PROVIDERS[provider]
+    api_key = provider_config['api_key']
+    
+    if not api_key:
+        raise Exception(f'Clé API manquante pour {provider}')
+    
+    if provider == 'gemini':
+        system_prompt = '\n\n'.join(m['content'] for m in messages if m.get('role') == 'system')
+        prompt = '\n\n'.join(m['content'] for m in messages if m.get('role') != 'system')
+        model = 'gemini-pro'
+        # Même clé de cache que call_gemini_api
+        messages = [{"role": "system", "content": system_prompt}] if system_prompt else []
+        messages.append({"role": "user", "content": prompt})
+        tokens = stream_gemini_api(api_key, prompt, system_prompt, temperature, max_tokens)
+    else:
+        model = (models or {}).get(provider) or provider_config['model']
+        tokens = stream_openai_compatible_api(
+            provider_config['base_url'], api_key, model, messages, max_tokens, temperature, provider
+        )
+    
+    llm_cache = get_llm_cache()
+    cacheable = llm_cache.is_cacheable(temperature, cache)
+    cache_key = llm_cache.make_key(provider, model, messages, temperature, max_tokens)
+    if cacheable:
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            tokens.close()
+            yield cached['response']
+            return
+    
+    chunks = []
+    for token in tokens:
+        chunks.append(token)
+        yield token
+    if cacheable:
+        llm_cache.set(cache_key, {'success': True, 'response': ''.join(chunks), 'provider': provider, 'model': model})
+
+def get_failover_order():
+    """Ordre de basculement configuré (LLM_FAILOVER_ORDER=deepseek,openrouter,...)"""
+    order = os.getenv('LLM_FAILOVER_ORDER', '')
+    return [name.strip() for name in order.split(',') if name.strip() in LLM_PROVIDERS]
+
+# Routage entre fournisseurs: basculement ordonné et hedging optionnel
+llm_router = LLMRouter(
+    call_llm_provider,
+    LLM_PROVIDERS,
+    hedge_enabled=os.getenv('LLM_HEDGE_ENABLED', 'false').lower() == 'true',
+    hedge_percentile=float(os.getenv('LLM_HEDGE_PERCENTILE', '0.9')),
+    max_workers=int(os.getenv('LLM_HEDGE_WORKERS', '8')),
+    available_fn=llm_http_pool.is_available,
+    acall_fn=acall_llm_provider,
+    stream_fn=stream_llm_provider
+)
+
 @llm_bp.route('/llm/generate', methods=['POST'])
 def generate_text():
     """Endpoint pour générer du texte via les LLM"""
@@ -67,9 +194,19 @@ def generate_text():
             messages.append({"role": "system", "content": system_prompt})
         messages.append({"role": "user", "content": prompt})
         
-        # Appel à l'API selon le fournisseur
+        # Réponse diffusée au fil des tokens (Server-Sent Events)
+        if data.get('stream'):
+            tokens = stream_llm_provider(provider, messages, max_tokens, temperature, data.get('cache'))
+            return Response(
+                stream_with_context(_stream_tokens_as_sse(tokens, provider)),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
+        
+        # Appel à l'API selon le fournisseur (cache: true/false pour forcer ou refuser le cache)
+        cache = data.get('cache')
         if provider == 'gemini':
-            response = call_gemini_api(api_key, prompt, system_prompt)
+            response = call_gemini_api(api_key, prompt, system_prompt, temperature, max_tokens, cache)
         else:
             response = call_openai_compatible_api(
                 provider_config['base_url'],
@@ -78,7 +215,8 @@ def generate_text():
                 messages,
                 max_tokens,
                 temperature,
-                provider
+                provider,
+                cache
             )
         
         return jsonify(response)
@@ -86,8 +224,66 @@ def generate_text():
     except Exception as e:
         return jsonify({'error': f'Erreur lors de la génération: {str(e)}'}), 500
 
-def call_openai_compatible_api(base_url, api_key, model, messages, max_tokens, temperature, provider):
+def _call_with_cache(provider, model, messages, max_tokens, temperature, cache, request_fn):
+    """
+    Sert la réponse depuis le cache LLM si possible, sinon appelle le fournisseur et la mémorise.
+    Les appels identiques simultanés partagent un seul appel amont (single-flight).
+    """
+    llm_cache = get_llm_cache()
+    cacheable = llm_cache.is_cacheable(temperature, cache)
+    cache_key = llm_cache.make_key(provider, model, messages, temperature, max_tokens)
+    
+    if cacheable:
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached, cached=True)
+    
+    def fetch():
+        response = request_fn()
+        if cacheable:
+            llm_cache.set(cache_key, response)
+        return response
+    
+    return llm_single_flight.do(cache_key, fetch)
+
+async def _acall_with_cache(provider, model, messages, max_tokens, temperature, cache, request_coro_fn):
+    """Équivalent asynchrone de _call_with_cache"""
+    llm_cache = get_llm_cache()
+    cacheable = llm_cache.is_cacheable(temperature, cache)
+    cache_key = llm_cache.make_key(provider, model, messages, temperature, max_tokens)
+    
+    if cacheable:
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached, cached=True)
+    
+    async def fetch():
+        response = await request_coro_fn()
+        if cacheable:
+            llm_cache.set(cache_key, response)
+        return response
+    
+    return await llm_single_flight.ado(cache_key, fetch)
+
+def call_openai_compatible_api(base_url, api_key, model, messages, max_tokens, temperature, provider, cache=None):
     """Appel aux API compatibles OpenAI (DeepSeek, OpenRouter, Grok)"""
+    return _call_with_cache(
+        provider, model, messages, max_tokens, temperature, cache,
+        lambda: _request_openai_compatible_api(base_url, api_key, model, messages, max_tokens, temperature, provider)
+    )
+
+def _request_openai_compatible_api(base_url, api_key, model, messages, max_tokens, temperature, provider):
+    url, headers, payload = _build_openai_compatible_request(
+        base_url, api_key, model, messages, max_tokens, temperature, provider
+    )
+    
+    response = llm_http_pool.get_client(provider).post(url, headers=headers, json=payload)
+    response.raise_for_status()
+    
+    return _parse_openai_compatible_response(response.json(), provider, model)
+
+def _build_openai_compatible_request(base_url, api_key, model, messages, max_tokens, temperature, provider):
+    """Construit (url, en-têtes, corps) d'une requête compatible OpenAI"""
     headers = {
         'Content-Type': 'application/json',
         'Authorization': f'Bearer {api_key}'
@@ -105,11 +301,9 @@ def call_openai_compatible_api(base_url, api_key, model, messages, max_tokens, t
         'temperature': temperature
     }
     
-    response = requests.post(base_url, headers=headers, json=payload, timeout=30)
-    response.raise_for_status()
-    
-    result = response.json()
-    
+    return base_url, headers, payload
+
+def _parse_openai_compatible_response(result, provider, model):
     if 'choices' in result and len(result['choices']) > 0:
         return {
             'success': True,
@@ -121,8 +315,26 @@ def call_openai_compatible_api(base_url, api_key, model, messages, max_tokens, t
     else:
         raise Exception(f'Format de réponse invalide de {provider}')
 
-def call_gemini_api(api_key, prompt, system_prompt=''):
+def call_gemini_api(api_key, prompt, system_prompt='', temperature=0.7, max_tokens=2000, cache=None):
     """Appel spécifique à l'API Gemini"""
+    messages = [{"role": "system", "content": system_prompt}] if system_prompt else []
+    messages.append({"role": "user", "content": prompt})
+    
+    return _call_with_cache(
+        'gemini', 'gemini-pro', messages, max_tokens, temperature, cache,
+        lambda: _request_gemini_api(api_key, prompt, system_prompt, temperature, max_tokens)
+    )
+
+def _request_gemini_api(api_key, prompt, system_prompt, temperature, max_tokens):
+    url, headers, payload = _build_gemini_request(api_key, prompt, system_prompt, temperature, max_tokens)
+    
+    response = llm_http_pool.get_client('gemini').post(url, headers=headers, json=payload)
+    response.raise_for_status()
+    
+    return _parse_gemini_response(response.json())
+
+def _build_gemini_request(api_key, prompt, system_prompt, temperature, max_tokens):
+    """Construit (url, en-têtes, corps) d'une requête Gemini"""
     url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent?key={api_key}"
     
     # Construire le contenu
@@ -133,18 +345,16 @@ def call_gemini_api(api_key, prompt, system_prompt=''):
             "parts": [{"text": full_prompt}]
         }],
         "generationConfig": {
-            "temperature": 0.7,
-            "maxOutputTokens": 2000
+            "temperature": temperature,
+            "maxOutputTokens": max_tokens
         }
     }
     
     headers = {'Content-Type': 'application/json'}
     
-    response = requests.post(url, headers=headers, json=payload, timeout=30)
-    response.raise_for_status()
-    
-    result = response.json()
-    
+    return url, headers, payload
+
+def _parse_gemini_response(result):
     if 'candidates' in result and len(result['candidates']) > 0:
         candidate = result['candidates'][0]
         if 'content' in candidate and 'parts' in candidate['content']:
@@ -157,6 +367,85 @@ def call_gemini_api(api_key, prompt, system_prompt=''):
     
     raise Exception('Format de réponse invalide de Gemini')
 
+def _stream_tokens_as_sse(tokens, provider):
+    """Relaie les tokens d'un fournisseur sous forme d'événements SSE"""
+    try:
+        for token in tokens:
+            yield sse_event({'token': token})
+        yield sse_event({'provider': provider}, event='done')
+    except Exception as e:
+        yield sse_event({'error': f'Erreur lors de la génération: {str(e)}'}, event='error')
+
+def stream_openai_compatible_api(base_url, api_key, model, messages, max_tokens, temperature, provider):
+    """Appel en streaming aux API compatibles OpenAI; produit les fragments de texte au fil de l'eau"""
+    headers = {
+        'Content-Type': 'application/json',
+        'Authorization': f'Bearer {api_key}',
+        'Accept': 'text/event-stream'
+    }
+    
+    if provider == 'openrouter':
+        headers['HTTP-Referer'] = 'https://rpg-ai-game.com'
+        headers['X-Title'] = 'RPG AI Game'
+    
+    payload = {
+        'model': model,
+        'messages': messages,
+        'max_tokens': max_tokens,
+        'temperature': temperature,
+        'stream': True
+    }
+    
+    client = llm_http_pool.get_client(provider)
+    response = client.post(base_url, headers=headers, json=payload, stream=True)
+    try:
+        response.raise_for_status()
+        yield from client.track_stream(response, _openai_stream_tokens(response))
+    finally:
+        response.close()
+
+def _openai_stream_tokens(response):
+    for data in iter_sse_data(response.iter_lines(decode_unicode=True)):
+        chunk = json.loads(data)
+        for choice in chunk.get('choices', []):
+            token = choice.get('delta', {}).get('content')
+            if token:
+                yield token
+
+def stream_gemini_api(api_key, prompt, system_prompt='', temperature=0.7, max_tokens=2000):
+    """Appel en streaming à l'API Gemini (streamGenerateContent, format SSE)"""
+    url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:streamGenerateContent?alt=sse&key={api_key}"
+    
+    full_prompt = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
+    
+    payload = {
+        "contents": [{
+            "parts": [{"text": full_prompt}]
+        }],
+        "generationConfig": {
+            "temperature": temperature,
+            "maxOutputTokens": max_tokens
+        }
+    }
+    
+    headers = {'Content-Type': 'application/json'}
+    
+    client = llm_http_pool.get_client('gemini')
+    response = client.post(url, headers=headers, json=payload, stream=True)
+    try:
+        response.raise_for_status()
+        yield from client.track_stream(response, _gemini_stream_tokens(response))
+    finally:
+        response.close()
+
+def _gemini_stream_tokens(response):
+    for data in iter_sse_data(response.iter_lines(decode_unicode=True)):
+        chunk = json.loads(data)
+        for candidate in chunk.get('candidates', []):
+            for part in candidate.get('content', {}).get('parts', []):
+                if part.get('text'):
+                    yield part['text']
+
 @llm_bp.route('/llm/providers', methods=['GET'])
 def get_providers():
     """Retourne la liste des fournisseurs LLM disponibles"""
@@ -173,6 +462,18 @@ def get_providers():
         'default': os.getenv('DEFAULT_LLM_PROVIDER', 'deepseek')
     })
 
+@llm_bp.route('/llm/metrics', methods=['GET'])
+def get_llm_metrics():
+    """Retourne les métriques des connexions HTTP, du cache et du routage LLM"""
+    return jsonify({
+        'success': True,
+        'http_pools': llm_http_pool.metrics(),
+        'response_cache': get_llm_cache().metrics(),
+        'routing': llm_router.metrics(),
+        'coalescing': llm_single_flight.metrics(),
+        'async_client': async_llm_client.metrics()
+    })
+
 @llm_bp.route('/llm/test/<provider>', methods=['POST'])
 def test_provider(provider):
     """Teste la connexion à un fournisseur LLM"""
@@ -186,11 +487,11 @@ def test_provider(provider):
         if not api_key:
             return jsonify({'error': f'Clé API manquante pour {provider}'}), 400
         
-        # Test simple
+        # Test simple (hors cache: la sonde doit toujours joindre le fournisseur)
         test_prompt = "Réponds simplement 'Test réussi' pour vérifier la connexion."
         
         if provider == 'gemini':
-            response = call_gemini_api(api_key, test_prompt)
+            response = call_gemini_api(api_key, test_prompt, temperature=0.1, max_tokens=100, cache=False)
         else:
             messages = [{"role": "user", "content": test_prompt}]
             response = call_openai_compatible_api(
@@ -200,14 +501,16 @@ def test_provider(provider):
                 messages,
                 100,
                 0.1,
-                provider
+                provider,
+                cache=False
             )
         
         return jsonify({
             'success': True,
             'message': 'Connexion établie avec succès',
             'provider': provider,
-            'response': response.get('response', '')[:100]  # Limiter la réponse
+            'response': response.get('response', '')[:100],  # Limiter la réponse
+            'cached': response.get('cached', False)
         })
         
     except Exception as e:
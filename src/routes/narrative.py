@@ -2,8 +2,10 @@
 Routes API pour le Moteur de Narration - Architecture des 4 Moteurs
 """
 
-from flask import Blueprint, request, jsonify
+import os
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from src.engines.narrative_engine import narrative_engine
+from src.utils.streaming import sse_event
 
 narrative_bp = Blueprint('narrative', __name__)
 
@@ -29,6 +31,17 @@ def generate_narrative():
         if not validation_result:
             return jsonify({'error': 'Résultat de validation requis'}), 400
         
+        # Mode streaming: les tokens sont relayés dès leur réception
+        if data.get('stream'):
+            events = narrative_engine.stream_narrative_response(
+                session_id, parsed_action, validation_result
+            )
+            return Response(
+                stream_with_context(sse_event(event, event=event['type']) for event in events),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
+        
         # Générer la réponse narrative
         result = narrative_engine.generate_narrative_response(
             session_id, parsed_action, validation_result
@@ -42,6 +55,76 @@ def generate_narrative():
             'error': f'Erreur lors de la génération narrative: {str(e)}'
         }), 500
 
+@narrative_bp.route('/narrative/agenerate', methods=['POST'])
+async def agenerate_narrative():
+    """Variante asynchrone de /narrative/generate (client LLM asyncio)"""
+    try:
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({'error': 'Aucune donnée fournie'}), 400
+        
+        session_id = data.get('session_id')
+        parsed_action = data.get('parsed_action')
+        validation_result = data.get('validation_result')
+        
+        if not session_id:
+            return jsonify({'error': 'Session ID requis'}), 400
+        
+        if not parsed_action:
+            return jsonify({'error': 'Action parsée requise'}), 400
+        
+        if not validation_result:
+            return jsonify({'error': 'Résultat de validation requis'}), 400
+        
+        result = await narrative_engine.agenerate_narrative_response(
+            session_id, parsed_action, validation_result
+        )
+        
+        return jsonify(result)
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Erreur lors de la génération narrative: {str(e)}'
+        }), 500
+
+@narrative_bp.route('/narrative/batch', methods=['POST'])
+def generate_narrative_batch():
+    """
+    Génère les narrations de plusieurs sessions en une requête (narrations déclenchées par le serveur).
+    Corps: {"items": [{"session_id", "parsed_action" ou "action", "validation_result"?}], "max_concurrency"?}
+    """
+    try:
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({'error': 'Aucune donnée fournie'}), 400
+        
+        items = data.get('items')
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'Liste d\'éléments requise'}), 400
+        
+        max_items = int(os.getenv('NARRATIVE_BATCH_MAX_ITEMS', '100'))
+        if len(items) > max_items:
+            return jsonify({'error': f'Trop d\'éléments (maximum {max_items})'}), 400
+        
+        if not all(isinstance(item, dict) for item in items):
+            return jsonify({'error': 'Chaque élément doit être un objet'}), 400
+        
+        max_concurrency = data.get('max_concurrency')
+        result = narrative_engine.generate_narrative_batch(
+            items, int(max_concurrency) if max_concurrency else None
+        )
+        
+        return jsonify(result)
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Erreur lors de la génération narrative par lots: {str(e)}'
+        }), 500
+
 @narrative_bp.route('/narrative/styles', methods=['GET'])
 def get_narrative_styles():
     """Récupère les styles narratifs disponibles"""
@@ -74,3 +157,20 @@ def get_narrative_arcs():
             'error': str(e)
         }), 500
 
+@narrative_bp.route('/narrative/metrics', methods=['GET'])
+def get_narrative_metrics():
+    """Statistiques de budget de tokens des prompts, de pré-génération spéculative, de répartition des tiers et par palier de modèle"""
+    try:
+        return jsonify({
+            'success': True,
+            'prompt_budget': narrative_engine.get_prompt_metrics(),
+            'speculation': narrative_engine.get_speculation_metrics(),
+            'tiers': narrative_engine.get_tier_metrics(),
+            'model_routing': narrative_engine.get_model_routing_metrics()
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
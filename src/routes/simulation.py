@@ -49,9 +49,16 @@ def update_relationships_route():
     game_state = GameState.from_dict(game_state_data)
     
     # Mise à jour des relations entre les PNJ
-    simulation_engine.update_npc_relationships(game_state)
+    changed = simulation_engine.update_npc_relationships(game_state, data.get("time_elapsed", 1.0))
     
-    return jsonify({"success": True, "message": "Relations entre PNJ mises à jour."})
+    return jsonify({
+        "success": True,
+        "message": "Relations entre PNJ mises à jour.",
+        "changed": changed,
+        "relationships": {
+            npc_id: npc.relationship_weights for npc_id, npc in game_state.world_state.npcs.items()
+        }
+    })
 
 @simulation_bp.route("/simulation/process_daily_routines", methods=["POST"])
 def process_daily_routines_route():
@@ -70,3 +77,21 @@ def process_daily_routines_route():
     return jsonify({"success": True, "message": "Routines quotidiennes des PNJ exécutées."})
 
 
+
+@simulation_bp.route("/simulation/route", methods=["POST"])
+def route_route():
+    data = request.get_json() or {}
+    session_id = data.get("session_id")
+    start = data.get("from")
+    goal = data.get("to")
+    
+    if not session_id or not start or not goal:
+        return jsonify({"error": "session_id, from et to sont requis"}), 400
+
+    # Calcul de l'itinéraire sur le graphe des lieux (distances mises en cache)
+    route = simulation_engine.plan_route(session_id, start, goal)
+    
+    if route is None:
+        return jsonify({"success": False, "error": "Aucun itinéraire trouvé"}), 404
+    
+    return jsonify({"success": True, "route": route})
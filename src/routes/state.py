@@ -515,6 +515,7 @@ def save_session(session_id):
                 'error': 'Session non trouvée'
             }), 404
         
+        state_engine.commit_turn(session_id)
         success = session_manager.save_session(session, save_type)
         
         if success:
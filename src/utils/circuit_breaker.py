@@ -0,0 +1,125 @@
+"""
+Disjoncteur (circuit breaker) par fournisseur LLM
+Coupe les appels vers un fournisseur en panne ou trop lent, puis le sonde avant de le rétablir
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+class CircuitOpenError(Exception):
+    """Levée lorsqu'un appel est refusé car le disjoncteur du fournisseur est ouvert"""
+    pass
+
+class CircuitBreaker:
+    """
+    Disjoncteur à trois états:
+    - closed: les appels passent; ouverture si `failure_threshold` échecs consécutifs
+      ou si le taux d'échec (appels lents inclus) dépasse `failure_rate_threshold`
+      sur la fenêtre glissante
+    - open: les appels échouent immédiatement pendant `recovery_timeout` secondes
+    - half_open: `half_open_max_calls` appels de sonde; un succès referme, un échec rouvre
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, failure_threshold: int = 5, failure_rate_threshold: float = 0.5,
+                 slow_call_seconds: Optional[float] = None, recovery_timeout: float = 30.0,
+                 half_open_max_calls: int = 1, window: int = 20, min_calls: int = 10):
+        self.failure_threshold = failure_threshold
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.min_calls = min_calls
+        
+        self.state = self.CLOSED
+        self.outcomes = deque(maxlen=window)  # True = appel sain
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+        self.times_opened = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+    
+    def allow_request(self) -> bool:
+        """Indique si un appel peut partir (réserve une sonde en half_open)"""
+        with self.lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.recovery_timeout:
+                    self.rejected += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self.half_open_calls = 0
+            
+            if self.state == self.HALF_OPEN:
+                if self.half_open_calls >= self.half_open_max_calls:
+                    self.rejected += 1
+                    return False
+                self.half_open_calls += 1
+            return True
+    
+    def release_request(self) -> None:
+        """Rend une sonde réservée par allow_request sans résultat (appel annulé avant sa réponse)"""
+        with self.lock:
+            if self.state == self.HALF_OPEN and self.half_open_calls > 0:
+                self.half_open_calls -= 1
+    
+    def is_available(self) -> bool:
+        """Vrai si le disjoncteur laisserait passer un appel (sans réserver de sonde)"""
+        with self.lock:
+            if self.state == self.OPEN:
+                return time.monotonic() - self.opened_at >= self.recovery_timeout
+            if self.state == self.HALF_OPEN:
+                return self.half_open_calls < self.half_open_max_calls
+            return True
+    
+    def record_success(self, latency: float) -> None:
+        """Enregistre un appel abouti; au-delà de `slow_call_seconds` il compte comme un échec"""
+        if self.slow_call_seconds is not None and latency > self.slow_call_seconds:
+            self.record_failure()
+            return
+        
+        with self.lock:
+            self.outcomes.append(True)
+            self.consecutive_failures = 0
+            if self.state == self.HALF_OPEN:
+                self.state = self.CLOSED
+                self.outcomes.clear()
+    
+    def record_failure(self) -> None:
+        with self.lock:
+            self.outcomes.append(False)
+            self.consecutive_failures += 1
+            
+            if self.state == self.HALF_OPEN:
+                self._open()
+            elif self.state == self.CLOSED and self._should_open():
+                self._open()
+    
+    def _should_open(self) -> bool:
+        if self.consecutive_failures >= self.failure_threshold:
+            return True
+        if len(self.outcomes) < self.min_calls:
+            return False
+        return self.outcomes.count(False) / len(self.outcomes) >= self.failure_rate_threshold
+    
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+    
+    def to_dict(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'recent_failure_rate': self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected,
+                'retry_in_seconds': max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+                    if self.state == self.OPEN else 0.0
+            }
@@ -0,0 +1,143 @@
+"""
+Recherche multi-motifs de mots-clés (automate d'Aho-Corasick)
+Un seul parcours du texte pour toutes les catégories, limites de mots et accents français gérés
+"""
+
+import re
+import unicodedata
+from collections import deque
+from typing import Dict, Hashable, Iterable, List, Tuple
+
+LIGATURES = (('œ', 'oe'), ('æ', 'ae'), ('ß', 'ss'))
+COMBINING_DIACRITICS = re.compile('[\u0300-\u036f]')
+
+def fold_text(text: str) -> str:
+    """Minuscules sans accents ni ligatures: 'Défaite' -> 'defaite', 'cœur' -> 'coeur'"""
+    folded = text.lower()
+    if folded.isascii():
+        return folded
+    # Décomposition et retrait des diacritiques en C (str.translate sur un texte accentué
+    # consulte un dictionnaire par caractère et coûte plusieurs fois plus cher)
+    folded = COMBINING_DIACRITICS.sub('', unicodedata.normalize('NFD', folded))
+    if folded.isascii():
+        return folded
+    for ligature, replacement in LIGATURES:
+        folded = folded.replace(ligature, replacement)
+    if folded.isascii():
+        return folded
+    # Autres marques combinantes et autres alphabets
+    return ''.join(char for char in folded if not unicodedata.combining(char))
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum()
+
+class KeywordMatcher:
+    """
+    Automate construit une fois à partir de lexiques {catégorie: [mots-clés]}
+    (catégorie: toute valeur hachable, ex: une chaîne ou un tuple).
+    Un mot-clé doit commencer et finir sur une limite de mot; un '*' final en fait
+    un préfixe ('triomph*' reconnaît 'triomphe', 'triomphant'). Les mots-clés
+    peuvent contenir des espaces ('en même temps'). Texte et mots-clés sont comparés
+    sans casse ni accents.
+    """
+    
+    def __init__(self, lexicons: Dict[Hashable, Iterable[str]]):
+        self.categories = list(lexicons)
+        # Motifs: (texte replié, est un préfixe, catégorie, mot-clé d'origine)
+        self.patterns: List[Tuple[str, bool, Hashable, str]] = []
+        self.transitions: List[Dict[str, int]] = [{}]
+        self.outputs: List[List[int]] = [[]]
+        self.fail: List[int] = [0]
+        
+        for category, keywords in lexicons.items():
+            for keyword in keywords:
+                prefix = keyword.endswith('*')
+                folded = fold_text(keyword.rstrip('*').strip())
+                if folded:
+                    self._insert(folded, len(self.patterns))
+                    self.patterns.append((folded, prefix, category, keyword))
+        self._build_failure_links()
+    
+    def _insert(self, folded: str, pattern_index: int) -> None:
+        state = 0
+        for char in folded:
+            next_state = self.transitions[state].get(char)
+            if next_state is None:
+                next_state = len(self.transitions)
+                self.transitions[state][char] = next_state
+                self.transitions.append({})
+                self.outputs.append([])
+                self.fail.append(0)
+            state = next_state
+        self.outputs[state].append(pattern_index)
+    
+    def _build_failure_links(self) -> None:
+        """
+        Liens d'échec en largeur; chaque état hérite des sorties de son lien d'échec.
+        Les transitions sont ensuite complétées par celles du lien d'échec (automate
+        déterministe): le parcours fait une seule recherche de dictionnaire par caractère.
+        """
+        goto = [dict(transitions) for transitions in self.transitions]
+        order = []
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            order.append(state)
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = goto[fallback].get(char, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                self.outputs[next_state] = self.outputs[next_state] + self.outputs[self.fail[next_state]]
+        
+        # Ordre en largeur: les transitions du lien d'échec sont déjà complètes
+        for state in order:
+            inherited = self.transitions[self.fail[state]] if self.fail[state] else goto[0]
+            for char, target in inherited.items():
+                self.transitions[state].setdefault(char, target)
+    
+    def scan(self, text: str) -> List[Tuple[int, Hashable, str]]:
+        """Correspondances dans l'ordre du texte: (position de début dans le texte replié, catégorie, mot-clé)"""
+        folded = fold_text(text)
+        matches = []
+        state = 0
+        length = len(folded)
+        transitions = self.transitions
+        outputs = self.outputs
+        
+        for position, char in enumerate(folded):
+            state = transitions[state].get(char, 0)
+            if not outputs[state]:
+                continue
+            
+            for pattern_index in outputs[state]:
+                pattern, prefix, category, keyword = self.patterns[pattern_index]
+                start = position - len(pattern) + 1
+                if start > 0 and _is_word_char(folded[start - 1]):
+                    continue
+                if not prefix and position + 1 < length and _is_word_char(folded[position + 1]):
+                    continue
+                matches.append((start, category, keyword))
+        
+        return matches
+    
+    def find(self, text: str) -> Dict[Hashable, Dict[str, int]]:
+        """Occurrences de chaque mot-clé trouvé, par catégorie: {catégorie: {mot-clé: nombre}}"""
+        found: Dict[Hashable, Dict[str, int]] = {}
+        for _, category, keyword in self.scan(text):
+            matches = found.setdefault(category, {})
+            matches[keyword] = matches.get(keyword, 0) + 1
+        return found
+    
+    def count(self, text: str, distinct: bool = True) -> Dict[Hashable, int]:
+        """
+        Score de chaque catégorie en un seul parcours: nombre de mots-clés différents trouvés
+        (distinct=True) ou nombre total d'occurrences
+        """
+        found = self.find(text)
+        return {
+            category: (len(found.get(category, {})) if distinct else sum(found.get(category, {}).values()))
+            for category in self.categories
+        }
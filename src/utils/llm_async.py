@@ -0,0 +1,269 @@
+"""
+Client LLM asynchrone (asyncio + aiohttp)
+Nombreuses complétions en vol par processus, concurrence bornée par fournisseur
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Any, Optional, Coroutine
+
+try:
+    import aiohttp
+except ImportError:  # dépendance requise uniquement par le chemin asynchrone
+    aiohttp = None
+
+from src.utils.circuit_breaker import CircuitOpenError
+from src.utils.llm_http import LLMHTTPPool, llm_http_pool, requested_max_tokens, _provider_env
+
+class AsyncLLMClient:
+    """
+    Client HTTP asynchrone pour les fournisseurs LLM.
+    
+    Toutes les requêtes tournent sur une boucle asyncio dédiée (thread de fond) partagée
+    par le processus: une seule session keep-alive et un sémaphore par fournisseur
+    (LLM_ASYNC_CONCURRENCY) bornent les requêtes en vol, quelle que soit la boucle
+    appelante (vue Flask async, script, code synchrone via run_sync).
+    Disjoncteur et délai de lecture adaptatif sont partagés avec le client synchrone.
+    """
+    
+    def __init__(self, http_pool: LLMHTTPPool):
+        self.http_pool = http_pool
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread: Optional[threading.Thread] = None
+        self.session = None
+        self.semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self.lock = threading.Lock()
+    
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if aiohttp is None:
+            raise RuntimeError('aiohttp est requis pour le client LLM asynchrone (pip install aiohttp)')
+        
+        if self.loop is None:
+            with self.lock:
+                if self.loop is None:
+                    loop = asyncio.new_event_loop()
+                    thread = threading.Thread(target=loop.run_forever, name='llm-async', daemon=True)
+                    thread.start()
+                    self.thread = thread
+                    self.loop = loop
+        return self.loop
+    
+    def submit(self, coro: Coroutine) -> Future:
+        """Planifie une coroutine sur la boucle du client (depuis du code synchrone)"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+    
+    def run_sync(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Exécute une coroutine sur la boucle du client et attend son résultat"""
+        return self.submit(coro).result(timeout)
+    
+    async def run(self, coro: Coroutine) -> Any:
+        """Attend, depuis n'importe quelle boucle, une coroutine exécutée sur la boucle du client"""
+        loop = self._ensure_loop()
+        if asyncio.get_running_loop() is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+    
+    async def post_json(self, provider: str, url: str, headers: Dict[str, str],
+                        payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST JSON vers un fournisseur et retourne le corps décodé"""
+        return await self.run(self._post_json(provider, url, headers, payload))
+    
+    async def _post_json(self, provider: str, url: str, headers: Dict[str, str],
+                         payload: Dict[str, Any]) -> Dict[str, Any]:
+        client = self.http_pool.get_client(provider)
+        stats = self._provider_stats(provider)
+        semaphore = self._semaphore(provider)
+        stats['queued'] += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            # Décrémenté aussi si la tâche est annulée pendant l'attente du sémaphore
+            stats['queued'] -= 1
+        
+        try:
+            if not client.breaker.allow_request():
+                stats['rejected'] += 1
+                raise CircuitOpenError(f'Fournisseur {provider} temporairement indisponible (disjoncteur ouvert)')
+            
+            stats['in_flight'] += 1
+            max_tokens = requested_max_tokens(payload)
+            stats['peak_in_flight'] = max(stats['peak_in_flight'], stats['in_flight'])
+            timeout = aiohttp.ClientTimeout(sock_connect=client.connect_timeout,
+                                            sock_read=client.current_read_timeout(max_tokens))
+            started = time.perf_counter()
+            try:
+                async with self._get_session().post(url, headers=headers, json=payload, timeout=timeout) as response:
+                    status = response.status
+                    body = await response.json(content_type=None) if status < 400 else await response.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                client.record_error(time.perf_counter() - started, timed_out=isinstance(e, asyncio.TimeoutError))
+                stats['errors'] += 1
+                raise Exception(f'Erreur réseau {provider}: {str(e) or type(e).__name__}')
+            except asyncio.CancelledError:
+                # Tâche annulée (couverture perdante): ni succès ni échec, la sonde éventuelle est rendue
+                client.breaker.release_request()
+                raise
+            except Exception:
+                # Corps illisible (JSON invalide) ou erreur inattendue: comptée comme un échec,
+                # ce qui libère aussi la sonde d'un disjoncteur semi-ouvert
+                client.record_error(time.perf_counter() - started)
+                stats['errors'] += 1
+                raise
+            finally:
+                stats['in_flight'] -= 1
+            
+            client.record_response(time.perf_counter() - started, status, max_tokens=max_tokens)
+            stats['completed'] += 1
+            if status >= 400:
+                stats['errors'] += 1
+                raise Exception(f'HTTP {status} de {provider}: {body[:200]}')
+            return body
+        finally:
+            semaphore.release()
+    
+    def _get_session(self):
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=0, keepalive_timeout=30)
+            )
+        return self.session
+    
+    def _semaphore(self, provider: str) -> asyncio.Semaphore:
+        semaphore = self.semaphores.get(provider)
+        if semaphore is None:
+            limit = int(_provider_env(provider, 'LLM_ASYNC_CONCURRENCY', '16'))
+            semaphore = self.semaphores[provider] = asyncio.Semaphore(limit)
+            self._provider_stats(provider)['limit'] = limit
+        return semaphore
+    
+    def _provider_stats(self, provider: str) -> Dict[str, int]:
+        stats = self.stats.get(provider)
+        if stats is None:
+            stats = self.stats[provider] = {
+                'limit': 0, 'in_flight': 0, 'peak_in_flight': 0, 'queued': 0,
+                'completed': 0, 'errors': 0, 'rejected': 0
+            }
+        return stats
+    
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            'available': aiohttp is not None,
+            'running': self.loop is not None,
+            'providers': {provider: dict(stats) for provider, stats in self.stats.items()}
+        }
+    
+    def close(self) -> None:
+        """Ferme la session et arrête la boucle du client"""
+        if self.loop is None:
+            return
+        if self.session is not None:
+            self.run_sync(self.session.close(), timeout=5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+        self.loop = None
+        self.thread = None
+        self.session = None
+        self.semaphores = {}
+
+# Instance globale
+async_llm_client = AsyncLLMClient(llm_http_pool)
+
+def run_load_test(turns: int = 200, latency: float = 0.2, workers: int = 4, concurrency: int = 64) -> Dict[str, Any]:
+    """
+    Tours narratifs concurrents par worker, chemin bloquant vs asyncio.
+    Un faux fournisseur local répond après `latency` secondes; le chemin bloquant
+    dispose de `workers` threads, le chemin asyncio d'un seul thread appelant.
+    Le tier local est désactivé: chaque tour passe par le client LLM.
+    """
+    from aiohttp import web
+    from src.engines.narrative_engine import narrative_engine
+    from src.engines.state_engine import state_engine
+    from src.routes.llm import LLM_PROVIDERS, llm_router
+    # Instance utilisée par le routeur (distincte de celle de ce module lancé avec python -m)
+    from src.utils.llm_async import async_llm_client as client
+    from concurrent.futures import ThreadPoolExecutor
+    
+    async def fake_completion(request):
+        await asyncio.sleep(latency)
+        return web.json_response({'choices': [{'message': {'content': 'Le vent se lève sur la plaine.'}}]})
+    
+    server_loop = asyncio.new_event_loop()
+    threading.Thread(target=server_loop.run_forever, daemon=True).start()
+    app = web.Application()
+    app.router.add_post('/v1/chat/completions', fake_completion)
+    runner = web.AppRunner(app)
+    asyncio.run_coroutine_threadsafe(runner.setup(), server_loop).result()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    asyncio.run_coroutine_threadsafe(site.start(), server_loop).result()
+    port = site._server.sockets[0].getsockname()[1]
+    
+    for config in LLM_PROVIDERS.values():
+        config['api_key'] = None
+    LLM_PROVIDERS['deepseek'].update(api_key='test', base_url=f'http://127.0.0.1:{port}/v1/chat/completions')
+    os.environ['DEFAULT_LLM_PROVIDER'] = 'deepseek'
+    os.environ['LLM_ASYNC_CONCURRENCY_DEEPSEEK'] = str(concurrency)
+    os.environ['LLM_HTTP_POOL_SIZE_DEEPSEEK'] = str(workers)
+    llm_router.hedge_enabled = False
+    local_tier_mode = narrative_engine.local_tier_mode
+    narrative_engine.local_tier_mode = 'off'
+    
+    action = {
+        'action_type': 'dialogue', 'complexity': 'moderate',
+        'raw_action': 'Je demande au vieil ermite ce qu\'il sait de la tour effondrée',
+        'entities': {'npcs': ['vieil ermite'], 'objects': [], 'locations': [], 'spells': []},
+        'parameters': {'tone': 'polite'}
+    }
+    validation = {'feasible': True, 'consequences': ['Changement de relation avec PNJ']}
+    sessions = [state_engine.create_session(f'Testeur {i}') for i in range(turns)]
+    
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        blocking = list(pool.map(
+            lambda session_id: narrative_engine.generate_narrative_response(session_id, action, validation),
+            sessions
+        ))
+    blocking_elapsed = time.perf_counter() - started
+    blocking_calls = client.http_pool.get_client('deepseek').requests_sent
+    
+    async def all_turns():
+        return await asyncio.gather(*[
+            narrative_engine.agenerate_narrative_response(session_id, action, validation)
+            for session_id in sessions
+        ])
+    
+    started = time.perf_counter()
+    concurrent_results = client.run_sync(all_turns())
+    async_elapsed = time.perf_counter() - started
+    narrative_engine.local_tier_mode = local_tier_mode
+    provider_stats = client.metrics()['providers']['deepseek']
+    client.close()
+    asyncio.run_coroutine_threadsafe(runner.cleanup(), server_loop).result()
+    
+    return {
+        'turns': turns,
+        'provider_latency_ms': latency * 1000,
+        'blocking': {
+            'workers': workers,
+            'succeeded': sum(1 for result in blocking if result.get('success')),
+            'elapsed_s': round(blocking_elapsed, 2),
+            'turns_per_s_per_worker': round(turns / blocking_elapsed / workers, 2),
+            'concurrent_turns_per_worker': 1,
+            'llm_calls': blocking_calls
+        },
+        'asyncio': {
+            'workers': 1,
+            'succeeded': sum(1 for result in concurrent_results if result.get('success')),
+            'elapsed_s': round(async_elapsed, 2),
+            'turns_per_s_per_worker': round(turns / async_elapsed, 2),
+            'concurrent_turns_per_worker': provider_stats['peak_in_flight'],
+            'llm_calls': provider_stats['completed']
+        }
+    }
+
+if __name__ == '__main__':
+    import json
+    print(json.dumps(run_load_test(), indent=2))
@@ -0,0 +1,128 @@
+"""
+Cache des réponses LLM
+Clé: fournisseur, modèle, messages normalisés, température et max_tokens; éviction LRU + TTL
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional
+
+class LLMResponseCache:
+    """
+    Cache mémoire des réponses LLM, borné en taille (LRU) et en durée (TTL).
+    
+    Les appels à température élevée sont exclus par défaut (réponses voulues variées);
+    un appelant peut forcer ou refuser la mise en cache avec le paramètre `cache`.
+    Toute implémentation exposant les mêmes méthodes peut remplacer ce cache
+    via set_llm_cache().
+    """
+    
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 3600.0,
+                 max_temperature: float = 0.3, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_temperature = max_temperature
+        self.enabled = enabled
+        
+        self.entries: OrderedDict = OrderedDict()  # clé -> (expiration, réponse)
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'bypassed': 0, 'evictions': 0, 'expirations': 0}
+    
+    @staticmethod
+    def make_key(provider: str, model: str, messages: List[Dict[str, str]],
+                 temperature: float, max_tokens: int) -> str:
+        """Clé stable indépendante des espaces superflus dans les messages"""
+        normalized_messages = [
+            {'role': message.get('role', 'user'),
+             'content': re.sub(r'\s+', ' ', message.get('content', '')).strip()}
+            for message in messages
+        ]
+        payload = json.dumps({
+            'provider': provider,
+            'model': model,
+            'messages': normalized_messages,
+            'temperature': round(float(temperature), 3),
+            'max_tokens': int(max_tokens)
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def is_cacheable(self, temperature: float, cache: Optional[bool] = None) -> bool:
+        """Indique si un appel peut passer par le cache"""
+        if not self.enabled or cache is False:
+            cacheable = False
+        elif cache is True:
+            cacheable = True
+        else:
+            cacheable = temperature <= self.max_temperature
+        
+        if not cacheable:
+            with self.lock:
+                self.stats['bypassed'] += 1
+        return cacheable
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            
+            expires_at, response = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                self.stats['expirations'] += 1
+                self.stats['misses'] += 1
+                return None
+            
+            self.entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return response
+    
+    def set(self, key: str, response: Dict[str, Any]) -> None:
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl_seconds, response)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats['evictions'] += 1
+    
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+    
+    def metrics(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return dict(
+                self.stats,
+                size=len(self.entries),
+                max_entries=self.max_entries,
+                ttl_seconds=self.ttl_seconds,
+                max_temperature=self.max_temperature,
+                enabled=self.enabled,
+                hit_rate=self.stats['hits'] / lookups if lookups else 0.0
+            )
+
+_llm_cache: Optional[LLMResponseCache] = None
+
+def get_llm_cache() -> LLMResponseCache:
+    """Retourne le cache de réponses LLM actif (créé à la demande depuis l'environnement)"""
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = LLMResponseCache(
+            max_entries=int(os.getenv('LLM_CACHE_MAX_ENTRIES', '512')),
+            ttl_seconds=float(os.getenv('LLM_CACHE_TTL', '3600')),
+            max_temperature=float(os.getenv('LLM_CACHE_MAX_TEMPERATURE', '0.3')),
+            enabled=os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+        )
+    return _llm_cache
+
+def set_llm_cache(cache: LLMResponseCache) -> None:
+    """Remplace le cache de réponses LLM (ex: implémentation partagée entre workers)"""
+    global _llm_cache
+    _llm_cache = cache
@@ -0,0 +1,298 @@
+"""
+Clients HTTP mutualisés pour les fournisseurs LLM
+Une session keep-alive par fournisseur, délais de connexion/lecture séparés et métriques de réutilisation
+Disjoncteur et délai de lecture adaptatif (p95 observé) par fournisseur et taille de réponse demandée
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Iterator, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from src.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+Timeout = Union[float, Tuple[float, float]]
+
+class _ConnectionCounter:
+    """Compteur thread-safe des connexions TCP ouvertes"""
+    
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+    
+    def increment(self):
+        with self.lock:
+            self.value += 1
+
+def _counting_pool_class(base, counter: _ConnectionCounter):
+    class CountingConnectionPool(base):
+        def _new_conn(self):
+            counter.increment()
+            return super()._new_conn()
+    return CountingConnectionPool
+
+class CountingHTTPAdapter(HTTPAdapter):
+    """Adaptateur requests qui compte les nouvelles connexions ouvertes par le pool"""
+    
+    def __init__(self, counter: _ConnectionCounter, **kwargs):
+        self.counter = counter
+        super().__init__(**kwargs)
+    
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _counting_pool_class(HTTPConnectionPool, self.counter),
+            'https': _counting_pool_class(HTTPSConnectionPool, self.counter)
+        }
+
+def requested_max_tokens(payload: Any) -> Optional[int]:
+    """max_tokens demandé par une requête (OpenAI: max_tokens, Gemini: generationConfig.maxOutputTokens)"""
+    if not isinstance(payload, dict):
+        return None
+    max_tokens = payload.get('max_tokens')
+    if max_tokens is None:
+        max_tokens = payload.get('generationConfig', {}).get('maxOutputTokens')
+    return max_tokens
+
+def token_bucket(max_tokens: Optional[int]) -> int:
+    """Tranche de max_tokens (puissance de 2, au moins 256; 0 si inconnu): 400 -> 512, 2000 -> 2048"""
+    if not max_tokens:
+        return 0
+    bucket = 256
+    while bucket < max_tokens:
+        bucket *= 2
+    return bucket
+
+class ProviderHTTPClient:
+    """
+    Session HTTP persistante (keep-alive) dédiée à un fournisseur LLM.
+    Les latences sont suivies par tranche de max_tokens: une réponse courte ne réduit pas
+    le délai de lecture accordé aux réponses longues.
+    """
+    
+    # Statuts HTTP signalant un fournisseur défaillant (comptés par le disjoncteur)
+    FAILURE_STATUSES = {429, 500, 502, 503, 504}
+    
+    def __init__(self, provider: str, pool_size: int = 10,
+                 connect_timeout: float = 5.0, read_timeout: float = 30.0,
+                 breaker: Optional[CircuitBreaker] = None, adaptive_timeout: bool = True,
+                 timeout_multiplier: float = 2.0, min_read_timeout: float = 5.0,
+                 adaptive_min_samples: int = 20):
+        self.provider = provider
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.adaptive_timeout = adaptive_timeout
+        self.timeout_multiplier = timeout_multiplier
+        self.min_read_timeout = min_read_timeout
+        self.adaptive_min_samples = adaptive_min_samples
+        
+        self.connections = _ConnectionCounter()
+        self.lock = threading.Lock()
+        self.requests_sent = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.total_latency = 0.0
+        self.latencies: Dict[int, deque] = {}  # tranche de max_tokens -> latences (hors streaming)
+        
+        self.session = requests.Session()
+        adapter = CountingHTTPAdapter(self.connections, pool_connections=1,
+                                      pool_maxsize=pool_size, pool_block=False)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+    
+    def latency_percentile(self, fraction: float, max_tokens: Optional[int] = None) -> Optional[float]:
+        """Percentile des latences de la tranche de max_tokens (toutes tranches si None)"""
+        with self.lock:
+            if max_tokens is None:
+                ordered = sorted(latency for samples in self.latencies.values() for latency in samples)
+            else:
+                ordered = sorted(self.latencies.get(token_bucket(max_tokens), ()))
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+    
+    def current_read_timeout(self, max_tokens: Optional[int] = None) -> float:
+        """
+        Délai de lecture: p95 observé pour la même tranche de max_tokens x multiplicateur,
+        borné par [min_read_timeout, read_timeout]; read_timeout tant que la tranche a trop peu de mesures
+        """
+        if not self.adaptive_timeout:
+            return self.read_timeout
+        samples = self.latencies.get(token_bucket(max_tokens), ())
+        if len(samples) < self.adaptive_min_samples:
+            return self.read_timeout
+        p95 = self.latency_percentile(0.95, max_tokens or 0)
+        return max(self.min_read_timeout, min(self.read_timeout, p95 * self.timeout_multiplier))
+    
+    def post(self, url: str, headers: Optional[Dict[str, str]] = None,
+             json: Any = None, timeout: Optional[Timeout] = None, **kwargs) -> requests.Response:
+        """
+        POST via la session mutualisée; timeout=(connexion, lecture adaptative) par défaut.
+        Lève CircuitOpenError sans appel réseau si le disjoncteur est ouvert.
+        """
+        if not self.breaker.allow_request():
+            raise CircuitOpenError(f'Fournisseur {self.provider} temporairement indisponible (disjoncteur ouvert)')
+        
+        streaming = kwargs.get('stream', False)
+        max_tokens = requested_max_tokens(json)
+        if timeout is None:
+            # En streaming le délai de lecture s'applique entre deux fragments: on garde le délai configuré
+            timeout = (self.connect_timeout,
+                       self.read_timeout if streaming else self.current_read_timeout(max_tokens))
+        
+        started = time.perf_counter()
+        try:
+            response = self.session.post(url, headers=headers, json=json, timeout=timeout, **kwargs)
+        except requests.RequestException as e:
+            self.record_error(time.perf_counter() - started, timed_out=isinstance(e, requests.Timeout))
+            raise
+        
+        latency = time.perf_counter() - started
+        if streaming and response.status_code < 400:
+            # L'issue d'un flux n'est connue qu'à la fin du corps: voir track_stream
+            with self.lock:
+                self.requests_sent += 1
+                self.total_latency += latency
+            return response
+        
+        self.record_response(latency, response.status_code, streaming, max_tokens)
+        return response
+    
+    def track_stream(self, response: requests.Response, chunks: Iterator[Any]) -> Iterator[Any]:
+        """
+        Relaie les fragments d'un flux ouvert par post(stream=True) et enregistre son issue quand il
+        se termine: succès (latence jusqu'aux en-têtes) ou échec, y compris au milieu du corps.
+        Un flux abandonné par le consommateur n'est ni un succès ni un échec.
+        """
+        try:
+            yield from chunks
+        except GeneratorExit:
+            self.breaker.release_request()
+            raise
+        except Exception:
+            with self.lock:
+                self.errors += 1
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success(response.elapsed.total_seconds())
+    
+    def record_response(self, latency: float, status_code: int, streaming: bool = False,
+                        max_tokens: Optional[int] = None) -> None:
+        """Comptabilise une réponse HTTP (disjoncteur, latences); partagé avec le client asynchrone"""
+        with self.lock:
+            self.requests_sent += 1
+            self.total_latency += latency
+            if status_code not in self.FAILURE_STATUSES and not streaming:
+                bucket = token_bucket(max_tokens)
+                samples = self.latencies.get(bucket)
+                if samples is None:
+                    samples = self.latencies[bucket] = deque(maxlen=200)
+                samples.append(latency)
+        
+        if status_code in self.FAILURE_STATUSES:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success(latency)
+    
+    def record_error(self, latency: float, timed_out: bool = False) -> None:
+        """Comptabilise un échec réseau (connexion, délai dépassé)"""
+        with self.lock:
+            self.requests_sent += 1
+            self.total_latency += latency
+            self.errors += 1
+            if timed_out:
+                self.timeouts += 1
+        self.breaker.record_failure()
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Métriques de réutilisation des connexions"""
+        with self.lock:
+            requests_sent = self.requests_sent
+            errors = self.errors
+            timeouts = self.timeouts
+            total_latency = self.total_latency
+        p95 = self.latency_percentile(0.95)
+        with self.lock:
+            buckets = sorted(self.latencies)
+        connections = self.connections.value
+        reused = max(0, requests_sent - connections)
+        return {
+            'provider': self.provider,
+            'pool_size': self.pool_size,
+            'connect_timeout': self.connect_timeout,
+            'read_timeout': self.read_timeout,
+            'current_read_timeout': {str(bucket): self.current_read_timeout(bucket) for bucket in buckets},
+            'p95_latency_ms': round(p95 * 1000, 1) if p95 is not None else None,
+            'requests': requests_sent,
+            'errors': errors,
+            'timeouts': timeouts,
+            'connections_opened': connections,
+            'connections_reused': reused,
+            'reuse_ratio': reused / requests_sent if requests_sent else 0.0,
+            'avg_latency_ms': total_latency * 1000 / requests_sent if requests_sent else 0.0,
+            'circuit': self.breaker.to_dict()
+        }
+    
+    def close(self) -> None:
+        self.session.close()
+
+class LLMHTTPPool:
+    """Registre des clients HTTP par fournisseur, configuré par variables d'environnement"""
+    
+    def __init__(self):
+        self.clients: Dict[str, ProviderHTTPClient] = {}
+        self.lock = threading.Lock()
+    
+    def get_client(self, provider: str) -> ProviderHTTPClient:
+        client = self.clients.get(provider)
+        if client is None:
+            with self.lock:
+                client = self.clients.get(provider)
+                if client is None:
+                    slow_call = _provider_env(provider, 'LLM_BREAKER_SLOW_CALL', '')
+                    breaker = CircuitBreaker(
+                        failure_threshold=int(_provider_env(provider, 'LLM_BREAKER_FAILURES', '5')),
+                        failure_rate_threshold=float(_provider_env(provider, 'LLM_BREAKER_FAILURE_RATE', '0.5')),
+                        slow_call_seconds=float(slow_call) if slow_call else None,
+                        recovery_timeout=float(_provider_env(provider, 'LLM_BREAKER_RECOVERY', '30'))
+                    )
+                    client = ProviderHTTPClient(
+                        provider,
+                        pool_size=int(_provider_env(provider, 'LLM_HTTP_POOL_SIZE', '10')),
+                        connect_timeout=float(_provider_env(provider, 'LLM_CONNECT_TIMEOUT', '5')),
+                        read_timeout=float(_provider_env(provider, 'LLM_READ_TIMEOUT', '30')),
+                        breaker=breaker,
+                        adaptive_timeout=_provider_env(provider, 'LLM_ADAPTIVE_TIMEOUT', 'true').lower() == 'true',
+                        timeout_multiplier=float(_provider_env(provider, 'LLM_TIMEOUT_MULTIPLIER', '2.0')),
+                        min_read_timeout=float(_provider_env(provider, 'LLM_MIN_READ_TIMEOUT', '5'))
+                    )
+                    self.clients[provider] = client
+        return client
+    
+    def is_available(self, provider: str) -> bool:
+        """Vrai si le disjoncteur du fournisseur n'est pas ouvert"""
+        client = self.clients.get(provider)
+        return client is None or client.breaker.is_available()
+    
+    def metrics(self) -> Dict[str, Any]:
+        return {provider: client.metrics() for provider, client in self.clients.items()}
+    
+    def close_all(self) -> None:
+        with self.lock:
+            for client in self.clients.values():
+                client.close()
+            self.clients = {}
+
+def _provider_env(provider: str, name: str, default: str) -> str:
+    """Lit {NAME}_{PROVIDER} puis {NAME} (ex: LLM_READ_TIMEOUT_GEMINI, LLM_READ_TIMEOUT)"""
+    return os.getenv(f'{name}_{provider.upper()}', os.getenv(name, default))
+
+# Instance globale
+llm_http_pool = LLMHTTPPool()
@@ -0,0 +1,350 @@
+"""
+Routage des appels LLM entre fournisseurs
+Basculement ordonné, requêtes couvertes (hedging) et suivi latence/erreurs par fournisseur
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Awaitable, Callable, Dict, Iterator, List, Any, Optional, Tuple
+
+from src.utils.circuit_breaker import CircuitOpenError
+from src.utils.llm_http import token_bucket
+
+class ProviderStats:
+    """
+    Latences et erreurs observées pour un fournisseur (fenêtre glissante).
+    Les latences des succès sont aussi suivies par tranche de max_tokens (token_bucket),
+    pour que le seuil de hedging d'un appel long ne soit pas fixé par les appels courts.
+    """
+    
+    def __init__(self, window: int = 100):
+        self.window = window
+        self.latencies = deque(maxlen=window)
+        self.bucket_latencies: Dict[int, deque] = {}
+        self.outcomes = deque(maxlen=window)  # True = succès
+        self.successes = 0
+        self.failures = 0
+        self.hedges_won = 0
+        self.last_error: Optional[str] = None
+        self.lock = threading.Lock()
+    
+    def record_success(self, latency: float, max_tokens: Optional[int] = None) -> None:
+        with self.lock:
+            self.latencies.append(latency)
+            bucket = self.bucket_latencies.get(token_bucket(max_tokens))
+            if bucket is None:
+                bucket = self.bucket_latencies[token_bucket(max_tokens)] = deque(maxlen=self.window)
+            bucket.append(latency)
+            self.outcomes.append(True)
+            self.successes += 1
+    
+    def record_failure(self, latency: float, error: str) -> None:
+        with self.lock:
+            self.latencies.append(latency)
+            self.outcomes.append(False)
+            self.failures += 1
+            self.last_error = error
+    
+    def percentile(self, fraction: float, max_tokens: Optional[int] = None) -> Optional[float]:
+        """
+        Percentile des latences observées (None si aucune mesure); avec max_tokens,
+        seulement les succès de la même tranche
+        """
+        with self.lock:
+            if max_tokens is None:
+                ordered = sorted(self.latencies)
+            else:
+                ordered = sorted(self.bucket_latencies.get(token_bucket(max_tokens), ()))
+        if not ordered:
+            return None
+        index = min(len(ordered) - 1, int(fraction * len(ordered)))
+        return ordered[index]
+    
+    @property
+    def samples(self) -> int:
+        return len(self.latencies)
+    
+    def bucket_samples(self, max_tokens: Optional[int]) -> int:
+        with self.lock:
+            return len(self.bucket_latencies.get(token_bucket(max_tokens), ()))
+    
+    @property
+    def error_rate(self) -> float:
+        with self.lock:
+            if not self.outcomes:
+                return 0.0
+            return self.outcomes.count(False) / len(self.outcomes)
+    
+    def score(self) -> float:
+        """Score de routage (plus bas = meilleur): erreurs récentes puis latence médiane"""
+        median = self.percentile(0.5)
+        return self.error_rate * 10.0 + (median if median is not None else 1.0)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        with self.lock:
+            buckets = sorted(self.bucket_latencies)
+        return {
+            'successes': self.successes,
+            'failures': self.failures,
+            'error_rate': self.error_rate,
+            'p50_ms': _ms(self.percentile(0.5)),
+            'p90_ms': _ms(self.percentile(0.9)),
+            'p95_ms': _ms(self.percentile(0.95)),
+            'p90_ms_by_max_tokens': {str(bucket): _ms(self.percentile(0.9, bucket)) for bucket in buckets},
+            'hedges_won': self.hedges_won,
+            'last_error': self.last_error
+        }
+
+class LLMRouter:
+    """
+    Route une complétion vers les fournisseurs configurés:
+    1. Ordre: fournisseur préféré s'il est sain, puis les autres par score;
+       les fournisseurs dont le disjoncteur est ouvert passent en dernier
+    2. Basculement vers le suivant en cas d'échec
+    3. Hedging optionnel: si le fournisseur courant dépasse son percentile de latence,
+       un second fournisseur est sollicité et la première réponse valide l'emporte
+    Les flux (stream) suivent le même ordre, sans hedging, et basculent avant le premier fragment.
+    Seuls les appels couverts passent par le pool de threads (max_workers); les autres
+    s'exécutent dans le thread appelant.
+    """
+    
+    def __init__(self, call_fn: Callable[..., Dict[str, Any]], providers: Dict[str, Dict[str, Any]],
+                 hedge_enabled: bool = False, hedge_percentile: float = 0.9,
+                 hedge_min_samples: int = 10, unhealthy_error_rate: float = 0.5,
+                 max_workers: int = 8, available_fn: Optional[Callable[[str], bool]] = None,
+                 acall_fn: Optional[Callable[..., Awaitable[Dict[str, Any]]]] = None,
+                 stream_fn: Optional[Callable[..., Iterator[str]]] = None):
+        self.call_fn = call_fn
+        self.acall_fn = acall_fn
+        self.stream_fn = stream_fn
+        self.available_fn = available_fn
+        self.providers = providers
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.unhealthy_error_rate = unhealthy_error_rate
+        self.stats: Dict[str, ProviderStats] = {name: ProviderStats() for name in providers}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm-router')
+    
+    def ordered_providers(self, preferred: Optional[str] = None,
+                          fallback_order: Optional[List[str]] = None) -> List[str]:
+        """Fournisseurs disponibles (clé API présente) dans l'ordre de sollicitation"""
+        available = [name for name, config in self.providers.items() if config.get('api_key')]
+        if fallback_order:
+            rank = {name: index for index, name in enumerate(fallback_order)}
+            available.sort(key=lambda name: (rank.get(name, len(rank)), self.stats[name].score()))
+        else:
+            available.sort(key=lambda name: self.stats[name].score())
+        
+        if preferred in available and self.stats[preferred].error_rate < self.unhealthy_error_rate:
+            available.remove(preferred)
+            available.insert(0, preferred)
+        
+        if self.available_fn:
+            # Tri stable: l'ordre est conservé, seuls les disjoncteurs ouverts reculent
+            available.sort(key=lambda name: not self.available_fn(name))
+        return available
+    
+    def has_available_provider(self) -> bool:
+        """Au moins un fournisseur configuré dont le disjoncteur accepte des requêtes"""
+        return any(
+            config.get('api_key') and (self.available_fn is None or self.available_fn(name))
+            for name, config in self.providers.items()
+        )
+    
+    def complete(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float,
+                 preferred: Optional[str] = None, fallback_order: Optional[List[str]] = None,
+                 hedge: Optional[bool] = None, **call_kwargs) -> Dict[str, Any]:
+        """Exécute la complétion avec basculement et hedging; lève une exception si tout échoue"""
+        candidates = self.ordered_providers(preferred, fallback_order)
+        if not candidates:
+            raise Exception('Aucun fournisseur LLM disponible (clés API manquantes)')
+        
+        hedge = self.hedge_enabled if hedge is None else hedge
+        errors = []
+        attempts = []
+        
+        while candidates:
+            provider = candidates.pop(0)
+            hedge_delay = self._hedge_delay(provider, max_tokens) if hedge and candidates else None
+            attempts.append(provider)
+            
+            if hedge_delay is None:
+                # Pas de couverture possible: appel direct dans le thread appelant, sans passer par le pool
+                try:
+                    response = self._timed_call(provider, messages, max_tokens, temperature, call_kwargs)
+                except Exception as e:
+                    errors.append(f'{provider}: {str(e)}')
+                    continue
+                return dict(response, routed_provider=provider, attempts=attempts)
+            
+            futures = {self._submit(provider, messages, max_tokens, temperature, call_kwargs): provider}
+            done, _ = wait(futures, timeout=hedge_delay)
+            if not done:
+                # Le fournisseur est anormalement lent: on couvre avec le suivant
+                backup = candidates.pop(0)
+                futures[self._submit(backup, messages, max_tokens, temperature, call_kwargs)] = backup
+                attempts.append(backup)
+            
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        response = future.result()
+                    except Exception as e:
+                        errors.append(f'{futures[future]}: {str(e)}')
+                        continue
+                    winner = futures[future]
+                    if len(futures) > 1:
+                        self.stats[winner].hedges_won += 1
+                    return dict(response, routed_provider=winner, attempts=attempts)
+        
+        raise Exception('Tous les fournisseurs LLM ont échoué - ' + ' | '.join(errors))
+    
+    async def acomplete(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float,
+                        preferred: Optional[str] = None, fallback_order: Optional[List[str]] = None,
+                        hedge: Optional[bool] = None, **call_kwargs) -> Dict[str, Any]:
+        """Variante asynchrone de complete (acall_fn); la requête perdante d'un hedging est annulée"""
+        if self.acall_fn is None:
+            raise Exception('Aucune fonction d\'appel asynchrone configurée pour le routeur LLM')
+        
+        candidates = self.ordered_providers(preferred, fallback_order)
+        if not candidates:
+            raise Exception('Aucun fournisseur LLM disponible (clés API manquantes)')
+        
+        hedge = self.hedge_enabled if hedge is None else hedge
+        errors = []
+        attempts = []
+        
+        while candidates:
+            provider = candidates.pop(0)
+            hedge_delay = self._hedge_delay(provider, max_tokens) if hedge and candidates else None
+            tasks = {asyncio.ensure_future(
+                self._atimed_call(provider, messages, max_tokens, temperature, call_kwargs)): provider}
+            attempts.append(provider)
+            
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if not done:
+                backup = candidates.pop(0)
+                tasks[asyncio.ensure_future(
+                    self._atimed_call(backup, messages, max_tokens, temperature, call_kwargs))] = backup
+                attempts.append(backup)
+            
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        response = task.result()
+                    except Exception as e:
+                        errors.append(f'{tasks[task]}: {str(e)}')
+                        continue
+                    for other in pending:
+                        other.cancel()
+                    winner = tasks[task]
+                    if len(tasks) > 1:
+                        self.stats[winner].hedges_won += 1
+                    return dict(response, routed_provider=winner, attempts=attempts)
+        
+        raise Exception('Tous les fournisseurs LLM ont échoué - ' + ' | '.join(errors))
+    
+    def stream(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float,
+               preferred: Optional[str] = None, fallback_order: Optional[List[str]] = None,
+               **call_kwargs) -> Tuple[str, Iterator[str]]:
+        """
+        Ouvre un flux (stream_fn) sur le premier fournisseur qui produit un premier fragment.
+        Le basculement n'est possible qu'avant ce premier fragment; l'issue du flux est
+        enregistrée quand il se termine. Retourne le fournisseur retenu et les fragments.
+        """
+        if self.stream_fn is None:
+            raise Exception('Aucune fonction de streaming configurée pour le routeur LLM')
+        
+        candidates = self.ordered_providers(preferred, fallback_order)
+        if not candidates:
+            raise Exception('Aucun fournisseur LLM disponible (clés API manquantes)')
+        
+        errors = []
+        for provider in candidates:
+            started = time.perf_counter()
+            tokens = self.stream_fn(provider, messages, max_tokens, temperature, **call_kwargs)
+            try:
+                first = next(tokens, None)
+            except CircuitOpenError as e:
+                errors.append(f'{provider}: {str(e)}')
+                continue
+            except Exception as e:
+                self.stats[provider].record_failure(time.perf_counter() - started, str(e))
+                errors.append(f'{provider}: {str(e)}')
+                continue
+            return provider, self._relay_stream(provider, tokens, first, started, max_tokens)
+        
+        raise Exception('Tous les fournisseurs LLM ont échoué - ' + ' | '.join(errors))
+    
+    def _relay_stream(self, provider: str, tokens: Iterator[str], first: Optional[str],
+                      started: float, max_tokens: int) -> Iterator[str]:
+        try:
+            if first is not None:
+                yield first
+            yield from tokens
+        except GeneratorExit:
+            raise
+        except Exception as e:
+            self.stats[provider].record_failure(time.perf_counter() - started, str(e))
+            raise
+        finally:
+            tokens.close()
+        self.stats[provider].record_success(time.perf_counter() - started, max_tokens)
+    
+    def _hedge_delay(self, provider: str, max_tokens: int) -> Optional[float]:
+        """Seuil de hedging: percentile des latences du fournisseur pour la tranche de max_tokens de l'appel"""
+        stats = self.stats[provider]
+        if stats.bucket_samples(max_tokens) < self.hedge_min_samples:
+            return None
+        return stats.percentile(self.hedge_percentile, max_tokens)
+    
+    def _submit(self, provider: str, messages: List[Dict[str, str]], max_tokens: int,
+                temperature: float, call_kwargs: Dict[str, Any]):
+        return self.executor.submit(self._timed_call, provider, messages, max_tokens, temperature, call_kwargs)
+    
+    def _timed_call(self, provider: str, messages: List[Dict[str, str]], max_tokens: int,
+                    temperature: float, call_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            response = self.call_fn(provider, messages, max_tokens, temperature, **call_kwargs)
+        except CircuitOpenError:
+            # Refus immédiat: ne fausse pas les latences observées
+            raise
+        except Exception as e:
+            self.stats[provider].record_failure(time.perf_counter() - started, str(e))
+            raise
+        if not response.get('cached'):
+            self.stats[provider].record_success(time.perf_counter() - started, max_tokens)
+        return response
+    
+    async def _atimed_call(self, provider: str, messages: List[Dict[str, str]], max_tokens: int,
+                           temperature: float, call_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            response = await self.acall_fn(provider, messages, max_tokens, temperature, **call_kwargs)
+        except (CircuitOpenError, asyncio.CancelledError):
+            raise
+        except Exception as e:
+            self.stats[provider].record_failure(time.perf_counter() - started, str(e))
+            raise
+        if not response.get('cached'):
+            self.stats[provider].record_success(time.perf_counter() - started, max_tokens)
+        return response
+    
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            'hedge_enabled': self.hedge_enabled,
+            'hedge_percentile': self.hedge_percentile,
+            'providers': {name: stats.to_dict() for name, stats in self.stats.items()}
+        }
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 1) if seconds is not None else None
@@ -0,0 +1,113 @@
+"""
+Budget de tokens des prompts LLM
+Estimation par section, budget par modèle et réduction des sections les moins prioritaires
+"""
+
+import math
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Any, Optional, Tuple
+
+# Fenêtres de contexte (tokens) des modèles configurés dans LLM_PROVIDERS
+MODEL_CONTEXT_WINDOWS = {
+    'deepseek-chat': 64000,
+    'google/gemini-2.0-flash-exp:free': 1000000,
+    'gemini-pro': 32000,
+    'grok-beta': 128000
+}
+DEFAULT_CONTEXT_WINDOW = 8000
+
+# Caractères par token: estimation prudente pour du français (accents, mots longs)
+CHARS_PER_TOKEN = 3.5
+
+def estimate_tokens(text: str) -> int:
+    """Estimation rapide du nombre de tokens d'un texte (sans tokenizer)"""
+    if not text:
+        return 0
+    return int(math.ceil(len(text) / CHARS_PER_TOKEN))
+
+def truncate_to_tokens(text: str, max_tokens: int, ellipsis: str = '...') -> str:
+    """Tronque un texte à environ `max_tokens` tokens, en coupant sur un espace si possible"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    max_chars = max(0, int(max_tokens * CHARS_PER_TOKEN) - len(ellipsis))
+    cut = text[:max_chars]
+    if ' ' in cut[max_chars // 2:]:
+        cut = cut[:cut.rindex(' ')]
+    return cut.rstrip() + ellipsis
+
+def prompt_budget_for_model(model: Optional[str], max_output_tokens: int) -> int:
+    """
+    Budget d'entrée: LLM_PROMPT_TOKEN_BUDGET (objectif par tour, coût/latence),
+    plafonné par la fenêtre de contexte du modèle moins la sortie attendue
+    """
+    window = MODEL_CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+    target = int(os.getenv('LLM_PROMPT_TOKEN_BUDGET', '1500'))
+    return max(0, min(target, window - max_output_tokens))
+
+@dataclass
+class PromptSection:
+    """
+    Section de prompt.
+    priority: 0 = obligatoire (jamais réduite), plus élevé = réduit en premier.
+    strategy: 'lines' (retire les lignes les plus anciennes), 'truncate' (coupe la fin)
+    ou 'drop' (supprime la section). min_tokens: taille en dessous de laquelle
+    la section est supprimée plutôt que réduite. header: titre affiché au-dessus du texte.
+    """
+    name: str
+    text: str
+    priority: int = 0
+    strategy: str = 'truncate'
+    min_tokens: int = 0
+    header: str = ''
+    
+    def render(self) -> str:
+        return f"{self.header}\n{self.text}" if self.header else self.text
+
+def render_sections(sections: List[PromptSection]) -> str:
+    """Assemble les sections (séparées par une ligne vide)"""
+    return '\n\n'.join(section.render() for section in sections)
+
+class PromptBudgetPlanner:
+    """Ajuste un ensemble de sections à un budget de tokens, l'ordre d'affichage étant conservé"""
+    
+    def plan(self, sections: List[PromptSection], budget: int) -> Tuple[List[PromptSection], Dict[str, Any]]:
+        tokens = {section.name: estimate_tokens(section.render()) if section.text else 0 for section in sections}
+        original_total = sum(tokens.values())
+        texts = {section.name: section.text for section in sections}
+        overflow = original_total - budget
+        
+        # Les sections les moins prioritaires sont réduites en premier
+        for section in sorted(sections, key=lambda s: -s.priority):
+            if overflow <= 0 or section.priority == 0:
+                break
+            header_tokens = estimate_tokens(section.header)
+            allowed = max(0, tokens[section.name] - header_tokens - overflow)
+            reduced = self._reduce(section, allowed)
+            remaining = header_tokens + estimate_tokens(reduced) if reduced else 0
+            overflow -= tokens[section.name] - remaining
+            texts[section.name] = reduced
+            tokens[section.name] = remaining
+        
+        planned = [PromptSection(s.name, texts[s.name], s.priority, s.strategy, s.min_tokens, s.header)
+                   for s in sections if texts[s.name]]
+        total = sum(tokens.values())
+        return planned, {
+            'budget': budget,
+            'original_tokens': original_total,
+            'planned_tokens': total,
+            'trimmed_tokens': original_total - total,
+            'over_budget': total > budget,
+            'sections': {name: count for name, count in tokens.items()}
+        }
+    
+    def _reduce(self, section: PromptSection, allowed: int) -> str:
+        if section.strategy == 'drop' or allowed < section.min_tokens:
+            return ''
+        if section.strategy == 'lines':
+            lines = section.text.split('\n')
+            while len(lines) > 1 and estimate_tokens('\n'.join(lines)) > allowed:
+                lines.pop(0)
+            # La ligne la plus récente est conservée, tronquée si nécessaire
+            return truncate_to_tokens(lines[0], allowed) if len(lines) == 1 else '\n'.join(lines)
+        return truncate_to_tokens(section.text, allowed)
@@ -0,0 +1,74 @@
+"""
+Gabarits de prompts précompilés
+Analyse unique des gabarits et cache des sections statiques (préfixe réutilisable côté fournisseur)
+"""
+
+import threading
+from collections import OrderedDict
+from string import Formatter
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from src.utils.prompt_budget import estimate_tokens
+
+class CompiledTemplate:
+    """
+    Gabarit au format str.format analysé une seule fois en segments littéraux
+    et emplacements nommés; le rendu se limite à une concaténation.
+    """
+    
+    def __init__(self, template: str):
+        self.template = template
+        self.parts: List[Tuple[str, Optional[str], str]] = [
+            (literal, field_name, format_spec or '')
+            for literal, field_name, format_spec, _ in Formatter().parse(template)
+        ]
+        self.fields = {field_name for _, field_name, _ in self.parts if field_name}
+    
+    def render(self, values: Dict[str, Any]) -> str:
+        out = []
+        for literal, field_name, format_spec in self.parts:
+            out.append(literal)
+            if field_name is not None:
+                value = values[field_name]
+                out.append(format(value, format_spec) if format_spec else str(value))
+        return ''.join(out)
+
+class StaticPromptCache:
+    """
+    Sections statiques rendues une fois par clé (ex: (univers,)) et mémorisées
+    avec leur estimation de tokens. Le texte étant identique d'un tour à l'autre,
+    il forme un préfixe que les fournisseurs peuvent réutiliser (prompt caching).
+    """
+    
+    def __init__(self, render_fn: Callable[..., str], max_entries: int = 64):
+        self.render_fn = render_fn
+        self.max_entries = max_entries
+        self.entries: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+    
+    def get(self, key: Tuple[Hashable, ...]) -> Tuple[str, int]:
+        """Retourne (texte, tokens estimés) pour la clé, en le rendant au premier appel"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry
+        
+        text = self.render_fn(*key)
+        entry = (text, estimate_tokens(text))
+        with self.lock:
+            self.stats['misses'] += 1
+            self.entries[key] = entry
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return entry
+    
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+    
+    def metrics(self) -> Dict[str, Any]:
+        with self.lock:
+            return dict(self.stats, size=len(self.entries))
@@ -0,0 +1,93 @@
+"""
+Coalescence des appels identiques en vol (single-flight)
+Les appels concurrents de même clé partagent un seul appel amont et reçoivent le même résultat
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+class _LeaderAborted(Exception):
+    """L'appel meneur a été annulé: les appels en attente doivent réessayer eux-mêmes"""
+    pass
+
+class SingleFlight:
+    """
+    Registre des appels en cours par clé.
+    Le premier appelant (meneur) exécute l'appel; les suivants attendent son résultat
+    ou son exception. Utilisable depuis des threads (do) ou des coroutines (ado),
+    y compris sur des boucles asyncio différentes.
+    """
+    
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.calls: Dict[Hashable, Future] = {}
+        self.lock = threading.Lock()
+        self.stats = {'leaders': 0, 'coalesced': 0}
+    
+    def _join(self, key: Hashable) -> Tuple[Future, bool]:
+        with self.lock:
+            future = self.calls.get(key)
+            if future is not None:
+                self.stats['coalesced'] += 1
+                return future, False
+            future = self.calls[key] = Future()
+            self.stats['leaders'] += 1
+            return future, True
+    
+    def _finish(self, key: Hashable, future: Future) -> None:
+        with self.lock:
+            if self.calls.get(key) is future:
+                del self.calls[key]
+    
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Exécute fn() une seule fois pour tous les appelants concurrents de même clé"""
+        if not self.enabled:
+            return fn()
+        
+        while True:
+            future, leader = self._join(key)
+            if not leader:
+                try:
+                    return future.result()
+                except _LeaderAborted:
+                    continue
+            
+            try:
+                result = fn()
+            except BaseException as e:
+                self._finish(key, future)
+                future.set_exception(e if isinstance(e, Exception) else _LeaderAborted())
+                raise
+            self._finish(key, future)
+            future.set_result(result)
+            return result
+    
+    async def ado(self, key: Hashable, coro_fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Variante asynchrone de do(); l'annulation du meneur relance un appel chez les suivants"""
+        if not self.enabled:
+            return await coro_fn()
+        
+        while True:
+            future, leader = self._join(key)
+            if not leader:
+                try:
+                    # shield: l'annulation d'un appelant en attente ne doit pas annuler l'appel partagé
+                    return await asyncio.shield(asyncio.wrap_future(future))
+                except _LeaderAborted:
+                    continue
+            
+            try:
+                result = await coro_fn()
+            except BaseException as e:
+                self._finish(key, future)
+                future.set_exception(e if isinstance(e, Exception) else _LeaderAborted())
+                raise
+            self._finish(key, future)
+            future.set_result(result)
+            return result
+    
+    def metrics(self) -> Dict[str, Any]:
+        with self.lock:
+            return dict(self.stats, enabled=self.enabled, in_flight=len(self.calls))
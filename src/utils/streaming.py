@@ -0,0 +1,22 @@
+"""
+Utilitaires de diffusion en continu (Server-Sent Events)
+"""
+
+import json
+from typing import Any, Iterable, Iterator, Optional
+
+def sse_event(data: Any, event: Optional[str] = None) -> str:
+    """Formate un message Server-Sent Events"""
+    payload = json.dumps(data, ensure_ascii=False)
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {payload}\n\n"
+
+def iter_sse_data(lines: Iterable[str]) -> Iterator[str]:
+    """Extrait les champs `data:` d'un flux SSE ligne par ligne (s'arrête sur [DONE])"""
+    for line in lines:
+        if not line or not line.startswith('data:'):
+            continue
+        data = line[len('data:'):].strip()
+        if data == '[DONE]':
+            return
+        yield data
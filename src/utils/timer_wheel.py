@@ -0,0 +1,135 @@
+"""
+Roue de temporisation hiérarchique - Architecture des 4 Moteurs
+Échéances indexées sur le temps de jeu (heures), expiration en O(échéances dues)
+"""
+
+import math
+from typing import Dict, List, Hashable, Optional, Set, Tuple
+
+class HierarchicalTimerWheel:
+    """
+    Roue de temporisation hiérarchique (à la Varghese & Lauck).
+    
+    Le temps est découpé en ticks de `resolution` heures. Le niveau 0 couvre
+    `wheel_size` ticks, chaque niveau supérieur couvre `wheel_size` fois plus;
+    les échéances descendent d'un niveau à chaque tour de la roue inférieure.
+    Avancer d'un tick ne coûte que le traitement de l'emplacement courant.
+    Une échéance est rangée dans le tick qui la contient: elle n'expire qu'une fois
+    `now >= deadline`, sinon elle attend dans `due` la prochaine avance.
+    """
+    
+    def __init__(self, start_time: float = 0.0, resolution: float = 0.25,
+                 wheel_size: int = 64, levels: int = 4):
+        self.resolution = resolution
+        self.wheel_size = wheel_size
+        self.wheels: List[List[Set[Hashable]]] = [[set() for _ in range(wheel_size)] for _ in range(levels)]
+        self.overflow: Set[Hashable] = set()
+        self.due: Set[Hashable] = set()
+        self.timers: Dict[Hashable, Tuple[float, int, Optional[Tuple[int, int]]]] = {}
+        self.current_tick = self._tick(start_time)
+    
+    def __len__(self) -> int:
+        return len(self.timers)
+    
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.timers
+    
+    def _tick(self, game_time: float) -> int:
+        return int(math.floor(game_time / self.resolution + 1e-9))
+    
+    def schedule(self, key: Hashable, deadline: float) -> None:
+        """Programme (ou reprogramme) une échéance à l'heure de jeu `deadline`"""
+        self.cancel(key)
+        self._place(key, deadline, self._tick(deadline))
+    
+    def cancel(self, key: Hashable) -> bool:
+        """Annule une échéance programmée"""
+        timer = self.timers.pop(key, None)
+        if timer is None:
+            return False
+        _, _, position = timer
+        if position is None:
+            self.due.discard(key)
+            self.overflow.discard(key)
+        else:
+            level, slot = position
+            self.wheels[level][slot].discard(key)
+        return True
+    
+    def deadline(self, key: Hashable) -> Optional[float]:
+        """Heure de jeu de l'échéance d'une clé"""
+        timer = self.timers.get(key)
+        return timer[0] if timer else None
+    
+    def advance(self, now: float) -> List[Hashable]:
+        """Avance la roue jusqu'à l'heure de jeu `now` et retourne les clés expirées"""
+        expired = list(self.due)
+        self.due.clear()
+        target_tick = self._tick(now)
+        
+        if not self.timers or len(expired) == len(self.timers):
+            self.current_tick = max(self.current_tick, target_tick)
+            return self._expire(expired, now)
+        
+        while self.current_tick < target_tick:
+            self.current_tick += 1
+            self._cascade()
+            if self.due:
+                expired.extend(self.due)
+                self.due.clear()
+            slot = self.wheels[0][self.current_tick % self.wheel_size]
+            if slot:
+                expired.extend(slot)
+                slot.clear()
+        
+        return self._expire(expired, now)
+    
+    def _expire(self, candidates: List[Hashable], now: float) -> List[Hashable]:
+        """Retire les échéances atteintes; celles plus tard dans le tick courant restent dues"""
+        expired = []
+        for key in candidates:
+            deadline, tick, _ = self.timers[key]
+            if deadline <= now + 1e-9:
+                del self.timers[key]
+                expired.append(key)
+            else:
+                self.due.add(key)
+                self.timers[key] = (deadline, tick, None)
+        return expired
+    
+    def _place(self, key: Hashable, deadline: float, tick: int) -> None:
+        delta = tick - self.current_tick
+        if delta <= 0:
+            self.due.add(key)
+            self.timers[key] = (deadline, tick, None)
+            return
+        
+        for level, wheel in enumerate(self.wheels):
+            if delta < self.wheel_size ** (level + 1):
+                slot = (tick // self.wheel_size ** level) % self.wheel_size
+                wheel[slot].add(key)
+                self.timers[key] = (deadline, tick, (level, slot))
+                return
+        
+        self.overflow.add(key)
+        self.timers[key] = (deadline, tick, None)
+    
+    def _cascade(self) -> None:
+        """Redescend les échéances des niveaux supérieurs au passage d'un tour de roue"""
+        for level in range(1, len(self.wheels)):
+            span = self.wheel_size ** level
+            if self.current_tick % span:
+                return
+            slot = self.wheels[level][(self.current_tick // span) % self.wheel_size]
+            keys = list(slot)
+            slot.clear()
+            for key in keys:
+                deadline, tick, _ = self.timers[key]
+                self._place(key, deadline, tick)
+        
+        if self.overflow and self.current_tick % self.wheel_size ** len(self.wheels) == 0:
+            keys = list(self.overflow)
+            self.overflow.clear()
+            for key in keys:
+                deadline, tick, _ = self.timers[key]
+                self._place(key, deadline, tick)
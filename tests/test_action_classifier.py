@@ -0,0 +1,45 @@
+"""
+Classifieur d'actions: formes fléchies explicites, limites de mots, accents et expressions
+"""
+
+from src.engines.interaction_engine import interaction_engine
+from src.utils.keyword_matcher import KeywordMatcher, fold_text
+
+def classify(action_text):
+    return interaction_engine.action_classifier.classify(action_text.lower())
+
+def test_listed_inflections_are_recognized():
+    assert classify('Attaquer le gobelin')['action_type'] == 'combat'
+    assert classify('Je séduis la noble')['action_type'] == 'social'
+    assert classify('Nous examinons la carte')['parameters'] == {'intent': 'observation'}
+    assert classify('Rejoignez le camp')['parameters'] == {'intent': 'movement'}
+
+def test_unlisted_words_sharing_a_prefix_do_not_match():
+    # 'ferme' / 'range' / 'entre' ne reconnaissent pas 'fermement' / 'rangée' / 'entrepôt'
+    assert classify('Je regarde fermement')['type_scores']['exploration'] == 1
+    assert classify('Une rangée de tonneaux')['type_scores']['inventory'] == 0
+    assert classify("L'entrepôt du port")['parameters'] == {}
+
+def test_accents_case_and_multi_word_keywords():
+    classification = classify("ÉPÉE en main, je lance une Boule de Feu vers l'est en même temps")
+    
+    assert classification['objects'] == ['épée']
+    assert classification['spells'] == ['boule de feu']
+    assert classification['complexity_indicators'] == {'simultaneous'}
+    assert interaction_engine.action_classifier.parameters_for(classification, 'exploration')['direction'] == 'east'
+
+def test_type_weight_is_doubled_when_the_keyword_opens_the_action():
+    assert classify('Frappe le loup')['type_scores']['combat'] == 2
+    assert classify('Je frappe le loup')['type_scores']['combat'] == 1
+
+def test_fold_text_removes_case_accents_and_ligatures():
+    assert fold_text('Défaite') == 'defaite'
+    assert fold_text('CŒUR brisé') == 'coeur brise'
+    assert fold_text('Straße') == 'strasse'
+    assert fold_text('plain ascii') == 'plain ascii'
+
+def test_keyword_matcher_prefixes_and_word_boundaries():
+    matcher = KeywordMatcher({'victoire': ['triomph*', 'gloire'], 'peur': ['effroi']})
+    
+    assert matcher.count('Un triomphe glorieux, puis l\'Effroi') == {'victoire': 1, 'peur': 1}
+    assert matcher.count('La gloire!') == {'victoire': 1, 'peur': 0}
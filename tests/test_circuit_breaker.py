@@ -0,0 +1,65 @@
+"""
+Disjoncteur par fournisseur: ouverture, rejet, sonde half_open et appels lents
+"""
+
+import types
+
+import pytest
+
+from src.utils import circuit_breaker
+from src.utils.circuit_breaker import CircuitBreaker
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(circuit_breaker, 'time', types.SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+def test_consecutive_failures_open_the_breaker_until_the_recovery_timeout(clock):
+    breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=10)
+    for _ in range(3):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request() and not breaker.is_available()
+    assert breaker.to_dict()['rejected'] == 1
+    
+    clock.now += 10
+    assert breaker.is_available()
+
+def test_half_open_allows_one_probe_then_closes_or_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=5)
+    breaker.record_failure()
+    clock.now += 5
+    
+    assert breaker.allow_request() and breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and breaker.times_opened == 2
+    
+    clock.now += 5
+    assert breaker.allow_request()
+    breaker.record_success(0.1)
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow_request()
+
+def test_released_probe_can_be_reserved_again(clock):
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=5)
+    breaker.record_failure()
+    clock.now += 5
+    
+    assert breaker.allow_request()
+    breaker.release_request()
+    assert breaker.allow_request()
+
+def test_failure_rate_and_slow_calls_open_the_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=100, failure_rate_threshold=0.5, slow_call_seconds=2.0,
+                             window=10, min_calls=4)
+    breaker.record_success(0.1)
+    breaker.record_failure()
+    breaker.record_success(0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    
+    # Appel abouti mais trop lent: compte comme un échec (2 sur 4)
+    breaker.record_success(3.0)
+    assert breaker.state == CircuitBreaker.OPEN
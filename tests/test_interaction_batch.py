@@ -0,0 +1,67 @@
+"""
+Routes d'interaction unitaires et par lots: un même identifiant de session donne le même contexte
+"""
+
+import pytest
+from flask import Flask
+
+from src.engines.state_engine import state_engine
+from src.routes.interaction import interaction_bp
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(interaction_bp, url_prefix='/api')
+    return app.test_client()
+
+@pytest.fixture
+def session_id():
+    session_id = state_engine.create_session('Testeur')
+    yield session_id
+    state_engine.sessions.pop(session_id, None)
+
+def test_single_and_batch_routes_resolve_the_same_session(client, session_id):
+    action = 'Je regarde autour de moi'
+    
+    single = client.post('/api/parse_action', json={'action': action, 'session_id': session_id})
+    batch = client.post('/api/parse_action/batch', json={'actions': [action], 'session_id': session_id})
+    assert single.status_code == 200
+    assert batch.status_code == 200
+    parsed_action = single.get_json()['parsed_action']
+    assert batch.get_json()['results'][0]['parsed_action'] == parsed_action
+    
+    single = client.post('/api/validate_action', json={'parsed_action': parsed_action, 'session_id': session_id})
+    batch = client.post('/api/validate_action/batch',
+                        json={'parsed_actions': [parsed_action], 'session_id': session_id})
+    assert single.status_code == 200
+    assert batch.status_code == 200
+    assert batch.get_json()['results'][0]['validation_result'] == single.get_json()['validation_result']
+
+def test_unknown_session_is_rejected_by_single_and_batch_validation(client):
+    parsed_action = {'action_type': 'exploration', 'entities': {}, 'parameters': {}}
+    
+    single = client.post('/api/validate_action', json={'parsed_action': parsed_action, 'session_id': 'inconnue'})
+    batch = client.post('/api/validate_action/batch',
+                        json={'parsed_actions': [parsed_action], 'session_id': 'inconnue'})
+    assert single.status_code == 404
+    assert batch.status_code == 404
+
+def test_batch_keeps_input_order_and_lists_invalid_items(client, session_id):
+    response = client.post('/api/parse_action/batch', json={
+        'actions': ['Je regarde autour de moi', '', 42, "J'attaque le gobelin"], 'session_id': session_id
+    })
+    
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [result['index'] for result in body['results']] == [0, 1, 2, 3]
+    assert [failure['index'] for failure in body['failures']] == [1, 2]
+    assert body['results'][3]['parsed_action']['action_type'] == 'combat'
+    assert 'validation_result' in body['results'][3]
+    assert body['stats']['succeeded'] == 2 and body['success'] is False
+
+def test_batch_size_is_capped(client, monkeypatch):
+    monkeypatch.setenv('INTERACTION_BATCH_MAX_ITEMS', '2')
+    
+    assert client.post('/api/parse_action/batch', json={'actions': ['a', 'b', 'c']}).status_code == 400
+    assert client.post('/api/parse_action/batch', json={'actions': []}).status_code == 400
+    assert client.post('/api/parse_action/batch', json={'actions': ['Je regarde']}).status_code == 200
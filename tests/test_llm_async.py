@@ -0,0 +1,129 @@
+"""
+Client LLM asynchrone contre un vrai serveur aiohttp local, et route Flask async /narrative/agenerate
+"""
+
+import asyncio
+import threading
+
+import pytest
+from aiohttp import web
+from flask import Flask
+
+from src.utils.llm_async import AsyncLLMClient, async_llm_client
+from src.utils.llm_http import LLMHTTPPool
+
+COMPLETION = {'choices': [{'message': {'content': 'Le vent se lève sur la plaine.'}}]}
+
+@pytest.fixture(scope='module')
+def provider_url():
+    """Faux fournisseur: /ok répond du JSON, /bad-json un corps illisible, /slow après 0,3 s"""
+    async def ok(request):
+        return web.json_response(COMPLETION)
+    
+    async def bad_json(request):
+        return web.Response(text='{"choices": [', content_type='application/json')
+    
+    async def slow(request):
+        await asyncio.sleep(0.3)
+        return web.json_response(COMPLETION)
+    
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    app = web.Application()
+    app.router.add_post('/ok', ok)
+    app.router.add_post('/bad-json', bad_json)
+    app.router.add_post('/slow', slow)
+    runner = web.AppRunner(app)
+    asyncio.run_coroutine_threadsafe(runner.setup(), loop).result()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    asyncio.run_coroutine_threadsafe(site.start(), loop).result()
+    port = site._server.sockets[0].getsockname()[1]
+    
+    yield f'http://127.0.0.1:{port}'
+    
+    asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+
+@pytest.fixture
+def client():
+    client = AsyncLLMClient(LLMHTTPPool())
+    yield client
+    client.close()
+
+def test_post_json_decodes_the_response(client, provider_url):
+    body = client.run_sync(client.post_json('fournisseur', f'{provider_url}/ok', {}, {'max_tokens': 400}), 5)
+    
+    assert body == COMPLETION
+    stats = client.metrics()['providers']['fournisseur']
+    assert stats['completed'] == 1
+    assert stats['queued'] == 0 and stats['in_flight'] == 0
+    assert client.http_pool.get_client('fournisseur').latency_percentile(0.5, 400) is not None
+
+def test_malformed_body_fails_the_half_open_probe_instead_of_keeping_it(client, provider_url):
+    breaker = client.http_pool.get_client('fournisseur').breaker
+    breaker.recovery_timeout = 0.0
+    breaker.record_failure()
+    breaker._open()
+    
+    with pytest.raises(Exception):
+        client.run_sync(client.post_json('fournisseur', f'{provider_url}/bad-json', {}, {}), 5)
+    
+    assert client.metrics()['providers']['fournisseur']['errors'] == 1
+    assert breaker.state == breaker.OPEN
+    # La sonde n'est pas restée réservée: le fournisseur peut être sondé à nouveau
+    body = client.run_sync(client.post_json('fournisseur', f'{provider_url}/ok', {}, {}), 5)
+    assert body == COMPLETION
+    assert breaker.state == breaker.CLOSED
+
+def test_task_cancelled_while_queued_leaves_no_queued_count(client, provider_url, monkeypatch):
+    monkeypatch.setenv('LLM_ASYNC_CONCURRENCY_FOURNISSEUR', '1')
+    
+    async def cancel_queued():
+        running = asyncio.ensure_future(client.post_json('fournisseur', f'{provider_url}/slow', {}, {}))
+        queued = asyncio.ensure_future(client.post_json('fournisseur', f'{provider_url}/ok', {}, {}))
+        await asyncio.sleep(0.05)
+        assert client.stats['fournisseur']['queued'] == 1
+        queued.cancel()
+        await asyncio.gather(queued, return_exceptions=True)
+        return await running
+    
+    assert client.run_sync(cancel_queued(), 5) == COMPLETION
+    stats = client.metrics()['providers']['fournisseur']
+    assert stats['queued'] == 0 and stats['in_flight'] == 0 and stats['completed'] == 1
+
+def test_async_narrative_route_goes_through_the_async_client(provider_url, monkeypatch):
+    from src.engines.narrative_engine import narrative_engine
+    from src.engines.state_engine import state_engine
+    from src.routes.llm import LLM_PROVIDERS, llm_router
+    from src.routes.narrative import narrative_bp
+    
+    for name, config in LLM_PROVIDERS.items():
+        monkeypatch.setitem(config, 'api_key', None)
+    monkeypatch.setitem(LLM_PROVIDERS['deepseek'], 'api_key', 'test')
+    monkeypatch.setitem(LLM_PROVIDERS['deepseek'], 'base_url', f'{provider_url}/ok')
+    monkeypatch.setenv('DEFAULT_LLM_PROVIDER', 'deepseek')
+    monkeypatch.setattr(llm_router, 'hedge_enabled', False)
+    monkeypatch.setattr(narrative_engine, 'local_tier_mode', 'off')
+    monkeypatch.setattr(narrative_engine, 'speculation_enabled', False)
+    
+    app = Flask(__name__)
+    app.register_blueprint(narrative_bp, url_prefix='/api')
+    session_id = state_engine.create_session('Testeur')
+    completed = async_llm_client.stats.get('deepseek', {}).get('completed', 0)
+    try:
+        response = app.test_client().post('/api/narrative/agenerate', json={
+            'session_id': session_id,
+            'parsed_action': {
+                'action_type': 'dialogue', 'complexity': 'moderate',
+                'raw_action': 'Je demande au vieil ermite ce qu\'il sait de la tour',
+                'entities': {'npcs': ['vieil ermite'], 'objects': [], 'locations': [], 'spells': []},
+                'parameters': {'tone': 'polite'}
+            },
+            'validation_result': {'feasible': True, 'consequences': []}
+        })
+    finally:
+        state_engine.sessions.pop(session_id, None)
+    
+    assert response.status_code == 200
+    assert response.get_json()['success'] is True
+    assert async_llm_client.stats['deepseek']['completed'] == completed + 1
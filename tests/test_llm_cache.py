@@ -0,0 +1,54 @@
+"""
+Cache des réponses LLM: clés normalisées, politique de température, éviction LRU et TTL
+"""
+
+import types
+
+from src.utils import llm_cache
+from src.utils.llm_cache import LLMResponseCache
+
+MESSAGES = [{'role': 'system', 'content': 'Tu es le narrateur.'}, {'role': 'user', 'content': 'Je salue'}]
+
+def test_key_ignores_extra_whitespace_but_not_call_parameters():
+    key = LLMResponseCache.make_key('deepseek', 'deepseek-chat', MESSAGES, 0.2, 400)
+    spaced = [{'role': 'system', 'content': '  Tu es le\n narrateur. '}, {'role': 'user', 'content': 'Je  salue'}]
+    
+    assert LLMResponseCache.make_key('deepseek', 'deepseek-chat', spaced, 0.2, 400) == key
+    assert LLMResponseCache.make_key('openai', 'deepseek-chat', MESSAGES, 0.2, 400) != key
+    assert LLMResponseCache.make_key('deepseek', 'deepseek-chat', MESSAGES, 0.2, 401) != key
+    assert LLMResponseCache.make_key('deepseek', 'deepseek-chat', MESSAGES[1:], 0.2, 400) != key
+
+def test_temperature_policy_and_explicit_override():
+    cache = LLMResponseCache(max_temperature=0.3)
+    
+    assert cache.is_cacheable(0.3)
+    assert not cache.is_cacheable(0.8)
+    assert cache.is_cacheable(0.8, cache=True)
+    assert not cache.is_cacheable(0.1, cache=False)
+    assert not LLMResponseCache(enabled=False).is_cacheable(0.0, cache=True)
+    assert cache.metrics()['bypassed'] == 2
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LLMResponseCache(max_entries=2)
+    cache.set('a', {'content': 'A'})
+    cache.set('b', {'content': 'B'})
+    assert cache.get('a') == {'content': 'A'}
+    cache.set('c', {'content': 'C'})
+    
+    assert cache.get('b') is None
+    assert cache.get('a') and cache.get('c')
+    assert cache.metrics()['evictions'] == 1
+
+def test_expired_entries_are_misses(monkeypatch):
+    clock = types.SimpleNamespace(now=100.0)
+    monkeypatch.setattr(llm_cache, 'time', types.SimpleNamespace(monotonic=lambda: clock.now))
+    cache = LLMResponseCache(ttl_seconds=10)
+    cache.set('a', {'content': 'A'})
+    
+    clock.now += 10
+    assert cache.get('a') == {'content': 'A'}
+    clock.now += 1
+    assert cache.get('a') is None
+    
+    metrics = cache.metrics()
+    assert metrics['expirations'] == 1 and metrics['size'] == 0 and metrics['hit_rate'] == 0.5
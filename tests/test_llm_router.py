@@ -0,0 +1,67 @@
+"""
+Routage LLM: appels directs sans hedging, seuil de hedging par tranche de max_tokens, basculement
+"""
+
+import threading
+import time
+
+import pytest
+
+from src.utils.llm_router import LLMRouter
+
+PROVIDERS = {'rapide': {'api_key': 'a'}, 'secours': {'api_key': 'b'}}
+
+def make_router(latencies, failing=(), **kwargs):
+    calls = []
+    
+    def call(provider, messages, max_tokens, temperature):
+        calls.append((provider, max_tokens, threading.current_thread().name))
+        time.sleep(latencies.get((provider, max_tokens), 0.0))
+        if provider in failing:
+            raise Exception('panne')
+        return {'response': provider}
+    
+    return LLMRouter(call, PROVIDERS, hedge_min_samples=5, **kwargs), calls
+
+def test_unhedged_completion_runs_in_the_calling_thread():
+    router, calls = make_router({})
+    
+    response = router.complete([], 400, 0.7, preferred='rapide')
+    
+    assert response['routed_provider'] == 'rapide'
+    assert calls == [('rapide', 400, threading.current_thread().name)]
+
+def test_failover_to_the_next_provider():
+    router, calls = make_router({}, failing=('rapide',))
+    
+    response = router.complete([], 400, 0.7, preferred='rapide')
+    
+    assert response['routed_provider'] == 'secours'
+    assert response['attempts'] == ['rapide', 'secours']
+
+def test_hedge_threshold_follows_the_request_max_tokens_bucket():
+    router, calls = make_router({('rapide', 2000): 0.05}, hedge_enabled=True)
+    for _ in range(10):
+        router.stats['rapide'].record_success(0.2, 2000)
+    # Trafic court majoritaire: le p90 global du fournisseur tombe à 1 ms
+    for _ in range(95):
+        router.stats['rapide'].record_success(0.001, 400)
+    
+    # Appel long plus lent que les appels courts mais sous son propre p90: pas de couverture
+    response = router.complete([], 2000, 0.7, preferred='rapide')
+    
+    assert response['attempts'] == ['rapide']
+    assert [provider for provider, _, _ in calls] == ['rapide']
+    assert router._hedge_delay('rapide', 400) == pytest.approx(0.001)
+    assert router._hedge_delay('rapide', 900) is None
+
+def test_slow_provider_is_hedged_within_its_bucket():
+    router, calls = make_router({('rapide', 400): 0.3}, hedge_enabled=True)
+    for _ in range(10):
+        router.stats['rapide'].record_success(0.01, 400)
+    
+    response = router.complete([], 400, 0.7, preferred='rapide')
+    
+    assert response['routed_provider'] == 'secours'
+    assert response['attempts'] == ['rapide', 'secours']
+    assert router.stats['secours'].hedges_won == 1
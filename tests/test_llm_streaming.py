@@ -0,0 +1,98 @@
+"""
+Flux SSE contre un vrai serveur aiohttp local: issue enregistrée en fin de flux et basculement du routeur
+"""
+
+import asyncio
+import json
+import threading
+
+import pytest
+from aiohttp import web
+
+from src.routes.llm import llm_http_pool, stream_openai_compatible_api
+from src.utils.llm_router import LLMRouter
+
+def sse(token):
+    return f'data: {json.dumps({"choices": [{"delta": {"content": token}}]})}\n\n'.encode()
+
+@pytest.fixture(scope='module')
+def provider_url():
+    """Faux fournisseur: /ok diffuse deux fragments, /cut se coupe après le premier, /down répond 503"""
+    async def ok(request):
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+        await response.prepare(request)
+        await response.write(sse('Le vent '))
+        await response.write(sse('se lève.'))
+        await response.write(b'data: [DONE]\n\n')
+        return response
+    
+    async def cut(request):
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+        await response.prepare(request)
+        await response.write(sse('Le vent '))
+        await response.write(b'data: {"choices": [\n\n')
+        return response
+    
+    async def down(request):
+        return web.Response(status=503)
+    
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    app = web.Application()
+    app.router.add_post('/ok', ok)
+    app.router.add_post('/cut', cut)
+    app.router.add_post('/down', down)
+    runner = web.AppRunner(app)
+    asyncio.run_coroutine_threadsafe(runner.setup(), loop).result()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    asyncio.run_coroutine_threadsafe(site.start(), loop).result()
+    port = site._server.sockets[0].getsockname()[1]
+    
+    yield f'http://127.0.0.1:{port}'
+    
+    asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+
+def stream(provider, url):
+    return stream_openai_compatible_api(url, 'test', 'modele', [{'role': 'user', 'content': 'Bonjour'}],
+                                        400, 0.7, provider)
+
+def test_stream_failing_mid_body_is_recorded_as_a_failure(provider_url):
+    client = llm_http_pool.get_client('flux-coupe')
+    tokens = stream('flux-coupe', f'{provider_url}/cut')
+    
+    assert next(tokens) == 'Le vent '
+    # En-têtes reçus: l'issue n'est pas encore connue
+    assert client.breaker.consecutive_failures == 0 and client.errors == 0
+    with pytest.raises(ValueError):
+        next(tokens)
+    
+    assert client.breaker.consecutive_failures == 1
+    assert client.errors == 1
+
+def test_completed_stream_is_recorded_as_a_success(provider_url):
+    client = llm_http_pool.get_client('flux-complet')
+    client.breaker.record_failure()
+    
+    assert ''.join(stream('flux-complet', f'{provider_url}/ok')) == 'Le vent se lève.'
+    assert client.breaker.consecutive_failures == 0
+    assert client.errors == 0
+
+def test_router_fails_over_before_the_first_token(provider_url):
+    urls = {'flux-panne': f'{provider_url}/down', 'flux-secours': f'{provider_url}/ok'}
+    router = LLMRouter(
+        call_fn=None,
+        providers={name: {'api_key': 'test'} for name in urls},
+        stream_fn=lambda provider, messages, max_tokens, temperature: stream_openai_compatible_api(
+            urls[provider], 'test', 'modele', messages, max_tokens, temperature, provider
+        )
+    )
+    
+    provider, tokens = router.stream([{'role': 'user', 'content': 'Bonjour'}], 400, 0.7,
+                                     preferred='flux-panne', fallback_order=['flux-panne', 'flux-secours'])
+    
+    assert provider == 'flux-secours'
+    assert ''.join(tokens) == 'Le vent se lève.'
+    assert router.stats['flux-panne'].failures == 1
+    assert router.stats['flux-secours'].successes == 1
+    assert router.stats['flux-secours'].bucket_samples(400) == 1
@@ -0,0 +1,30 @@
+"""
+Prompt narratif: préfixe système identique d'une action à l'autre, style dans le message du tour
+"""
+
+from src.engines.model_routing import ModelTier
+from src.engines.narrative_engine import narrative_engine
+
+CONTEXT = {
+    'session': {'universe': 'fantasy', 'narrative_style': 'epic'},
+    'player': {'name': 'Testeur', 'level': 2},
+    'world_state': {'current_location': {'name': 'Clairière'}, 'npcs_here': [{'name': 'Ermite'}]}
+}
+ARC = {'type': 'exploration', 'phase': 'introduction', 'tension_level': 0.3}
+TIER = ModelTier('fast', 400, 0.7)
+
+def build(action_type, narrative_style):
+    parsed_action = {'action_type': action_type, 'raw_action': 'Je salue l\'ermite', 'entities': {}}
+    return narrative_engine._build_narrative_prompt(
+        CONTEXT, parsed_action, {'feasible': True}, ARC, narrative_style, TIER
+    )
+
+def test_static_prefix_does_not_depend_on_the_narrative_style():
+    epic = build('combat', 'epic')
+    mysterious = build('dialogue', 'mysterious')
+    
+    assert epic[0] == mysterious[0]
+    assert 'STYLE NARRATIF' not in epic[0]['content']
+    assert 'STYLE NARRATIF (epic)' in epic[1]['content']
+    assert 'STYLE NARRATIF (mysterious)' in mysterious[1]['content']
+    assert narrative_engine.style_profiles['mysterious']['tone'] in mysterious[1]['content']
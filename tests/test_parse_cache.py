@@ -0,0 +1,58 @@
+"""
+Cache des actions analysées: clé normalisée, invalidation au changement de contexte, éviction LRU
+"""
+
+from src.engines.interaction_engine import InteractionEngine
+from src.engines.parse_cache import ParseResultCache, context_fingerprint, normalize_action
+
+def make_context(location='place', npcs=('Garde',), inventory=()):
+    return {
+        'session': {'session_id': 'session_test'},
+        'world_state': {'current_location': {'id': location}, 'npcs_here': [{'name': name} for name in npcs],
+                        'items_here': []},
+        'inventory': [{'id': item_id, 'quantity': 1} for item_id in inventory]
+    }
+
+def test_normalized_text_and_context_fingerprint():
+    assert normalize_action('  Regarde   AUTOUR ') == 'regarde autour'
+    assert context_fingerprint(make_context()) == context_fingerprint(make_context())
+    assert context_fingerprint(make_context(npcs=('Garde', 'Marchand'))) != context_fingerprint(make_context())
+    assert context_fingerprint(make_context(inventory=('epee',))) != context_fingerprint(make_context())
+    assert context_fingerprint({'world_state': 'inconnu'}) is None
+
+def test_context_change_invalidates_the_session_entries():
+    cache = ParseResultCache()
+    before, after = context_fingerprint(make_context()), context_fingerprint(make_context(location='foret'))
+    cache.put('s1', before, 'regarde', {'action_type': 'exploration'})
+    cache.put('s2', before, 'regarde', {'action_type': 'exploration'})
+    
+    assert cache.get('s1', before, 'regarde') == {'action_type': 'exploration'}
+    assert cache.get('s1', after, 'regarde') is None
+    assert cache.get('s1', before, 'regarde') is None
+    assert cache.get('s2', before, 'regarde') is not None
+    assert cache.metrics()['invalidations'] == 1
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ParseResultCache(max_entries=2)
+    for action_key in ('a', 'b'):
+        cache.put('s', 'empreinte', action_key, {'action_type': action_key})
+    cache.get('s', 'empreinte', 'a')
+    cache.put('s', 'empreinte', 'c', {'action_type': 'c'})
+    
+    assert cache.get('s', 'empreinte', 'b') is None
+    assert cache.get('s', 'empreinte', 'a') and cache.get('s', 'empreinte', 'c')
+    assert cache.session_keys['s'] == {('s', 'empreinte', 'a'), ('s', 'empreinte', 'c')}
+
+def test_cached_parse_matches_a_fresh_parse_and_is_an_independent_copy():
+    engine = InteractionEngine()
+    context = make_context()
+    
+    first = engine.parse_action("J'attaque le Garde", context)
+    first['entities']['npcs'].append('modifié')
+    cached = engine.parse_action("  j'attaque  le garde", context)
+    
+    assert engine.get_parse_cache_metrics()['hits'] == 1
+    assert cached['raw_action'] == "  j'attaque  le garde"
+    assert dict(cached, raw_action=None, parsed_action=None) == dict(
+        engine._parse_action("  j'attaque  le garde", context), raw_action=None, parsed_action=None
+    )
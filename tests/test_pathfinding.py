@@ -0,0 +1,71 @@
+"""
+Itinéraires A*+ALT: exactitude face à Dijkstra, cache LRU et accès concurrents
+"""
+
+import random
+import threading
+
+from src.engines.pathfinding import LocationGraph, _generate_world
+
+def make_graph(num_locations=400):
+    return LocationGraph(_generate_world(num_locations, extra_edges=num_locations // 10), background_refresh=False)
+
+def test_alt_routes_match_dijkstra_distances():
+    graph = make_graph()
+    rng = random.Random(3)
+    
+    for _ in range(30):
+        start, goal = f'loc_{rng.randrange(400)}', f'loc_{rng.randrange(400)}'
+        path, distance = graph.shortest_path(start, goal)
+        
+        assert path[0] == start and path[-1] == goal
+        assert abs(distance - graph._dijkstra(start)[goal]) < 1e-9
+        assert abs(sum(graph.adjacency[a][b] for a, b in zip(path, path[1:])) - distance) < 1e-9
+
+def test_cached_route_is_a_copy():
+    graph = make_graph()
+    path, _ = graph.shortest_path('loc_0', 'loc_399')
+    path.append('ailleurs')
+    
+    assert graph.shortest_path('loc_0', 'loc_399')[0][-1] == 'loc_399'
+    assert graph.stats['cache_hits'] == 1
+
+def test_route_computed_before_a_graph_change_is_not_cached():
+    graph = make_graph()
+    astar = graph._astar
+    
+    def astar_during_a_change(start, goal):
+        result = astar(start, goal)
+        # Autre requête qui applique une modification du graphe pendant le calcul
+        graph.world_state.disconnect_locations(result[0][0], result[0][1])
+        graph.sync()
+        return result
+    
+    graph._astar = astar_during_a_change
+    graph.shortest_path('loc_0', 'loc_399')
+    
+    assert ('loc_0', 'loc_399') not in graph.path_cache
+
+def test_concurrent_queries_keep_the_cache_and_stats_consistent():
+    graph = make_graph()
+    graph.cache_size = 16
+    pairs = [(f'loc_{index}', f'loc_{399 - index}') for index in range(40)]
+    errors = []
+    
+    def worker(seed):
+        rng = random.Random(seed)
+        try:
+            for _ in range(200):
+                graph.shortest_path(*rng.choice(pairs))
+        except Exception as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert not errors
+    assert graph.stats['queries'] == 8 * 200
+    assert len(graph.path_cache) <= graph.cache_size
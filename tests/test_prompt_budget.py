@@ -0,0 +1,48 @@
+"""
+Budget de tokens des prompts: plafond par modèle et sortie du palier, réduction par priorité
+"""
+
+from src.engines.model_routing import ModelTier
+from src.utils.prompt_budget import (
+    DEFAULT_CONTEXT_WINDOW, PromptBudgetPlanner, PromptSection, estimate_tokens, prompt_budget_for_model
+)
+
+def test_budget_is_capped_by_the_context_window_minus_the_output(monkeypatch):
+    monkeypatch.setenv('LLM_PROMPT_TOKEN_BUDGET', '1500')
+    
+    assert prompt_budget_for_model('deepseek-chat', 2000) == 1500
+    assert prompt_budget_for_model('modele-inconnu', DEFAULT_CONTEXT_WINDOW - 600) == 600
+    assert prompt_budget_for_model('modele-inconnu', DEFAULT_CONTEXT_WINDOW + 1) == 0
+
+def test_planner_trims_the_least_important_sections_first_and_keeps_the_order():
+    sections = [
+        PromptSection('action', 'Je fouille le coffre.'),
+        PromptSection('summary', 'Le héros a traversé la forêt. ' * 20, priority=2, strategy='truncate'),
+        PromptSection('history', '\n'.join(f'Tour {n}: le vent souffle.' for n in range(20)), priority=3,
+                      strategy='lines'),
+        PromptSection('hint', 'Indice facultatif ' * 30, priority=4, strategy='drop')
+    ]
+    budget = estimate_tokens(sections[0].text) + estimate_tokens(sections[1].text) + 60
+    
+    planned, report = PromptBudgetPlanner().plan(sections, budget)
+    
+    assert [section.name for section in planned] == ['action', 'summary', 'history']
+    assert planned[0].text == sections[0].text and planned[1].text == sections[1].text
+    assert planned[2].text.endswith('Tour 19: le vent souffle.')
+    assert report['planned_tokens'] <= budget and not report['over_budget']
+    assert report['trimmed_tokens'] == report['original_tokens'] - report['planned_tokens']
+
+def test_narrative_budget_uses_the_tier_model_and_max_tokens(monkeypatch):
+    from src.engines.narrative_engine import narrative_engine
+    from src.routes.llm import LLM_PROVIDERS
+    
+    monkeypatch.setenv('LLM_PROMPT_TOKEN_BUDGET', '1500')
+    for config in LLM_PROVIDERS.values():
+        monkeypatch.setitem(config, 'api_key', None)
+    monkeypatch.setitem(LLM_PROVIDERS['deepseek'], 'api_key', 'test')
+    
+    fast = ModelTier('fast', 400, 0.7, provider='deepseek')
+    long_output = ModelTier('premium', DEFAULT_CONTEXT_WINDOW - 1000, 0.8, provider='deepseek', model='petit-modele')
+    
+    assert narrative_engine._get_prompt_budget(fast) == 1500
+    assert narrative_engine._get_prompt_budget(long_output) == 1000
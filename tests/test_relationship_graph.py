@@ -0,0 +1,64 @@
+"""
+Graphe des relations (CSR): poids, voisins, évolution, propagation et report dans les NPCs
+"""
+
+import pytest
+
+from src.engines.relationship_graph import RelationshipGraph, label_for_weight
+from src.models.game_state import NPC
+
+def npc(npc_id, relationships=None, weights=None):
+    return NPC(id=npc_id, name=npc_id.capitalize(), type='commoner', location='village',
+               disposition='neutral', relationships=relationships or {}, relationship_weights=weights or {})
+
+def test_csr_edges_are_sorted_and_updated_in_place():
+    graph = RelationshipGraph()
+    graph.set_weight('a', 'c', 0.5)
+    graph.set_weight('a', 'b', -0.3)
+    graph.set_weight('b', 'a', 2.0)
+    
+    assert graph.neighbors('a') == [('c', 0.5), ('b', -0.3)]
+    assert graph.weight('b', 'a') == 1.0
+    graph.set_weight('a', 'b', 0.1)
+    assert graph.pending == {}
+    assert graph.weight('a', 'b') == pytest.approx(0.1)
+    assert graph.neighbors('a', min_weight=0.3) == [('c', 0.5)]
+
+def test_decay_erodes_alliances_and_escalates_conflicts():
+    graph = RelationshipGraph()
+    graph.set_weight('a', 'b', 0.8)
+    graph.set_weight('a', 'c', -0.5)
+    graph.set_weight('a', 'd', 0.1)
+    
+    assert graph.apply_decay(1.0, alliance_decay=0.1, conflict_escalation=0.2, neutral_drift=0.05) == 3
+    assert graph.weight('a', 'b') == pytest.approx(0.72)
+    assert graph.weight('a', 'c') == pytest.approx(-0.6)
+    assert graph.weight('a', 'd') == pytest.approx(0.05)
+
+def test_event_reaches_friends_of_the_target_attenuated():
+    graph = RelationshipGraph.from_npcs([
+        npc('cible', {'ami': 'allié'}),
+        npc('ami', {'cible': 'allié'}),
+        npc('acteur')
+    ])
+    
+    changes = graph.propagate_event('acteur', 'cible', -0.5)
+    
+    deltas = {change['npc_id']: change['delta'] for change in changes}
+    assert deltas['cible'] == pytest.approx(-0.5)
+    assert deltas['ami'] == pytest.approx(-0.5 * 0.5 * 0.9)
+    assert graph.weight('ami', 'acteur') == pytest.approx(-0.225)
+
+def test_write_back_only_touches_changed_weights_and_keeps_custom_labels():
+    npcs = {
+        'a': npc('a', {'b': 'famille', 'c': 'ami', 'd': 'ennemi'}, {'b': 0.7}),
+        'b': npc('b'), 'c': npc('c'), 'd': npc('d')
+    }
+    graph = RelationshipGraph.from_npcs(npcs.values())
+    graph.set_weight('a', 'b', 0.5)
+    graph.set_weight('a', 'c', -0.45)
+    
+    assert graph.write_back(npcs) == 2
+    assert npcs['a'].relationships == {'b': 'famille', 'c': 'rival', 'd': 'ennemi'}
+    assert npcs['a'].relationship_weights == {'b': 0.5, 'c': -0.45}
+    assert label_for_weight(0.89) == 'allié'
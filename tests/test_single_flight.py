@@ -0,0 +1,82 @@
+"""
+Coalescence single-flight: un seul appel amont par clé, erreurs partagées, annulation du meneur
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.utils.single_flight import SingleFlight
+
+def test_concurrent_threads_share_one_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+    results = []
+    
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return {'content': 'réponse'}
+    
+    threads = [threading.Thread(target=lambda: results.append(flight.do('clé', fetch))) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while flight.metrics()['coalesced'] < 5 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    
+    assert len(calls) == 1
+    assert results == [{'content': 'réponse'}] * 6
+    assert flight.metrics() == {'leaders': 1, 'coalesced': 5, 'enabled': True, 'in_flight': 0}
+    # Appel terminé: la clé n'est plus en vol, un nouvel appel repart en amont
+    flight.do('clé', fetch)
+    assert len(calls) == 2
+
+def test_leader_exception_reaches_the_waiting_callers():
+    flight = SingleFlight()
+    
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError('fournisseur indisponible')
+    
+    async def main():
+        return await asyncio.gather(*(flight.ado('clé', failing) for _ in range(3)), return_exceptions=True)
+    
+    errors = asyncio.run(main())
+    
+    assert [str(error) for error in errors] == ['fournisseur indisponible'] * 3
+    assert flight.metrics()['leaders'] == 1
+
+def test_cancelled_leader_lets_a_waiting_caller_retry():
+    flight = SingleFlight()
+    calls = []
+    
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return len(calls)
+    
+    async def main():
+        leader = asyncio.ensure_future(flight.ado('clé', fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.ado('clé', fetch))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+    
+    assert asyncio.run(main()) == 2
+    assert flight.metrics()['leaders'] == 2
+
+def test_disabled_flight_calls_through():
+    flight = SingleFlight(enabled=False)
+    
+    assert flight.do('clé', lambda: 1) == 1
+    assert flight.metrics()['leaders'] == 0
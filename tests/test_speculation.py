@@ -0,0 +1,42 @@
+"""
+Clés et cycle de vie des narrations spéculatives
+"""
+
+from concurrent.futures import Future
+
+from src.engines.interaction_engine import InteractionEngine
+from src.engines.speculation import SpeculativeNarrationCache
+
+engine = InteractionEngine()
+
+def key(action_text, context=None):
+    return SpeculativeNarrationCache.action_key(engine.parse_action(action_text, context or {}))
+
+def test_rephrased_action_on_the_same_target_shares_the_key():
+    context = {'world_state': {'npcs_here': [{'name': 'Marchand'}], 'items_here': []}}
+    
+    assert key('Je parle à Marchand', context) == key('je discute avec le marchand', context)
+
+def test_exploration_without_entities_is_split_by_intent_and_direction():
+    look = key('Je regarde autour de moi')
+    north = key('Je vais vers la porte nord')
+    
+    assert look != north
+    assert key('Je me dirige vers le nord') != key("Je me dirige vers l'ouest")
+    assert key('J\'observe les environs') == look
+
+def test_take_serves_the_speculation_once_and_only_for_the_same_version():
+    cache = SpeculativeNarrationCache()
+    parsed_action = engine.parse_action('Je regarde autour de moi', {})
+    
+    future = cache.reserve('session', ('v1',), parsed_action)
+    assert isinstance(future, Future)
+    assert cache.reserve('session', ('v1',), parsed_action) is None
+    future.set_result(('Le vent se lève.', 42))
+    
+    assert cache.take('session', ('v2',), parsed_action) is None
+    assert cache.metrics()['wasted'] == 1
+    
+    cache.reserve('session', ('v2',), parsed_action).set_result(('Le vent tombe.', 10))
+    assert cache.take('session', ('v2',), parsed_action).result() == ('Le vent tombe.', 10)
+    assert cache.take('session', ('v2',), parsed_action) is None
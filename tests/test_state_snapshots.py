@@ -0,0 +1,45 @@
+"""
+Instantanés d'état: un par tour pour les mutations unitaires, pas un par PNJ ou quête modifié
+"""
+
+import pytest
+
+from src.engines.state_engine import state_engine
+from src.models.game_state import NPC, Quest
+
+@pytest.fixture
+def session_id():
+    session_id = state_engine.create_session('Testeur')
+    yield session_id
+    state_engine.sessions.pop(session_id, None)
+    state_engine.state_history.pop(session_id, None)
+    state_engine.dirty_sessions.discard(session_id)
+
+def test_single_entity_mutations_are_snapshotted_once_per_turn(session_id):
+    history = state_engine.state_history[session_id]
+    before = len(history)
+    
+    for index in range(5):
+        state_engine.add_npc(session_id, NPC(id=f'npc_{index}', name=f'Villageois {index}', type='commoner',
+                                             location='village', disposition='neutral'))
+    state_engine.move_npc(session_id, 'npc_0', 'foret')
+    state_engine.add_quest(session_id, Quest(id='q1', title='Le puits', description='Trouver le puits',
+                                             status='active', objectives=[]))
+    state_engine.update_quest_status(session_id, 'q1', 'completed')
+    assert len(history) == before
+    
+    assert state_engine.commit_turn(session_id) is True
+    assert len(history) == before + 1
+    assert history[-1]['world_state']['npcs']['npc_0']['location'] == 'foret'
+    assert state_engine.commit_turn(session_id) is False
+    assert len(history) == before + 1
+
+def test_full_snapshot_clears_pending_changes(session_id):
+    state_engine.move_npc(session_id, 'inconnu', 'foret')
+    assert state_engine.commit_turn(session_id) is False
+    
+    state_engine.add_npc(session_id, NPC(id='npc_x', name='Ermite', type='hermit', location='grotte',
+                                         disposition='neutral'))
+    state_engine.update_player_stats(session_id, {'health': -1})
+    
+    assert state_engine.commit_turn(session_id) is False
@@ -0,0 +1,46 @@
+"""
+Roue de temporisation: expiration exacte face à un parcours naïf, annulation et reprogrammation
+"""
+
+import random
+
+from src.utils.timer_wheel import HierarchicalTimerWheel
+
+def test_keys_expire_exactly_when_their_deadline_is_reached():
+    # Petite roue: les échéances lointaines passent par les niveaux supérieurs et le débordement
+    wheel = HierarchicalTimerWheel(start_time=0.0, resolution=0.25, wheel_size=4, levels=2)
+    rng = random.Random(5)
+    deadlines = {f'quest_{index}': round(rng.uniform(0, 40), 2) for index in range(200)}
+    for key, deadline in deadlines.items():
+        wheel.schedule(key, deadline)
+    
+    now = 0.0
+    while deadlines:
+        now += rng.uniform(0.05, 1.5)
+        expected = {key for key, deadline in deadlines.items() if deadline <= now}
+        
+        assert set(wheel.advance(now)) == expected
+        for key in expected:
+            del deadlines[key]
+        assert len(wheel) == len(deadlines)
+
+def test_deadline_later_in_the_current_tick_waits_for_the_next_advance():
+    wheel = HierarchicalTimerWheel(start_time=0.0, resolution=1.0)
+    wheel.schedule('q', 2.5)
+    
+    assert wheel.advance(2.2) == []
+    assert 'q' in wheel
+    assert wheel.advance(2.5) == ['q']
+
+def test_cancel_and_reschedule():
+    wheel = HierarchicalTimerWheel(start_time=0.0)
+    wheel.schedule('a', 1.0)
+    wheel.schedule('b', 2.0)
+    wheel.schedule('b', 30.0)
+    
+    assert wheel.cancel('a') is True
+    assert wheel.cancel('a') is False
+    assert wheel.deadline('b') == 30.0
+    assert wheel.advance(10.0) == []
+    assert wheel.advance(30.0) == ['b']
+    assert len(wheel) == 0